@@ -1,4 +1,11 @@
+import asyncio
+import weakref
 from app.core.llm import generate_text
+from app.core.prefetch import agent_loop, prefetch_customer_data
+from app.core.llm_scheduler import current_priority, AGENT_PRIORITY, DEFAULT_PRIORITY
+from app.core.profiler import profiled_thread
+from app.core.intent import intent_classifier, GREETING, LOAN_INTEREST
+from app.core.mock_data import PRODUCT_CATALOG
 from app.core.state_manager import StateManager
 from app.models.session import LoanApplicationState, AgentRole
 from app.agents.sales_agent import SalesAgent
@@ -6,6 +13,14 @@ from app.agents.verification_agent import VerificationAgent
 from app.agents.underwriting_agent import UnderwritingAgent
 from app.agents.sanction_agent import SanctionAgent
 
+# Agents that read prefetched customer data (KYC status, score, offer)
+PREFETCH_CONSUMERS = (AgentRole.VERIFICATION, AgentRole.UNDERWRITING)
+
+def _run_in_worker(fn, *args):
+    # Runs under asyncio.to_thread; lets an active turn profile sample this thread too
+    with profiled_thread():
+        return fn(*args)
+
 class MasterAgent:
     def __init__(self, state_manager: StateManager):
         self.state_manager = state_manager
@@ -14,45 +29,123 @@ class MasterAgent:
         self.verification = VerificationAgent()
         self.underwriting = UnderwritingAgent()
         self.sanction = SanctionAgent()
+        # Customer data prefetches not yet saved on their session: session_id -> (phone, task)
+        self._prefetch_tasks = {}
+        # One turn at a time per session: agents load, modify and save the whole state,
+        # so overlapping turns (client retries, double submits) would drop each other's updates
+        self._session_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    def _session_lock(self, session_id: str) -> asyncio.Lock:
+        lock = self._session_locks.get(session_id)
+        if lock is None:
+            lock = self._session_locks[session_id] = asyncio.Lock()
+        return lock
 
-    def process_request(self, session_id: str, user_message: str) -> str:
+    async def process_request(self, session_id: str, user_message: str) -> str:
+        async with self._session_lock(session_id):
+            response_message = await self._process_turn(session_id, user_message)
+            # A prefetch that finished while the agents were working is saved now, before the next turn
+            self._store_prefetch(session_id)
+            return response_message
+
+    async def _process_turn(self, session_id: str, user_message: str) -> str:
         # 1. Load State
+        self._store_prefetch(session_id)
         state = self.state_manager.get_state(session_id)
+        # Agents fetch customer data through the service clients on this loop
+        agent_loop.set(asyncio.get_running_loop())
+        
+        # Verification/Underwriting must run on warm data; wait for a prefetch still in flight
+        if state.current_agent in PREFETCH_CONSUMERS:
+            state = await self._await_prefetch(session_id)
         
         # 2. Add User Message to History
         self.state_manager.add_message(session_id, "user", user_message)
+        # Agents save the state they are given, so hand them the copy that includes the new message
+        state = self.state_manager.get_state(session_id)
 
         # 3. Determine Routing / Action
-        response_message = ""
+        # Agents make blocking LLM calls, so run them off the event loop; the LLM
+        # scheduler queues those calls by how far along the funnel the session is
+        current_priority.set(AGENT_PRIORITY.get(state.current_agent, DEFAULT_PRIORITY))
+        response_message = await asyncio.to_thread(_run_in_worker, self._dispatch, state, user_message)
+
+        # Reload state to check if agent changed during processing
+        state = self.state_manager.get_state(session_id)
         
+        # Kick off bureau/offer/KYC fetches as soon as the phone number is known
+        self._start_prefetch(state)
+        if state.current_agent in PREFETCH_CONSUMERS:
+            state = await self._await_prefetch(session_id)
+        
+        # Chain to next agent if handoff occurred (agent changed during processing)
+        # This ensures the new agent immediately asks for what it needs
+        current_priority.set(AGENT_PRIORITY.get(state.current_agent, DEFAULT_PRIORITY))
+        response_message = await asyncio.to_thread(_run_in_worker, self._chain_agent_if_needed, state, response_message)
+
+        # 4. Add Agent Response to History
+        self.state_manager.add_message(session_id, "agent", response_message)
+
+        return response_message
+
+    def _dispatch(self, state: LoanApplicationState, user_message: str) -> str:
         # Simple State Machine Logic for Orchestration
         if state.current_agent == AgentRole.MASTER:
             # Initial Greeting or Handoff
-            response_message = self._handle_master_logic(state, user_message)
+            return self._handle_master_logic(state, user_message)
         
         elif state.current_agent == AgentRole.SALES:
-            response_message = self.sales.process(state, user_message)
+            return self.sales.process(state, user_message)
             
         elif state.current_agent == AgentRole.VERIFICATION:
-            response_message = self.verification.process(state, user_message)
+            return self.verification.process(state, user_message)
             
         elif state.current_agent == AgentRole.UNDERWRITING:
-            response_message = self.underwriting.process(state, user_message)
+            return self.underwriting.process(state, user_message)
         
         elif state.current_agent == AgentRole.SANCTION:
-            response_message = self.sanction.process(state, user_message)
+            return self.sanction.process(state, user_message)
 
-        # Reload state to check if agent changed during processing
-        state = self.state_manager.get_state(session_id)
-        
-        # Chain to next agent if handoff occurred (agent changed during processing)
-        # This ensures the new agent immediately asks for what it needs
-        response_message = self._chain_agent_if_needed(state, response_message)
+        return ""
 
-        # 4. Add Agent Response to History
-        self.state_manager.add_message(session_id, "agent", response_message)
+    def _start_prefetch(self, state: LoanApplicationState):
+        if not state.phone or state.prefetched_data or state.session_id in self._prefetch_tasks:
+            return
+        task = asyncio.create_task(prefetch_customer_data(state.phone))
+        self._prefetch_tasks[state.session_id] = (state.phone, task)
+        task.add_done_callback(lambda _: self._on_prefetch_done(state.session_id))
 
-        return response_message
+    def _on_prefetch_done(self, session_id: str):
+        # Save right away unless a turn is running; that turn saves it once its agents are done
+        lock = self._session_locks.get(session_id)
+        if lock is None or not lock.locked():
+            self._store_prefetch(session_id)
+
+    def _store_prefetch(self, session_id: str):
+        """Save a finished prefetch on the session. Only called while no agent is working on it."""
+        entry = self._prefetch_tasks.get(session_id)
+        if entry is None or not entry[1].done():
+            return
+        phone, task = self._prefetch_tasks.pop(session_id)
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            # Underwriting falls back to direct lookups, so a failed prefetch is not fatal
+            print(f"Prefetch failed for session {session_id}: {error}")
+            return
+        # The conversation may have moved on while we were fetching
+        state = self.state_manager.get_state(session_id)
+        if state.phone == phone and not state.prefetched_data:
+            state.prefetched_data = task.result()
+            self.state_manager.save_state(state)
+
+    async def _await_prefetch(self, session_id: str) -> LoanApplicationState:
+        entry = self._prefetch_tasks.get(session_id)
+        if entry:
+            await asyncio.wait([entry[1]])
+            self._store_prefetch(session_id)
+        return self.state_manager.get_state(session_id)
 
     def _chain_agent_if_needed(self, state: LoanApplicationState, current_response: str) -> str:
         """
@@ -86,6 +179,14 @@ class MasterAgent:
         - Greet and understand intent.
         - Route to Sales Agent if user is interested.
         """
+        # Resolve clear-cut greetings / loan interest locally; only ambiguous input costs an LLM call
+        intent = intent_classifier.classify(user_message)
+        if intent.confident and intent.label == GREETING:
+            return self._greeting_response(state)
+        if intent.confident and intent.label == LOAN_INTEREST:
+            response = "That's great! My colleague from the Sales team will help you with the details."
+            return self._route_to_sales(state, response)
+        
         prompt = f"""
         You are the Master Agent for Hive Capital Personal Loans.
         Your goal is to warmly greet the customer and identify if they are interested in a Personal Loan.
@@ -98,20 +199,42 @@ class MasterAgent:
         User's latest message: "{user_message}"
         
         Instructions:
-        1. If the user is just saying hi, greet them back warmly and introduce Hive Capital Personal Loans.
+        1. If the user is just saying hi, greet them back warmly and introduce Hive Capital Personal Loans, and append the tag <INTENT:GREETING> at the end of your response.
         2. If the user expresses interest in a loan, say "That's great! My colleague from the Sales team will help you with the details." AND append the tag <ROUTING:SALES> at the end of your response.
         3. Keep it professional, empathetic, and persuasive.
         """
         
-        response = generate_text(prompt)
+        fallback = self._greeting_response(state)
+        response = generate_text(prompt, fallback=fallback)
+        routed = "<ROUTING:SALES>" in response
+        greeted = "<INTENT:GREETING>" in response
+        if response is not fallback:
+            # Only real LLM decisions are useful as training labels
+            intent_classifier.record_llm_label(user_message, intent, routed, greeted)
+        if greeted:
+            response = response.replace("<INTENT:GREETING>", "").strip()
         
-        if "<ROUTING:SALES>" in response:
+        if routed:
             response = response.replace("<ROUTING:SALES>", "").strip()
-            self.state_manager.update_agent(state.session_id, AgentRole.SALES)
-            # Immediately trigger the Sales agent
-            state = self.state_manager.get_state(state.session_id)
-            sales_intro = self.sales.process(state, "[HANDOFF] User interested in loan")
-            response = response + "\n\n" + sales_intro
+            response = self._route_to_sales(state, response)
             
         return response
 
+    def _route_to_sales(self, state: LoanApplicationState, response: str) -> str:
+        self.state_manager.update_agent(state.session_id, AgentRole.SALES)
+        # Immediately trigger the Sales agent
+        state = self.state_manager.get_state(state.session_id)
+        sales_intro = self.sales.process(state, "[HANDOFF] User interested in loan")
+        return response + "\n\n" + sales_intro
+
+    def _greeting_response(self, state: LoanApplicationState) -> str:
+        product = PRODUCT_CATALOG["personal_loan"]
+        name = f" {state.name}" if state.name else ""
+        return (
+            f"Hello{name}! Welcome to Hive Capital. Our {product['name']} offers "
+            f"₹{product['min_amount']:,} to ₹{product['max_amount']:,} with tenures of "
+            f"{product['min_tenure_months']} to {product['max_tenure_months']} months, "
+            f"interest rates starting at {product['base_interest_rate']}%, and instant approval with minimal documentation. "
+            "Are you looking for a personal loan today?"
+        )
+
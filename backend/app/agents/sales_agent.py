@@ -2,7 +2,41 @@ from app.models.session import LoanApplicationState, AgentRole
 from app.core.llm import generate_text
 from app.core.state_manager import StateManager
 from app.core.mock_data import PRODUCT_CATALOG
+from app.core.intent import intent_classifier, GREETING, LOAN_INTEREST
+from app.core.faq import faq_index
+from app.core.prefetch import fetch_customer, fetch_offer, run_blocking
+from app.core.service_clients import ServiceUnavailable
 import json
+import re
+
+# Shown when the LLM can't answer in time; keeps the negotiation going without changing state
+SALES_FALLBACK_RESPONSE = (
+    "Sorry, I didn't quite catch that. Could you tell me the loan amount and tenure (in months) "
+    "you have in mind, or say \"proceed\" to continue with your offer?"
+)
+
+# Messages carrying amounts/tenures or a go-ahead need entity extraction, so they always go to the LLM
+_NEGOTIATION_RE = re.compile(r"\d|\b(lakh|lakhs|lac|crore|k|proceed|agree|apply|go ahead|yes|okay|ok|sure|done)\b", re.IGNORECASE)
+
+_ORDINALS = {"first": 1, "second": 2, "third": 3, "fourth": 4}
+_OPTION_PATTERNS = [
+    re.compile(r"^\W*(?:option|choice|offer)?\s*#?(\d)\W*$"),  # "2", "option 2."
+    re.compile(r"\b(?:option|choice|offer)\s*(?:no\.?|number)?\s*#?(\d)\b"),  # "go with option 2"
+    re.compile(r"\b(first|second|third|fourth)\s+(?:one|option|choice|offer)\b"),  # "the second one"
+]
+
+
+def pick_counteroffer(user_message: str, options) -> dict:
+    """Option the user picked from a counteroffer list, or None if the message isn't a clear choice."""
+    text = user_message.strip().lower()
+    for pattern in _OPTION_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            choice = match.group(1)
+            index = _ORDINALS.get(choice) or int(choice)
+            if 1 <= index <= len(options):
+                return options[index - 1]
+    return None
 
 class SalesAgent:
     def __init__(self):
@@ -18,8 +52,12 @@ class SalesAgent:
             
             if phone_match:
                 phone = phone_match.group(0)
-                from app.mock.data_generator import mock_db
-                customer = mock_db.get_customer_by_phone(phone)
+                try:
+                    customer = run_blocking(fetch_customer(phone))
+                    offer = run_blocking(fetch_offer(customer["id"])) if customer else None
+                except ServiceUnavailable as e:
+                    print(f"SalesAgent: customer lookup failed: {e}")
+                    return "I'm unable to reach our customer records right now. Please share your number again in a moment, or we can proceed as a new customer."
                 
                 if customer:
                     # Hydrate State
@@ -29,8 +67,7 @@ class SalesAgent:
                     state.income = float(customer["monthly_income"])
                     state.email = customer["email"]
                     
-                    # Fetch Offer
-                    offer = mock_db.get_offer(customer["id"])
+                    # Offer
                     if offer:
                         state.pre_approved_limit = float(offer["pre_approved_limit"])
                         state.interest_rate = float(offer["interest_rate"])
@@ -50,9 +87,31 @@ class SalesAgent:
             # If no phone number found and no offer, prompt for it
             # But only if we haven't asked recently (check history? or just rely on flow)
             # For simplicity, if we are in SALES and state has no identity, we prioritize identity.
-            if "loan" in user_message.lower() or "hi" in user_message.lower() or "hello" in user_message.lower():
+            intent = intent_classifier.classify(user_message, count_as_routing=False)
+            if intent.confident and intent.label in (GREETING, LOAN_INTEREST):
                  return "To provide you with the best personalized offers, could you please share your registered mobile number?"
 
+        # 0b. Picking one of underwriting's counteroffers needs no LLM call
+        counteroffers = state.counteroffer["options"] if state.counteroffer else []
+        if counteroffers:
+            chosen = pick_counteroffer(user_message, counteroffers)
+            if chosen:
+                state.loan_amount = float(chosen["amount"])
+                state.loan_tenure = int(chosen["tenure"])
+                state.counteroffer = None
+                state.current_agent = AgentRole.VERIFICATION
+                from app.core.state_manager import StateManager
+                StateManager().save_state(state)
+                response_text = f"Great choice! ₹{chosen['amount']:,.0f} over {chosen['tenure']} months with an EMI of ₹{chosen['emi']:,.0f}."
+                if chosen["needs_salary_slip"]:
+                    response_text += " You'll need to upload your latest salary slip for this amount."
+                return response_text + "\n\n(System: Transferring to Verification Agent...)"
+
+        # 0c. Plain product questions are answered from the local FAQ index
+        faq_matches = faq_index.query(user_message)
+        if faq_matches and faq_matches[0].confident and not _NEGOTIATION_RE.search(user_message):
+            return faq_matches[0].answer
+
         # 1. Analyze Core Intent & Extract Entities (Amount, Tenure)
         prompt = f"""
         You are a Sales Agent for Hive Capital. You are negotiating a personal loan.
@@ -69,7 +128,7 @@ class SalesAgent:
         - Min Amount: {self.products['personal_loan']['min_amount']}
         - Max Amount: {self.products['personal_loan']['max_amount']}
         - Interest Rate starts at {self.products['personal_loan']['base_interest_rate']}%
-        
+        {self._counteroffer_context(counteroffers)}{self._faq_context(faq_matches)}
         User Message: "{user_message}"
         
         Task:
@@ -99,7 +158,7 @@ class SalesAgent:
         </JSON>
         """
         
-        llm_response = generate_text(prompt)
+        llm_response = generate_text(prompt, fallback=SALES_FALLBACK_RESPONSE)
         
         # 2. Parse Component
         response_text = llm_response
@@ -119,6 +178,10 @@ class SalesAgent:
             state.loan_amount = float(extracted_data["amount"])
         if extracted_data.get("tenure"):
             state.loan_tenure = int(extracted_data["tenure"])
+        if extracted_data:
+            # The customer answered with something other than an option number (new terms,
+            # a question, a go-ahead), so the counteroffer list is no longer what they're choosing from
+            state.counteroffer = None
             
         # 4. Handle Transitions
         if extracted_data.get("action") == "AGREE":
@@ -133,3 +196,26 @@ class SalesAgent:
         manager.save_state(state)
         
         return response_text
+
+    def _counteroffer_context(self, counteroffers) -> str:
+        if not counteroffers:
+            return ""
+        lines = "\n".join(
+            f"        {i}. Amount {o['amount']:.0f}, Tenure {o['tenure']} months, EMI {o['emi']}"
+            + (" (needs salary slip)" if o["needs_salary_slip"] else "")
+            for i, o in enumerate(counteroffers, 1)
+        )
+        return f"""
+        Underwriting declined the current terms. These counteroffers are guaranteed to be approved:
+{lines}
+        Steer the customer towards one of them.
+"""
+
+    def _faq_context(self, faq_matches) -> str:
+        if not faq_matches:
+            return ""
+        facts = "\n".join(f"        - {m.answer}" for m in faq_matches)
+        return f"""
+        Relevant Product Facts (use these to answer questions):
+{facts}
+"""
@@ -1,27 +1,28 @@
 from app.models.session import LoanApplicationState, AgentRole
 from app.core.llm import generate_text
 from app.core.state_manager import StateManager
-from app.core.mock_data import CRM_DATABASE
+from app.core.customer_search import name_similarity, SEARCH_NAME_MIN_SCORE
+from app.core.prefetch import (
+    fetch_customer_by_pan, fetch_kyc_status, prefetch_customer_data, run_blocking, search_customer_by_phone, search_customers,
+)
+from app.core.service_clients import ServiceUnavailable
 import json
 import re
 
-def normalize_phone(phone: str) -> str:
-    """Extract just the digits from a phone number for comparison."""
-    return re.sub(r'\D', '', phone)
+_NAME_PREFIX_RE = re.compile(r"^\s*(my name is|my name's|name is|i am|i'm|this is|it's|it is)\s+", re.IGNORECASE)
 
-def find_phone_in_crm(phone: str) -> str | None:
-    """Find a phone number in CRM database, handling various formats."""
-    normalized_input = normalize_phone(phone)
-    
-    for crm_phone in CRM_DATABASE.keys():
-        normalized_crm = normalize_phone(crm_phone)
-        # Match if the digits match (ignoring country code variations)
-        if normalized_input == normalized_crm:
-            return crm_phone
-        # Also match if one is a suffix of the other (handles 10-digit vs 12-digit)
-        if normalized_input.endswith(normalized_crm[-10:]) or normalized_crm.endswith(normalized_input[-10:]):
-            return crm_phone
-    return None
+def find_customer_in_crm(phone: str):
+    """CRM record and KYC status for a phone number in any format (matches on the last 10 digits)."""
+    customer = run_blocking(search_customer_by_phone(phone))
+    if not customer:
+        return None, None
+    return customer, run_blocking(fetch_kyc_status(customer))
+
+def clean_name(message: str) -> str:
+    """'my name is ravi kumar.' -> 'Ravi Kumar'"""
+    name = _NAME_PREFIX_RE.sub("", message)
+    name = re.sub(r"[^A-Za-z .'-]", " ", name)
+    return " ".join(name.split()).strip(" .").title()
 
 class VerificationAgent:
     def process(self, state: LoanApplicationState, user_message: str) -> str:
@@ -37,7 +38,8 @@ class VerificationAgent:
             Extract phone number from user message: "{user_message}".
             Return ONLY the digits if found, else return "NOT_FOUND".
             """
-            phone_extraction = generate_text(prompt).strip()
+            # If the LLM is unavailable, fall back to pulling the digits out of the raw message
+            phone_extraction = generate_text(prompt, fallback=user_message).strip()
             
             # Clean up the extraction - remove any non-digit characters
             phone_digits = re.sub(r'\D', '', phone_extraction)
@@ -46,12 +48,15 @@ class VerificationAgent:
                 state.phone = phone_digits
                 
                 # Check CRM with normalized phone lookup
-                crm_phone_key = find_phone_in_crm(phone_digits)
-                if crm_phone_key:
-                    user_data = CRM_DATABASE[crm_phone_key]
-                    state.name = user_data["name"]
-                    state.email = user_data["email"]
-                    state.kyc_verified = (user_data["kyc_status"] == "VERIFIED")
+                try:
+                    customer, kyc_status = find_customer_in_crm(phone_digits)
+                except ServiceUnavailable as e:
+                    print(f"VerificationAgent: CRM lookup failed: {e}")
+                    return "I'm unable to reach our customer records right now. Please share your mobile number again in a moment."
+                if customer:
+                    state.name = customer["name"]
+                    state.email = customer["email"]
+                    state.kyc_verified = (kyc_status == "VERIFIED")
                     response_text = f"Thank you, {state.name}. I found your details in our system."
                     
                     if state.kyc_verified:
@@ -72,10 +77,29 @@ class VerificationAgent:
         
         elif not state.name:
             # If phone was known but not in DB, we end up here (conceptually, though logic above handles it partially)
-            state.name = user_message # Naive assignment
+            state.name = clean_name(user_message) or user_message
+            # The number was new, but the person may already be a customer (changed phone);
+            # the PAN step links the profile if the PAN and name agree
+            try:
+                hits = run_blocking(search_customers(state.name, limit=5))
+            except ServiceUnavailable as e:
+                print(f"VerificationAgent: CRM name search failed: {e}")
+                hits = []
+            candidates = [hit["customer"]["id"] for hit in hits if hit["match"] == "name"]
+            if candidates:
+                state.audit_log.append(f"Name resembles CRM {', '.join(candidates)}; awaiting PAN to link")
             manager.save_state(state)
+            if candidates:
+                return "Thank you. It looks like you may already have a profile with us. Please provide your PAN number so we can link it and complete KYC."
             return "Thank you. Now, please provide your PAN number for KYC verification."
 
+        elif not state.kyc_verified and (state.prefetched_data or {}).get("kyc_status") == "VERIFIED":
+            # Phone came from Sales identification and the prefetched CRM record is already KYC-verified
+            state.kyc_verified = True
+            state.current_agent = AgentRole.UNDERWRITING
+            response_text = f"Thank you, {state.name}. Your KYC is already verified."
+            response_text += "\n\n(System: Transferring to Underwriting Agent...)"
+
         elif not state.kyc_verified:
             # We have phone and name, need PAN or checking PAN
             prompt = f"""
@@ -84,7 +108,8 @@ class VerificationAgent:
             If found, return ONLY the ID.
             If not found, return EXACTLY "NOT_FOUND".
             """
-            pan = generate_text(prompt).strip().upper()
+            # No fallback to the raw message: if the LLM is unavailable we ask again
+            pan = generate_text(prompt, fallback="NOT_FOUND").strip().upper()
             
             print(f"[VerificationAgent] User Message: '{user_message}' | Extracted PAN: '{pan}'")
             
@@ -94,6 +119,31 @@ class VerificationAgent:
                 pan = pan_match.group(0)
             
             if "NOT_FOUND" not in pan and len(pan) >= 10:
+                # A PAN already in CRM must belong to this person (typo-tolerant name match)
+                try:
+                    existing = run_blocking(fetch_customer_by_pan(pan))
+                except ServiceUnavailable as e:
+                    print(f"VerificationAgent: CRM PAN lookup failed: {e}")
+                    return "I'm unable to reach our customer records right now. Please share your PAN again in a moment."
+                if existing:
+                    similarity = name_similarity(state.name or "", existing["name"])
+                    if similarity < SEARCH_NAME_MIN_SCORE:
+                        state.audit_log.append(f"PAN matched CRM {existing['id']} but name did not ({similarity:.2f})")
+                        manager.save_state(state)
+                        return "The PAN you shared is registered under a different name. Please check it and share your PAN again."
+                    # Existing customer on a new number: underwrite on the CRM record's bureau
+                    # data, not the defaults prefetched for the unknown number
+                    try:
+                        linked = run_blocking(prefetch_customer_data(existing["phone"]))
+                    except ServiceUnavailable as e:
+                        print(f"VerificationAgent: customer data fetch failed: {e}")
+                        return "I'm unable to reach our customer records right now. Please share your PAN again in a moment."
+                    state.prefetched_data = linked
+                    state.user_id = existing["id"]
+                    state.name = existing["name"]
+                    state.email = existing["email"]
+                    state.audit_log.append(f"Identity matched CRM {existing['id']} by PAN and name ({similarity:.2f})")
+                
                 # Mock Verification Success
                 state.kyc_verified = True
                 state.current_agent = AgentRole.UNDERWRITING
@@ -0,0 +1,147 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set
+
+# Bounded TTL caches for bureau scores and offers.
+# A real bureau charges per pull, so repeated underwriting passes and new
+# sessions for the same customer should not trigger another upstream call.
+
+SCORE_CACHE_TTL_SECONDS = float(os.getenv("SCORE_CACHE_TTL_SECONDS", "3600"))
+OFFER_CACHE_TTL_SECONDS = float(os.getenv("OFFER_CACHE_TTL_SECONDS", "900"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+
+# Completed /chat turns by (session_id, idempotency_key), so client retries replay
+# the original response; a retry while the turn is still running attaches to it.
+# Degraded answers (canned LLM fallbacks, services down) are not kept, so a retry runs the turn again
+CHAT_IDEMPOTENCY_TTL_SECONDS = float(os.getenv("CHAT_IDEMPOTENCY_TTL_SECONDS", "600"))
+CHAT_IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("CHAT_IDEMPOTENCY_MAX_ENTRIES", "5000"))
+
+
+class _LoadAbandoned(Exception):
+    """Set on a shared load whose caller was cancelled before it finished."""
+
+
+class AsyncTTLCache:
+    """
+    LRU + TTL cache with single-flight loading: concurrent misses for the same
+    key share one upstream call instead of each issuing their own.
+    """
+
+    def __init__(self, name: str, ttl_seconds: float, max_entries: int = CACHE_MAX_ENTRIES):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (expires_at, value)
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        # Loads that were running when their key was invalidated: their result is returned but not stored
+        self._stale: Set[asyncio.Future] = set()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        cache_if: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """Cached value for key, loading it once if missing. Loaded values failing cache_if are returned but not kept."""
+        while True:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                    return value
+                del self._entries[key]
+
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            self.coalesced += 1
+            try:
+                # shield: one waiter being cancelled must not cancel the shared load
+                return await asyncio.shield(inflight)
+            except _LoadAbandoned:
+                # The caller running the load was cancelled; take it over (or join whoever did)
+                self.coalesced -= 1
+                continue
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            # Only this caller was cancelled; waiters retry instead of being cancelled with it
+            future.set_exception(_LoadAbandoned())
+            future.exception()
+            raise
+        except Exception as e:
+            # Failures are not cached; everyone waiting on this load sees the error
+            future.set_exception(e)
+            # Mark retrieved so an unawaited future does not log "exception never retrieved"
+            future.exception()
+            raise
+        else:
+            if future not in self._stale and (cache_if is None or cache_if(value)):
+                self._store(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            # An invalidation may already have let a newer load take this key
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+            self._stale.discard(future)
+
+    def put(self, key: Hashable, value: Any):
+        """Store a value loaded outside get_or_load (e.g. by work that outlived its caller)."""
+        self._store(key, value)
+
+    def _store(self, key: Hashable, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key, None)
+        # A load already running may have read the old data: don't store it, and
+        # let the next caller start a fresh load instead of joining this one
+        inflight = self._inflight.pop(key, None)
+        if inflight is not None:
+            self._stale.add(inflight)
+
+    def clear(self):
+        self._entries.clear()
+        self._stale.update(self._inflight.values())
+        self._inflight.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "inflight": len(self._inflight),
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Singleton instances
+score_cache = AsyncTTLCache("credit_score", SCORE_CACHE_TTL_SECONDS)
+offer_cache = AsyncTTLCache("offer", OFFER_CACHE_TTL_SECONDS)
+chat_replay_cache = AsyncTTLCache("chat_idempotency", CHAT_IDEMPOTENCY_TTL_SECONDS, CHAT_IDEMPOTENCY_MAX_ENTRIES)
+
+
+def cache_stats() -> Dict[str, Any]:
+    return {c.name: c.stats() for c in (score_cache, offer_cache, chat_replay_cache)}
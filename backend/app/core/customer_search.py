@@ -0,0 +1,262 @@
+import heapq
+import itertools
+import os
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from app.mock.data_generator import mock_db, normalize_phone
+
+# Search index over the CRM for identity matching:
+# - phone: exact (last 10 digits) or suffix match on the last 4-9 digits
+# - PAN: exact
+# - name: typo-tolerant trigram search (Dice similarity)
+#
+# Names are indexed at two levels: distinct full names (many customers share
+# one) and the small vocabulary of words they are made of. A name query
+# fuzzy-matches each query word against the vocabulary via a trigram index,
+# intersects the names containing those words, and only then scores the few
+# surviving full names. Costs depend on the vocabulary, not the customer count.
+# The index follows mock_db writes incrementally.
+
+SEARCH_NAME_MIN_SCORE = float(os.getenv("SEARCH_NAME_MIN_SCORE", "0.5"))
+SEARCH_WORD_MIN_SCORE = float(os.getenv("SEARCH_WORD_MIN_SCORE", "0.45"))
+SEARCH_WORD_FLOOR_SCORE = 0.2
+SEARCH_MAX_CANDIDATES = int(os.getenv("SEARCH_MAX_CANDIDATES", "1000"))
+PHONE_SUFFIX_MIN = 4
+
+PAN_RE = re.compile(r"^[A-Z0-9]{10}$")
+_NON_LETTERS_RE = re.compile(r"[^a-z ]+")
+
+
+def normalize_name(name: str) -> str:
+    return " ".join(_NON_LETTERS_RE.sub(" ", name.lower()).split())
+
+
+def word_trigrams(word: str) -> frozenset:
+    # Padded like pg_trgm ("  ravi ") so short words and word starts still match
+    padded = f"  {word} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def name_trigrams(name: str) -> frozenset:
+    grams = set()
+    for word in normalize_name(name).split():
+        grams.update(word_trigrams(word))
+    return frozenset(grams)
+
+
+def name_similarity(a: str, b: str) -> float:
+    ga, gb = name_trigrams(a), name_trigrams(b)
+    if not ga or not gb:
+        return 0.0
+    return 2 * len(ga & gb) / (len(ga) + len(gb))
+
+
+class CustomerSearchIndex:
+    def __init__(self, get_customer: Callable[[str], Optional[Dict[str, Any]]] = mock_db.get_customer):
+        self._get_customer = get_customer
+        self._lock = threading.Lock()
+        self._phone_suffix: Dict[str, Set[str]] = {}  # last 4..10 digits -> customer ids
+        self._pan: Dict[str, str] = {}
+        self._names: Dict[str, Set[str]] = {}  # normalized name -> customer ids
+        self._name_grams: Dict[str, frozenset] = {}  # normalized name -> trigrams
+        self._word_names: Dict[str, Set[str]] = {}  # word -> normalized names containing it
+        self._word_grams: Dict[str, frozenset] = {}  # word -> trigrams
+        self._trigrams: Dict[str, Set[str]] = {}  # trigram -> words
+        self._indexed: Dict[str, tuple] = {}  # customer id -> (phone digits, pan, name) as indexed
+
+    def build(self, customers: List[Dict[str, Any]]):
+        with self._lock:
+            for customer in customers:
+                self._remove(customer["id"])
+                self._add(customer["id"], customer)
+
+    def update(self, customer_id: str, previous: Optional[Dict[str, Any]] = None):
+        """Re-index one customer (mock_db write listener)."""
+        customer = self._get_customer(customer_id)
+        with self._lock:
+            self._remove(customer_id)
+            if customer:
+                self._add(customer_id, customer)
+
+    def _add(self, customer_id: str, customer: Dict[str, Any]):
+        digits = re.sub(r"\D", "", normalize_phone(customer["phone"]))
+        pan = customer["pan"].upper()
+        name = normalize_name(customer["name"])
+        self._indexed[customer_id] = (digits, pan, name)
+
+        for n in range(PHONE_SUFFIX_MIN, len(digits) + 1):
+            self._phone_suffix.setdefault(digits[-n:], set()).add(customer_id)
+        self._pan[pan] = customer_id
+
+        ids = self._names.setdefault(name, set())
+        if not ids:
+            self._name_grams[name] = name_trigrams(name)
+            for word in set(name.split()):
+                names = self._word_names.setdefault(word, set())
+                if not names:
+                    grams = word_trigrams(word)
+                    self._word_grams[word] = grams
+                    for gram in grams:
+                        self._trigrams.setdefault(gram, set()).add(word)
+                names.add(name)
+        ids.add(customer_id)
+
+    def _remove(self, customer_id: str):
+        indexed = self._indexed.pop(customer_id, None)
+        if not indexed:
+            return
+        digits, pan, name = indexed
+        for n in range(PHONE_SUFFIX_MIN, len(digits) + 1):
+            ids = self._phone_suffix.get(digits[-n:])
+            if ids:
+                ids.discard(customer_id)
+                if not ids:
+                    del self._phone_suffix[digits[-n:]]
+        if self._pan.get(pan) == customer_id:
+            del self._pan[pan]
+
+        ids = self._names.get(name)
+        if ids:
+            ids.discard(customer_id)
+            if not ids:
+                del self._names[name]
+                del self._name_grams[name]
+                for word in set(name.split()):
+                    names = self._word_names[word]
+                    names.discard(name)
+                    if names:
+                        continue
+                    del self._word_names[word]
+                    for gram in self._word_grams.pop(word):
+                        words = self._trigrams[gram]
+                        words.discard(word)
+                        if not words:
+                            del self._trigrams[gram]
+
+    # --- Queries ---
+
+    def find_by_phone(self, phone: str) -> Optional[Dict[str, Any]]:
+        """Exact match on the last 10 digits."""
+        digits = re.sub(r"\D", "", phone)[-10:]
+        if len(digits) < 10:
+            return None
+        with self._lock:
+            ids = self._phone_suffix.get(digits)
+            customer_id = next(iter(ids)) if ids else None
+        return self._get_customer(customer_id) if customer_id else None
+
+    def find_by_pan(self, pan: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            customer_id = self._pan.get(pan.strip().upper())
+        return self._get_customer(customer_id) if customer_id else None
+
+    def search_phone(self, partial: str, limit: int = 10) -> List[Dict[str, Any]]:
+        digits = re.sub(r"\D", "", partial)[-10:]
+        if len(digits) < PHONE_SUFFIX_MIN:
+            return []
+        with self._lock:
+            ids = sorted(self._phone_suffix.get(digits, ()))[:limit]
+        score = round(len(digits) / 10, 2)
+        return [self._hit(customer_id, "phone", score) for customer_id in ids]
+
+    def _similar_words(self, word: str) -> Set[str]:
+        """Vocabulary words within SEARCH_WORD_MIN_SCORE trigram similarity of `word`."""
+        grams = word_trigrams(word)
+        overlap: Dict[str, int] = {}
+        for gram in grams:
+            for candidate in self._trigrams.get(gram, ()):
+                overlap[candidate] = overlap.get(candidate, 0) + 1
+        n = len(grams)
+        scores = {
+            candidate: 2 * common / (n + len(self._word_grams[candidate]))
+            for candidate, common in overlap.items()
+        }
+        similar = {candidate for candidate, score in scores.items() if score >= SEARCH_WORD_MIN_SCORE}
+        if not similar and scores:
+            # Short words lose most trigrams to a single typo ("lhar"); take the closest words instead
+            best = max(scores.values())
+            if best >= SEARCH_WORD_FLOOR_SCORE:
+                similar = {candidate for candidate, score in scores.items() if score == best}
+        return similar
+
+    def search_name(self, query: str, limit: int = 10, min_score: float = SEARCH_NAME_MIN_SCORE) -> List[Dict[str, Any]]:
+        words = set(normalize_name(query).split())
+        query_grams = name_trigrams(query)
+        if not words:
+            return []
+        with self._lock:
+            # Names containing a close match for each query word
+            per_word = []
+            for word in words:
+                names: Set[str] = set()
+                for similar in self._similar_words(word):
+                    names |= self._word_names[similar]
+                if names:
+                    per_word.append(names)
+            if not per_word:
+                return []
+            per_word.sort(key=len)
+
+            # Names matching every query word; only if there are none, allow one word to miss
+            candidates = set.intersection(*per_word)
+            scored = self._score_names(query_grams, candidates, min_score)
+            if not scored and len(per_word) > 1:
+                extra: Set[str] = set()
+                for i in range(len(per_word)):
+                    others = per_word[:i] + per_word[i + 1:]
+                    extra |= set.intersection(*others) - candidates
+                    if len(extra) >= SEARCH_MAX_CANDIDATES:
+                        # Very generic query: results are best effort
+                        break
+                scored += self._score_names(query_grams, extra, min_score)
+            scored.sort(key=lambda item: (-item[0], item[1]))
+
+            hits = []
+            for score, name in scored:
+                ids = heapq.nsmallest(limit - len(hits), self._names[name])
+                hits.extend((customer_id, round(score, 3)) for customer_id in ids)
+                if len(hits) >= limit:
+                    break
+        return [self._hit(customer_id, "name", score) for customer_id, score in hits]
+
+    def _score_names(self, query_grams: frozenset, names: Set[str], min_score: float) -> List[tuple]:
+        n = len(query_grams)
+        scored = []
+        for name in itertools.islice(names, SEARCH_MAX_CANDIDATES):
+            grams = self._name_grams[name]
+            score = 2 * len(query_grams & grams) / (n + len(grams))
+            if score >= min_score:
+                scored.append((score, name))
+        return scored
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Auto-detects the query type: digits -> phone, PAN-shaped -> PAN, otherwise name."""
+        query = query.strip()
+        digits = re.sub(r"[\s\-+()]", "", query)
+        if digits.isdigit():
+            return self.search_phone(digits, limit)
+        if PAN_RE.match(query.upper()):
+            customer = self.find_by_pan(query)
+            if customer:
+                return [self._hit(customer["id"], "pan", 1.0)]
+        return self.search_name(query, limit)
+
+    def _hit(self, customer_id: str, match: str, score: float) -> Dict[str, Any]:
+        return {"customer": self._get_customer(customer_id), "match": match, "score": score}
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "customers": len(self._indexed),
+            "distinct_names": len(self._names),
+            "name_words": len(self._word_names),
+            "trigrams": len(self._trigrams),
+            "phone_suffix_keys": len(self._phone_suffix),
+        }
+
+
+# Singleton instance, kept in sync with CRM writes
+customer_search = CustomerSearchIndex()
+customer_search.build(mock_db.get_all_customers())
+mock_db.subscribe(customer_search.update)
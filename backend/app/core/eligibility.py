@@ -0,0 +1,124 @@
+import os
+from typing import Dict, List, Optional
+
+from app.core.mock_data import PRODUCT_CATALOG
+from app.core.rules_engine import UnderwritingPolicy, calculate_emi
+
+# Instant counteroffers when underwriting turns down the requested terms.
+#
+# Instead of bouncing the customer back to Sales to guess a lower amount, the
+# whole amount x tenure grid of the product is evaluated against the rule
+# table in one pass (UnderwritingPolicy.decide_grid) and the best approvable
+# combinations are offered straight away. Because they come from the same
+# rules, picking one is guaranteed to pass underwriting on the next attempt.
+
+COUNTEROFFER_AMOUNT_STEP = int(os.getenv("COUNTEROFFER_AMOUNT_STEP", "5000"))
+COUNTEROFFER_TENURE_STEP = int(os.getenv("COUNTEROFFER_TENURE_STEP", "6"))
+
+
+def amount_grid(product: Dict, extra: Optional[float] = None) -> List[float]:
+    amounts = list(range(int(product["min_amount"]), int(product["max_amount"]) + 1, COUNTEROFFER_AMOUNT_STEP))
+    if extra and product["min_amount"] <= extra <= product["max_amount"]:
+        amounts.append(extra)
+    return sorted(set(float(a) for a in amounts))
+
+
+def tenure_grid(product: Dict, extra: Optional[int] = None) -> List[int]:
+    tenures = list(range(product["min_tenure_months"], product["max_tenure_months"] + 1, COUNTEROFFER_TENURE_STEP))
+    if extra and product["min_tenure_months"] <= extra <= product["max_tenure_months"]:
+        tenures.append(extra)
+    return sorted(set(tenures))
+
+
+def max_amount_by_tenure(
+    policy: UnderwritingPolicy,
+    score: int,
+    limit: float,
+    salary: float,
+    amounts: List[float],
+    tenures: List[int],
+    interest_rate: Optional[float] = None,
+    salary_slip_uploaded: bool = False,
+) -> Dict[int, float]:
+    """Largest approvable amount per tenure (tenures with nothing approvable are left out)."""
+    outcomes = policy.decide_grid(score, amounts, tenures, limit, salary, interest_rate, salary_slip_uploaded)
+    best: Dict[int, float] = {}
+    for row in range(len(amounts) - 1, -1, -1):
+        for col, tenure in enumerate(tenures):
+            if tenure not in best and outcomes[row][col] == "APPROVE":
+                best[tenure] = amounts[row]
+        if len(best) == len(tenures):
+            break
+    return best
+
+
+def _closest_tenure(best: Dict[int, float], amount: float, tenure: int) -> int:
+    return min((t for t, a in best.items() if a == amount), key=lambda t: (abs(t - tenure), t))
+
+
+def _option(amount: float, tenure: int, rate: float, needs_salary_slip: bool) -> Dict:
+    return {
+        "amount": amount,
+        "tenure": tenure,
+        "emi": round(calculate_emi(amount, rate, tenure)),
+        "needs_salary_slip": needs_salary_slip,
+    }
+
+
+def build_counteroffers(
+    policy: UnderwritingPolicy,
+    score: int,
+    limit: float,
+    salary: float,
+    requested_amount: float,
+    requested_tenure: Optional[int] = None,
+    interest_rate: Optional[float] = None,
+    salary_slip_uploaded: bool = False,
+    product: Dict = PRODUCT_CATALOG["personal_loan"],
+) -> List[Dict]:
+    """
+    Up to four approvable alternatives to the requested terms:
+    the most we can lend at the requested tenure, the requested amount at the
+    shortest tenure that fits, the overall maximum, and (if no slip is on file)
+    the larger maximum available after a salary slip upload.
+    """
+    rate = interest_rate or policy.default_interest_rate
+    requested_amount = float(requested_amount)
+    tenure = requested_tenure or policy.default_tenure
+    amounts = amount_grid(product, requested_amount)
+    tenures = tenure_grid(product, tenure)
+
+    best = max_amount_by_tenure(policy, score, limit, salary, amounts, tenures, rate, salary_slip_uploaded)
+    candidates = []
+    if tenure in best:
+        candidates.append((best[tenure], tenure))
+    fitting = [t for t in tenures if best.get(t, 0) >= requested_amount]
+    if fitting:
+        candidates.append((requested_amount, fitting[0]))
+    if best:
+        top = max(best.values())
+        candidates.append((top, _closest_tenure(best, top, tenure)))
+
+    options: List[Dict] = []
+    seen = set()
+    for amount, months in candidates:
+        if (amount, months) not in seen:
+            seen.add((amount, months))
+            options.append(_option(amount, months, rate, False))
+
+    if not salary_slip_uploaded:
+        with_slip = max_amount_by_tenure(policy, score, limit, salary, amounts, tenures, rate, True)
+        if with_slip and max(with_slip.values()) > max(best.values(), default=0):
+            top = max(with_slip.values())
+            options.append(_option(top, _closest_tenure(with_slip, top, tenure), rate, True))
+    return options
+
+
+def format_counteroffers(options: List[Dict]) -> str:
+    lines = []
+    for i, option in enumerate(options, 1):
+        line = f"{i}. ₹{option['amount']:,.0f} over {option['tenure']} months (EMI ₹{option['emi']:,.0f})"
+        if option["needs_salary_slip"]:
+            line += " - needs a salary slip upload"
+        lines.append(line)
+    return "\n".join(lines)
@@ -0,0 +1,246 @@
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from app.core.mock_data import PRODUCT_CATALOG
+from app.core.rules_engine import get_policy
+
+# Local product-FAQ retrieval for SalesAgent.
+#
+# Common product questions ("max tenure?", "interest rate?", "documents?")
+# are matched against a curated corpus (faq_corpus.json) with BM25 and, when
+# the match is clear, answered directly without an LLM call. Answers are
+# templates filled from PRODUCT_CATALOG and the live underwriting thresholds,
+# so they never drift from what the system actually does. Weaker matches still
+# help: their answers are passed to the LLM prompt as compact context.
+# Questions about the customer's own case ("what is my limit?", "can I get
+# 5 lakhs?") are never answered directly: the FAQ only knows the product.
+#
+# The index is built at startup and cached on disk (FAQ_INDEX_PATH), keyed by
+# a fingerprint of the corpus so edits to the corpus rebuild it.
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "faq_corpus.json")
+FAQ_INDEX_PATH = os.getenv("FAQ_INDEX_PATH", "cache/faq_index.json")
+# Share of the query's (idf-weighted) terms the best passage must contain to answer directly
+FAQ_MIN_COVERAGE = float(os.getenv("FAQ_MIN_COVERAGE", "0.8"))
+# ...and how far ahead of the next FAQ entry it must score
+FAQ_MIN_MARGIN = float(os.getenv("FAQ_MIN_MARGIN", "1.3"))
+INDEX_FORMAT = 1
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+# Questions about this customer's own case rather than the product: their limit/offer/
+# application, or a specific amount for them ("can I get 5 lakhs?"). General questions
+# in the first person ("what credit score do I need") are still product questions.
+_PERSONAL_RE = re.compile(
+    r"\bmy\s+(own\s+)?(pre-?approved\s+)?(limit|offer|eligibility|application|status|score|credit\s+score|cibil|emi|kyc)\b"
+    r"|\b(am\s+i|i\s+am|i'?m)\s+eligible\s+for\s+(the\s+)?(max|maximum|full|highest)\b"
+    r"|\b(i|me|my)\b.*(₹|\d)",
+    re.IGNORECASE,
+)
+_STOPWORDS = {
+    "a", "an", "the", "is", "are", "am", "be", "will", "do", "does", "did", "i", "me", "my", "you", "your",
+    "we", "our", "it", "this", "that", "to", "of", "for", "on", "in", "at", "with", "and", "or", "any",
+    "can", "could", "would", "should", "please", "what", "whats", "which", "who", "there", "get", "tell",
+    "about", "have", "has", "need", "want", "know", "s", "so", "if", "hi", "hello", "ok",
+    "needed", "required", "require",
+}
+_SYNONYMS = {
+    "max": "maximum", "highest": "maximum", "min": "minimum", "lowest": "minimum", "smallest": "minimum",
+    "roi": "interest", "payslip": "salary", "duration": "tenure", "period": "tenure", "repay": "repayment",
+    "paperwork": "document", "installment": "emi", "criterion": "eligibility", "criteria": "eligibility",
+    "eligible": "eligibility",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(_SYNONYMS.get(token, token))
+    return tokens
+
+
+@dataclass
+class FaqMatch:
+    entry_id: str
+    answer: str
+    score: float
+    coverage: float
+    confident: bool
+
+
+class BM25Index:
+    """BM25 over short passages; each passage belongs to one FAQ entry."""
+
+    def __init__(self, passages: List[Tuple[str, List[str]]]):
+        # passages: (entry_id, tokens)
+        self.doc_entry = [entry_id for entry_id, _ in passages]
+        self.doc_len = [len(tokens) for _, tokens in passages]
+        self.avgdl = sum(self.doc_len) / len(passages) if passages else 1.0
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        for doc, (_, tokens) in enumerate(passages):
+            for term, tf in Counter(tokens).items():
+                self.postings.setdefault(term, []).append((doc, tf))
+        self._compute_idf()
+
+    def _compute_idf(self):
+        n = len(self.doc_entry)
+        self.idf = {t: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for t, p in self.postings.items()}
+        self.max_idf = max(self.idf.values(), default=1.0)
+
+    def to_dict(self) -> Dict:
+        return {"doc_entry": self.doc_entry, "doc_len": self.doc_len, "postings": self.postings}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "BM25Index":
+        index = cls([])
+        index.doc_entry = data["doc_entry"]
+        index.doc_len = data["doc_len"]
+        index.avgdl = sum(index.doc_len) / len(index.doc_len) if index.doc_len else 1.0
+        index.postings = {t: [tuple(p) for p in postings] for t, postings in data["postings"].items()}
+        index._compute_idf()
+        return index
+
+    def search(self, tokens: List[str]) -> List[Tuple[str, float, float]]:
+        """(entry_id, best passage score, coverage of the query by that passage), best first."""
+        terms = set(tokens)
+        scores: Dict[int, float] = {}
+        matched: Dict[int, float] = {}
+        for term in terms:
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc, tf in self.postings[term]:
+                norm = tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len[doc] / self.avgdl))
+                scores[doc] = scores.get(doc, 0.0) + idf * norm
+                matched[doc] = matched.get(doc, 0.0) + idf
+        # Terms the corpus has never seen count as fully informative misses
+        query_weight = sum(self.idf.get(t, self.max_idf) for t in terms) or 1.0
+
+        best: Dict[str, Tuple[float, float]] = {}
+        for doc, score in scores.items():
+            entry_id = self.doc_entry[doc]
+            if entry_id not in best or score > best[entry_id][0]:
+                best[entry_id] = (score, matched[doc] / query_weight)
+        return sorted(((e, s, c) for e, (s, c) in best.items()), key=lambda r: -r[1])
+
+
+class FaqIndex:
+    def __init__(self, corpus_path: str = CORPUS_PATH, index_path: str = FAQ_INDEX_PATH):
+        self.corpus_path = corpus_path
+        self.index_path = index_path
+        self.answers: Dict[str, str] = {}
+        self.index = BM25Index([])
+        self._lock = threading.Lock()
+        self.metrics = {"queries": 0, "confident": 0, "context_only": 0, "no_match": 0, "total_query_us": 0.0}
+        self.loaded_from_cache = False
+        self.load()
+
+    def load(self):
+        with open(self.corpus_path, "rb") as f:
+            raw = f.read()
+        corpus = json.loads(raw)
+        fingerprint = hashlib.sha1(raw + f"|{INDEX_FORMAT}".encode()).hexdigest()
+        answers = {entry["id"]: entry["answer"] for entry in corpus}
+
+        index = self._read_cache(fingerprint)
+        self.loaded_from_cache = index is not None
+        if index is None:
+            passages = []
+            for entry in corpus:
+                for question in entry["questions"]:
+                    passages.append((entry["id"], tokenize(question)))
+                # The answer text (without template fields) is a passage too
+                passages.append((entry["id"], tokenize(re.sub(r"\{[^}]*\}", " ", entry["answer"]))))
+            index = BM25Index(passages)
+            self._write_cache(fingerprint, index)
+
+        with self._lock:
+            self.answers = answers
+            self.index = index
+
+    def _read_cache(self, fingerprint: str) -> Optional[BM25Index]:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("fingerprint") == fingerprint:
+                return BM25Index.from_dict(data["index"])
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring unreadable FAQ index cache: {e}")
+        return None
+
+    def _write_cache(self, fingerprint: str, index: BM25Index):
+        try:
+            os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+            with open(self.index_path, "w", encoding="utf-8") as f:
+                json.dump({"fingerprint": fingerprint, "index": index.to_dict()}, f)
+        except OSError as e:
+            print(f"Could not cache FAQ index: {e}")
+
+    def _fill(self, template: str) -> str:
+        product = PRODUCT_CATALOG["personal_loan"]
+        thresholds = get_policy().thresholds
+        return template.format(
+            **{**product, "features": ", ".join(product["features"])},
+            min_credit_score=thresholds.get("min_credit_score", 700),
+            max_limit_multiple=thresholds.get("max_limit_multiple", 2),
+            max_emi_to_income_pct=thresholds.get("max_emi_to_income", 0.5) * 100,
+        )
+
+    def query(self, text: str, k: int = 2) -> List[FaqMatch]:
+        """Top-k FAQ matches; the first is marked confident when it is safe to answer without the LLM."""
+        started = time.perf_counter()
+        with self._lock:
+            index, answers = self.index, self.answers
+        ranked = index.search(tokenize(text))[:max(k, 2)]
+        personal = _PERSONAL_RE.search(text) is not None
+        matches = []
+        for i, (entry_id, score, coverage) in enumerate(ranked[:k]):
+            runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+            confident = i == 0 and not personal and coverage >= FAQ_MIN_COVERAGE and score >= FAQ_MIN_MARGIN * runner_up
+            matches.append(FaqMatch(entry_id, self._fill(answers[entry_id]), round(score, 3), round(coverage, 3), confident))
+
+        elapsed_us = (time.perf_counter() - started) * 1e6
+        with self._lock:
+            self.metrics["queries"] += 1
+            self.metrics["total_query_us"] += elapsed_us
+            if not matches:
+                self.metrics["no_match"] += 1
+            elif matches[0].confident:
+                self.metrics["confident"] += 1
+            else:
+                self.metrics["context_only"] += 1
+        return matches
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            m = dict(self.metrics)
+        queries = m["queries"]
+        return {
+            **m,
+            "total_query_us": round(m["total_query_us"], 1),
+            "avg_query_us": round(m["total_query_us"] / queries, 1) if queries else 0.0,
+            "confident_rate": round(m["confident"] / queries, 4) if queries else 0.0,
+            "entries": len(self.answers),
+            "passages": len(self.index.doc_entry),
+            "loaded_from_cache": self.loaded_from_cache,
+        }
+
+
+# Singleton instance
+faq_index = FaqIndex()
@@ -0,0 +1,199 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.session_codec import AGENT_CODES, FIELD_ORDER
+
+# Streaming funnel analytics.
+#
+# StateManager.save_state reports every saved record together with the one it
+# replaces; agent transitions, approvals, rejections and sanctions are folded
+# into fixed-size time buckets as they happen. Queries only sum the buckets in
+# the requested window, so their cost does not depend on how many sessions
+# exist (no scan of GLOBAL_STATE_STORE).
+#
+# Per-session bookkeeping (current stage, when it was entered, stages already
+# counted) is kept in a bounded LRU so a session is counted once per stage even
+# if it loops back, e.g. SALES -> UNDERWRITING -> SALES -> UNDERWRITING.
+# Approvals are counted here too, once per session; record_decision only counts
+# underwriting's other outcomes.
+#
+# The sanction rate is a cohort rate: a sanction is also credited to the bucket
+# in which its session reached UNDERWRITING, so numerator and denominator of a
+# window cover the same sessions.
+
+FUNNEL_BUCKET_SECONDS = int(os.getenv("FUNNEL_BUCKET_SECONDS", "3600"))
+FUNNEL_RETENTION_BUCKETS = int(os.getenv("FUNNEL_RETENTION_BUCKETS", str(24 * 7)))
+FUNNEL_MAX_TRACKED_SESSIONS = int(os.getenv("FUNNEL_MAX_TRACKED_SESSIONS", os.getenv("SESSION_MAX_COUNT", "10000")))
+
+STAGES = [role.value for role in AGENT_CODES]
+_UNDERWRITING = STAGES.index("UNDERWRITING")
+_APPROVED_BIT = 1 << len(STAGES)  # in the per-session "counted" mask, after the stage bits
+
+_AGENT = FIELD_ORDER.index("current_agent")
+_APPROVED = FIELD_ORDER.index("is_approved")
+_SANCTION_URL = FIELD_ORDER.index("sanction_letter_url")
+_LOAN_AMOUNT = FIELD_ORDER.index("loan_amount")
+
+
+class _Bucket:
+    __slots__ = (
+        "reached", "stage_seconds", "stage_exits", "decisions", "rejection_reasons",
+        "sanctioned", "sanctioned_amount", "cohort_sanctioned",
+    )
+
+    def __init__(self):
+        self.reached: Dict[str, int] = {}
+        self.stage_seconds: Dict[str, float] = {}
+        self.stage_exits: Dict[str, int] = {}
+        self.decisions: Dict[str, int] = {}
+        self.rejection_reasons: Dict[str, int] = {}
+        self.sanctioned = 0
+        self.sanctioned_amount = 0.0
+        self.cohort_sanctioned = 0  # sanctions of sessions that reached UNDERWRITING in this bucket
+
+
+def _bump(counter: Dict[str, Any], key: str, amount=1):
+    counter[key] = counter.get(key, 0) + amount
+
+
+class FunnelAnalytics:
+    def __init__(
+        self,
+        bucket_seconds: int = FUNNEL_BUCKET_SECONDS,
+        retention_buckets: int = FUNNEL_RETENTION_BUCKETS,
+        max_sessions: int = FUNNEL_MAX_TRACKED_SESSIONS,
+    ):
+        self.bucket_seconds = bucket_seconds
+        self.retention_buckets = retention_buckets
+        self.max_sessions = max_sessions
+        self._buckets: "OrderedDict[int, _Bucket]" = OrderedDict()  # bucket start -> counters, oldest first
+        # session_id -> (stage index, entered_at, bitmask of stages already counted,
+        #                start of the bucket in which it reached UNDERWRITING or None)
+        self._sessions: "OrderedDict[str, Tuple[int, float, int, Optional[int]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _bucket_start(self, now: float) -> int:
+        return int(now // self.bucket_seconds) * self.bucket_seconds
+
+    def _bucket(self, now: float) -> _Bucket:
+        start = self._bucket_start(now)
+        bucket = self._buckets.get(start)
+        if bucket is None:
+            bucket = self._buckets[start] = _Bucket()
+            while len(self._buckets) > self.retention_buckets:
+                self._buckets.popitem(last=False)
+        return bucket
+
+    # --- Recording ---
+
+    def observe(self, session_id: str, previous: Optional[Tuple], record: Tuple, now: Optional[float] = None):
+        """Fold one saved session record into the counters (called from StateManager.save_state)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            bucket = self._bucket(now)
+            tracked = self._sessions.get(session_id)
+            stage = record[_AGENT]
+
+            if tracked is None:
+                # New session, or one we stopped tracking: count the stage it is in now
+                self._enter(bucket, session_id, stage, now, 0, None)
+            elif tracked[0] != stage:
+                old_stage, entered_at, counted, cohort = tracked
+                name = STAGES[old_stage]
+                _bump(bucket.stage_seconds, name, now - entered_at)
+                _bump(bucket.stage_exits, name)
+                self._enter(bucket, session_id, stage, now, counted, cohort)
+            else:
+                self._sessions.move_to_end(session_id)
+
+            if previous is not None:
+                stage, entered_at, counted, cohort = self._sessions[session_id]
+                if record[_APPROVED] and not previous[_APPROVED] and not counted & _APPROVED_BIT:
+                    _bump(bucket.reached, "APPROVED")
+                    self._sessions[session_id] = (stage, entered_at, counted | _APPROVED_BIT, cohort)
+                if record[_SANCTION_URL] and record[_SANCTION_URL] != previous[_SANCTION_URL]:
+                    bucket.sanctioned += 1
+                    bucket.sanctioned_amount += record[_LOAN_AMOUNT] or 0.0
+                    cohort_bucket = self._buckets.get(cohort) if cohort is not None else None
+                    if cohort_bucket is not None:
+                        cohort_bucket.cohort_sanctioned += 1
+
+    def _enter(self, bucket: _Bucket, session_id: str, stage: int, now: float, counted: int, cohort: Optional[int]):
+        if not counted & (1 << stage):
+            _bump(bucket.reached, STAGES[stage])
+            counted |= 1 << stage
+            if stage == _UNDERWRITING:
+                cohort = self._bucket_start(now)
+        self._sessions[session_id] = (stage, now, counted, cohort)
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    def record_decision(self, outcome: str, rule_id: str, now: Optional[float] = None):
+        """Underwriting outcome; rejections are also counted by the rule that fired."""
+        if outcome == "APPROVE":
+            # Counted per session by observe() when is_approved flips
+            return
+        now = time.time() if now is None else now
+        with self._lock:
+            bucket = self._bucket(now)
+            _bump(bucket.decisions, outcome)
+            if outcome == "REJECT":
+                _bump(bucket.rejection_reasons, rule_id)
+
+    # --- Queries ---
+
+    def summary(self, hours: float = 24, series: bool = False, now: Optional[float] = None) -> Dict[str, Any]:
+        """Funnel totals over the last `hours` (whole buckets); optionally the per-bucket series too."""
+        now = time.time() if now is None else now
+        since = int((now - hours * 3600) // self.bucket_seconds) * self.bucket_seconds
+        total = _Bucket()
+        points = []
+        with self._lock:
+            for start, bucket in self._buckets.items():
+                if start < since:
+                    continue
+                for name in ("reached", "stage_seconds", "stage_exits", "decisions", "rejection_reasons"):
+                    merged = getattr(total, name)
+                    for key, value in getattr(bucket, name).items():
+                        _bump(merged, key, value)
+                total.sanctioned += bucket.sanctioned
+                total.sanctioned_amount += bucket.sanctioned_amount
+                total.cohort_sanctioned += bucket.cohort_sanctioned
+                if series:
+                    points.append({
+                        "start": start,
+                        "reached": dict(bucket.reached),
+                        "sanctioned": bucket.sanctioned,
+                        "sanctioned_amount": round(bucket.sanctioned_amount, 2),
+                    })
+            tracked = len(self._sessions)
+
+        started = total.reached.get(STAGES[0], 0)
+        underwriting = total.reached.get("UNDERWRITING", 0)
+        result = {
+            "window": {"from": since, "to": now, "bucket_seconds": self.bucket_seconds},
+            "stages": {name: total.reached.get(name, 0) for name in STAGES + ["APPROVED"]},
+            "conversion_from_start": {
+                name: round(total.reached.get(name, 0) / started, 4) if started else None
+                for name in STAGES[1:] + ["APPROVED"]
+            },
+            "sanction_rate_from_underwriting": round(total.cohort_sanctioned / underwriting, 4) if underwriting else None,
+            "avg_stage_seconds": {
+                name: round(total.stage_seconds[name] / total.stage_exits[name], 2) for name in total.stage_exits
+            },
+            "decisions": {**total.decisions, "APPROVE": total.reached.get("APPROVED", 0)},
+            "rejection_reasons": total.rejection_reasons,
+            "sanctioned": {"count": total.sanctioned, "amount": round(total.sanctioned_amount, 2)},
+            "tracked_sessions": tracked,
+        }
+        if series:
+            result["series"] = points
+        return result
+
+
+# Singleton instance
+funnel_analytics = FunnelAnalytics()
@@ -0,0 +1,302 @@
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Set, Tuple
+
+# Lightweight local intent classifier for MasterAgent routing.
+# Clear-cut messages ("hi", "I need a loan") are resolved locally in
+# microseconds; anything ambiguous falls back to the LLM, and the LLM's
+# routing decision is logged as a labelled example for the next retrain.
+#
+# Logged examples are redacted first (numbers, e-mails, PANs and any word not
+# in the seed vocabulary are replaced by placeholders), the log is capped at
+# INTENT_LOG_MAX_EXAMPLES, and retraining runs on a background thread.
+
+GREETING = "GREETING"
+LOAN_INTEREST = "LOAN_INTEREST"
+OTHER = "OTHER"
+INTENTS = [GREETING, LOAN_INTEREST, OTHER]
+
+SEED_PATH = os.path.join(os.path.dirname(__file__), "intent_seed.json")
+INTENT_LOG_PATH = os.getenv("INTENT_LOG_PATH", "logs/intent_turns.jsonl")
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.85"))
+INTENT_RETRAIN_EVERY = int(os.getenv("INTENT_RETRAIN_EVERY", "50"))
+# Most recent logged examples kept (and trained on) alongside the seed set
+INTENT_LOG_MAX_EXAMPLES = int(os.getenv("INTENT_LOG_MAX_EXAMPLES", "5000"))
+
+_GREETING_RE = re.compile(
+    r"^\s*(hi+|hello+|hey+|hiya|namaste|greetings|good\s+(morning|afternoon|evening))"
+    r"(\s+(there|team|hive( capital)?))?\s*[!.,]*\s*$",
+    re.IGNORECASE,
+)
+# Keyword hints; they become model features, not verdicts (e.g. "I already have a loan, just browsing")
+_LOAN_RE = re.compile(r"\b(loan|loans|borrow|emi|lakh|lakhs|pre-?approved)\b", re.IGNORECASE)
+_NEGATION_RE = re.compile(r"\b(no|not|don't|dont|never|stop)\b", re.IGNORECASE)
+_TOKEN_RE = re.compile(r"[a-z0-9_']+")
+_NUMBER_RE = re.compile(r"^\d+$")
+
+NUM_TOKEN = "_num_"
+UNK_TOKEN = "_unk_"
+_PII_PATTERNS = [
+    (re.compile(r"\S+@\S+"), " _email_ "),
+    (re.compile(r"\b[a-z]{5}[0-9]{4}[a-z]\b", re.IGNORECASE), " _pan_ "),
+]
+
+
+@dataclass
+class IntentResult:
+    label: str
+    confidence: float
+    source: str  # "regex" or "model"
+
+    @property
+    def confident(self) -> bool:
+        return self.confidence >= INTENT_CONFIDENCE_THRESHOLD
+
+
+def _tokens(text: str) -> List[str]:
+    return [NUM_TOKEN if _NUMBER_RE.match(t) else t for t in _TOKEN_RE.findall(text.lower())]
+
+
+def _features(text: str) -> List[str]:
+    tokens = _tokens(text)
+    features = tokens + [f"{a}_{b}" for a, b in zip(tokens, tokens[1:])]
+    if _LOAN_RE.search(text):
+        features.append("_loan_keyword_")
+        if _NEGATION_RE.search(text):
+            features.append("_negated_loan_keyword_")
+    return features
+
+
+def redact(text: str, vocabulary: Set[str]) -> str:
+    """Text reduced to tokens the seed set already knows; everything else (names, numbers, PANs...) is a placeholder."""
+    for pattern, placeholder in _PII_PATTERNS:
+        text = pattern.sub(placeholder, text)
+    return " ".join(t if t in vocabulary or t.startswith("_") else UNK_TOKEN for t in _tokens(text))
+
+
+class TfidfLinearModel:
+    """TF-IDF (unigrams + bigrams) into a softmax linear classifier trained with SGD."""
+
+    def __init__(self, epochs: int = 30, learning_rate: float = 0.5, l2: float = 1e-4):
+        self.epochs = epochs
+        self.learning_rate = learning_rate
+        self.l2 = l2
+        self.idf: Dict[str, float] = {}
+        self.weights: Dict[str, Dict[str, float]] = {label: {} for label in INTENTS}
+        self.bias: Dict[str, float] = {label: 0.0 for label in INTENTS}
+
+    def _vectorize(self, text: str) -> Dict[str, float]:
+        counts = Counter(f for f in _features(text) if f in self.idf)
+        vec = {f: c * self.idf[f] for f, c in counts.items()}
+        norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+        return {f: v / norm for f, v in vec.items()}
+
+    def _scores(self, vec: Dict[str, float]) -> Dict[str, float]:
+        scores = {}
+        for label in INTENTS:
+            w = self.weights[label]
+            scores[label] = self.bias[label] + sum(w.get(f, 0.0) * v for f, v in vec.items())
+        top = max(scores.values())
+        exp = {label: math.exp(s - top) for label, s in scores.items()}
+        total = sum(exp.values())
+        return {label: e / total for label, e in exp.items()}
+
+    def fit(self, examples: List[Tuple[str, str]]):
+        doc_freq = Counter()
+        for text, _ in examples:
+            doc_freq.update(set(_features(text)))
+        n = len(examples)
+        self.idf = {f: math.log((1 + n) / (1 + df)) + 1 for f, df in doc_freq.items()}
+
+        data = [(self._vectorize(text), label) for text, label in examples]
+        self.weights = {label: {} for label in INTENTS}
+        self.bias = {label: 0.0 for label in INTENTS}
+        for epoch in range(self.epochs):
+            lr = self.learning_rate / (1 + epoch * 0.1)
+            for vec, target in data:
+                probs = self._scores(vec)
+                for label in INTENTS:
+                    grad = probs[label] - (1.0 if label == target else 0.0)
+                    w = self.weights[label]
+                    for f, v in vec.items():
+                        w[f] = w.get(f, 0.0) * (1 - lr * self.l2) - lr * grad * v
+                    self.bias[label] -= lr * grad
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        vec = self._vectorize(text)
+        if not vec:
+            return OTHER, 0.0
+        probs = self._scores(vec)
+        label = max(probs, key=probs.get)
+        return label, probs[label]
+
+
+class IntentClassifier:
+    def __init__(self, seed_path: str = SEED_PATH, log_path: str = INTENT_LOG_PATH):
+        self.seed_path = seed_path
+        self.log_path = log_path
+        self.model = TfidfLinearModel()
+        self._lock = threading.Lock()  # metrics, model swap, retrain bookkeeping
+        self._log_lock = threading.Lock()  # appends vs. log compaction
+        self._new_examples = 0
+        self._retraining = False
+        self.metrics = {
+            "classified": 0,
+            "resolved_locally": 0,
+            "llm_fallbacks": 0,
+            "sales_checks": 0,
+            "llm_labelled": 0,
+            "llm_agreements": 0,
+            "total_classify_us": 0.0,
+            "training_examples": 0,
+            "retrains": 0,
+        }
+        with open(self.seed_path, "r", encoding="utf-8") as f:
+            self._seed = [(e["text"], e["intent"]) for e in json.load(f)]
+        self._vocabulary = {t for text, _ in self._seed for t in _tokens(text)}
+        self.retrain()
+
+    def _load_log(self) -> List[Tuple[str, str]]:
+        """Most recent logged examples; rewrites the log when it is over the cap or holds unredacted lines."""
+        with self._log_lock:
+            if not os.path.exists(self.log_path):
+                return []
+            examples, rewrite = [], False
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        e = json.loads(line)
+                        text = redact(e["text"], self._vocabulary)
+                        rewrite = rewrite or text != e["text"]
+                        examples.append((text, e["intent"]))
+                    except (ValueError, KeyError):
+                        rewrite = True
+            if len(examples) > INTENT_LOG_MAX_EXAMPLES:
+                examples = examples[-INTENT_LOG_MAX_EXAMPLES:]
+                rewrite = True
+            if rewrite:
+                try:
+                    tmp_path = self.log_path + ".tmp"
+                    with open(tmp_path, "w", encoding="utf-8") as f:
+                        f.writelines(json.dumps({"text": t, "intent": i}) + "\n" for t, i in examples)
+                    os.replace(tmp_path, self.log_path)
+                except OSError as e:
+                    print(f"Could not compact intent log: {e}")
+            return examples
+
+    def retrain(self):
+        with self._lock:
+            self._new_examples = 0
+        examples = self._seed + self._load_log()
+        model = TfidfLinearModel()
+        model.fit(examples)
+        with self._lock:
+            self.model = model
+            self.metrics["training_examples"] = len(examples)
+            self.metrics["retrains"] += 1
+
+    def _retrain_in_background(self):
+        try:
+            self.retrain()
+        except Exception as e:
+            print(f"Intent classifier retrain failed: {e}")
+        finally:
+            with self._lock:
+                self._retraining = False
+
+    def classify(self, text: str, count_as_routing: bool = True) -> IntentResult:
+        """
+        count_as_routing=False for callers that only peek at the intent (SalesAgent); those
+        calls are counted separately so they do not inflate the routing skip rate.
+        """
+        started = time.perf_counter()
+        result = self._classify(text)
+        elapsed_us = (time.perf_counter() - started) * 1e6
+        with self._lock:
+            if not count_as_routing:
+                self.metrics["sales_checks"] += 1
+                return result
+            self.metrics["classified"] += 1
+            self.metrics["total_classify_us"] += elapsed_us
+            if result.confident:
+                self.metrics["resolved_locally"] += 1
+            else:
+                self.metrics["llm_fallbacks"] += 1
+        return result
+
+    def _classify(self, text: str) -> IntentResult:
+        # 1. Regex for the unambiguous case: a bare greeting
+        if _GREETING_RE.match(text):
+            return IntentResult(GREETING, 1.0, "regex")
+
+        # 2. Statistical model for everything else (loan keywords are features of it)
+        label, confidence = self.model.predict(text)
+        return IntentResult(label, confidence, "model")
+
+    def record_llm_label(self, text: str, predicted: IntentResult, routed_to_sales: bool, greeted: bool = False):
+        """Log the LLM's routing decision as (redacted) training data and track agreement with our prediction."""
+        if routed_to_sales:
+            label = LOAN_INTEREST
+        elif greeted or _GREETING_RE.match(text):
+            # The LLM answered with a greeting; logging it as OTHER would teach the model greetings are OTHER
+            label = GREETING
+        else:
+            label = OTHER
+        with self._lock:
+            self.metrics["llm_labelled"] += 1
+            # Accuracy is measured on the routing decision, which is what we actually act on
+            if (predicted.label == LOAN_INTEREST) == routed_to_sales:
+                self.metrics["llm_agreements"] += 1
+
+        line = json.dumps({"text": redact(text, self._vocabulary), "intent": label}) + "\n"
+        try:
+            with self._log_lock:
+                os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(line)
+        except OSError as e:
+            print(f"Could not log intent example: {e}")
+            return
+
+        with self._lock:
+            self._new_examples += 1
+            start = self._new_examples >= INTENT_RETRAIN_EVERY and not self._retraining
+            if start:
+                self._retraining = True
+        if start:
+            # Training takes seconds on a large log; never do it on the request path
+            threading.Thread(target=self._retrain_in_background, name="intent-retrain", daemon=True).start()
+
+    def evaluate(self, examples: List[Tuple[str, str]]) -> Dict[str, float]:
+        """Offline accuracy and skip rate over labelled (text, intent) pairs; does not touch live metrics."""
+        correct, confident = 0, 0
+        for text, label in examples:
+            result = self._classify(text)
+            correct += result.label == label
+            confident += result.confident
+        n = len(examples) or 1
+        return {"examples": len(examples), "accuracy": round(correct / n, 4), "skip_rate": round(confident / n, 4)}
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            m = dict(self.metrics)
+        classified = m["classified"]
+        return {
+            **m,
+            "total_classify_us": round(m["total_classify_us"], 1),
+            "skip_rate": round(m["resolved_locally"] / classified, 4) if classified else 0.0,
+            "avg_classify_us": round(m["total_classify_us"] / classified, 1) if classified else 0.0,
+            "routing_accuracy": round(m["llm_agreements"] / m["llm_labelled"], 4) if m["llm_labelled"] else None,
+            "confidence_threshold": INTENT_CONFIDENCE_THRESHOLD,
+            "retraining": self._retraining,
+        }
+
+
+# Singleton instance
+intent_classifier = IntentClassifier()
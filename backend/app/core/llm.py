@@ -1,6 +1,16 @@
+import contextvars
 import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Dict, Optional
 from google import genai
 from dotenv import load_dotenv
+from app.core.llm_scheduler import llm_scheduler, current_priority, LLMOverloaded
+from app.core.profiler import profile_span, profiled_thread
+from app.core.turn_status import mark_degraded
 
 load_dotenv()
 
@@ -23,17 +33,224 @@ except Exception as e:
 # Using a standard robust model.
 MODEL_NAME = "gemini-2.5-flash" 
 
-def generate_text(prompt: str) -> str:
-    """Simple wrapper for text generation."""
-    if not client:
-        return "System Error: LLM Client not initialized (Missing API Key)."
-        
+# Tail latency controls for generate_text:
+# - Every call has an overall deadline; each attempt has its own timeout
+# - Transient failures (timeouts, 429/5xx, connection errors) are retried with jittered backoff
+# - If an attempt is still running after LLM_HEDGE_AFTER_SECONDS (or, when unset, the
+#   observed p95 latency) a duplicate request is sent and the first answer wins
+# - After the primary model's retries, LLM_FALLBACK_MODEL gets one attempt; if that
+#   fails too, the caller's canned fallback response is returned
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "25"))
+LLM_ATTEMPT_TIMEOUT_SECONDS = float(os.getenv("LLM_ATTEMPT_TIMEOUT_SECONDS", "12"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BACKOFF_SECONDS = float(os.getenv("LLM_RETRY_BACKOFF_SECONDS", "0.5"))
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "true").lower() == "true"
+LLM_HEDGE_AFTER_SECONDS = float(os.getenv("LLM_HEDGE_AFTER_SECONDS", "0"))  # 0 = use observed p95
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL", "gemini-2.0-flash-lite")
+
+BUSY_MESSAGE = "We're experiencing very high demand right now. Please give me a moment and send your message again."
+APOLOGY_MESSAGE = "I apologize, but I am having trouble connecting to my brain right now. Please try again later."
+
+_RETRYABLE_MARKERS = ("429", "500", "502", "503", "504", "RESOURCE_EXHAUSTED", "UNAVAILABLE", "DEADLINE_EXCEEDED", "INTERNAL")
+
+# Abandoned (timed out / losing hedge) requests finish in the background and still hold their scheduler slot
+_executor = ThreadPoolExecutor(max_workers=llm_scheduler.max_concurrency + 4, thread_name_prefix="llm")
+_lock = threading.Lock()
+_latencies = deque(maxlen=500)  # successful primary-model request latencies, for the hedge delay
+_call_latencies = deque(maxlen=2000)  # whole generate_text calls, for p95/p99 reporting
+llm_metrics = {
+    "calls": 0,
+    "succeeded": 0,
+    "attempts": 0,
+    "retries": 0,
+    "attempt_timeouts": 0,
+    "hedges": 0,
+    "hedge_wins": 0,
+    "fallback_model_calls": 0,
+    "fallback_model_successes": 0,
+    "canned_fallbacks": 0,
+    "shed": 0,
+}
+
+
+def _count(key: str, n: int = 1):
+    with _lock:
+        llm_metrics[key] += n
+
+
+def _percentile(values, pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def _hedge_delay() -> Optional[float]:
+    if not LLM_HEDGE_ENABLED:
+        return None
+    if LLM_HEDGE_AFTER_SECONDS > 0:
+        return LLM_HEDGE_AFTER_SECONDS
+    with _lock:
+        if len(_latencies) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return _percentile(_latencies, 0.95)
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    return any(marker in str(error) for marker in _RETRYABLE_MARKERS)
+
+
+def _request(model: str, prompt: str) -> str:
+    """One request to the provider. Runs on _executor; the scheduler slot was taken by the caller."""
+    started = time.monotonic()
     try:
-        response = client.models.generate_content(
-            model=MODEL_NAME,
-            contents=prompt
-        )
+        with profiled_thread("llm"):
+            response = client.models.generate_content(
+                model=model,
+                contents=prompt
+            )
+        if model == MODEL_NAME:
+            with _lock:
+                _latencies.append(time.monotonic() - started)
         return response.text
-    except Exception as e:
-        print(f"LLM Generation Error: {e}")
-        return "I apologize, but I am having trouble connecting to my brain right now. Please try again later."
+    finally:
+        llm_scheduler.release()
+
+
+def _submit(model: str, prompt: str):
+    # Run the request with this turn's context so a turn profile also samples the request thread
+    return _executor.submit(contextvars.copy_context().run, _request, model, prompt)
+
+
+def _attempt(model: str, prompt: str, priority: int, budget: float) -> str:
+    """One attempt (possibly hedged) within `budget` seconds. Raises on failure or timeout."""
+    started = time.monotonic()
+    attempt_deadline = started + min(budget, LLM_ATTEMPT_TIMEOUT_SECONDS)
+    llm_scheduler.acquire(priority, max_wait=attempt_deadline - started)
+    _count("attempts")
+    primary = _submit(model, prompt)
+    pending = [primary]
+
+    hedge_delay = _hedge_delay()
+    hedge_at = started + hedge_delay if hedge_delay is not None else None
+    error = None
+    while pending:
+        now = time.monotonic()
+        if now >= attempt_deadline:
+            _count("attempt_timeouts")
+            raise TimeoutError(f"{model} did not answer within {attempt_deadline - started:.1f}s")
+        until = attempt_deadline if hedge_at is None else min(attempt_deadline, hedge_at)
+        done, _ = wait(pending, timeout=max(0.0, until - now), return_when=FIRST_COMPLETED)
+        for future in done:
+            pending.remove(future)
+            try:
+                text = future.result()
+            except Exception as e:
+                error = e
+                continue
+            if future is not primary:
+                _count("hedge_wins")
+            return text
+        if hedge_at is not None and pending and time.monotonic() >= hedge_at:
+            hedge_at = None
+            # Hedges only use spare capacity; they never queue behind other sessions
+            if llm_scheduler.try_acquire():
+                _count("hedges")
+                pending.append(_submit(model, prompt))
+    raise error
+
+
+def generate_text(prompt: str, fallback: Optional[str] = None) -> str:
+    """
+    Text generation with admission control (llm_scheduler), deadlines, retries,
+    hedging and a fallback model. If everything fails, returns `fallback` (the
+    calling agent's canned response) or a generic busy/apology message.
+    """
+    if not client:
+        mark_degraded("llm_unavailable")
+        if fallback is not None:
+            return fallback
+        return "System Error: LLM Client not initialized (Missing API Key)."
+
+    _count("calls")
+    started = time.monotonic()
+    deadline = started + LLM_DEADLINE_SECONDS
+    priority = current_priority.get()
+    models = [MODEL_NAME] * (1 + LLM_MAX_RETRIES)
+    if LLM_FALLBACK_MODEL and LLM_FALLBACK_MODEL != MODEL_NAME:
+        models.append(LLM_FALLBACK_MODEL)
+
+    shed = False
+    for n, model in enumerate(models):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        if model != MODEL_NAME:
+            _count("fallback_model_calls")
+        elif n:
+            _count("retries")
+        try:
+            with profile_span(f"llm_wait {model}"):
+                text = _attempt(model, prompt, priority, remaining)
+        except LLMOverloaded as e:
+            # Over capacity: retrying would only deepen the queue
+            print(f"LLM call shed: {e}")
+            _count("shed")
+            shed = True
+            break
+        except Exception as e:
+            print(f"LLM Generation Error ({model}, attempt {n + 1}): {e}")
+            if "429" in str(e) or "RESOURCE_EXHAUSTED" in str(e):
+                # Over quota despite the bucket: back off everyone instead of hammering the API
+                llm_scheduler.throttle()
+            if not _is_retryable(e):
+                break
+            if n + 1 < len(models):
+                backoff = random.uniform(0, LLM_RETRY_BACKOFF_SECONDS * (2 ** n))
+                with profile_span("llm_backoff"):
+                    time.sleep(max(0.0, min(backoff, deadline - time.monotonic())))
+            continue
+        _count("succeeded")
+        if model != MODEL_NAME:
+            _count("fallback_model_successes")
+        with _lock:
+            _call_latencies.append(time.monotonic() - started)
+        return text
+
+    _count("canned_fallbacks")
+    mark_degraded("llm_shed" if shed else "llm_failed")
+    with _lock:
+        _call_latencies.append(time.monotonic() - started)
+    if fallback is not None:
+        return fallback
+    return BUSY_MESSAGE if shed else APOLOGY_MESSAGE
+
+
+def llm_stats() -> Dict[str, Any]:
+    with _lock:
+        m = dict(llm_metrics)
+        calls = m["calls"] or 1
+        latency_ms = {
+            name: round(value * 1000, 1) if value is not None else None
+            for name, value in (
+                ("p50", _percentile(_call_latencies, 0.50)),
+                ("p95", _percentile(_call_latencies, 0.95)),
+                ("p99", _percentile(_call_latencies, 0.99)),
+            )
+        }
+    hedge_delay = _hedge_delay()
+    return {
+        **m,
+        "retry_rate": round(m["retries"] / calls, 4),
+        "hedge_rate": round(m["hedges"] / calls, 4),
+        "fallback_rate": round((m["fallback_model_calls"] + m["canned_fallbacks"]) / calls, 4),
+        "call_latency_ms": latency_ms,
+        "hedge_after_ms": round(hedge_delay * 1000, 1) if hedge_delay is not None else None,
+        "model": MODEL_NAME,
+        "fallback_model": LLM_FALLBACK_MODEL or None,
+        "deadline_seconds": LLM_DEADLINE_SECONDS,
+        "attempt_timeout_seconds": LLM_ATTEMPT_TIMEOUT_SECONDS,
+    }
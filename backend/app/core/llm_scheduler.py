@@ -0,0 +1,175 @@
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from app.models.session import AgentRole
+
+# Global admission control for Gemini calls.
+# - At most LLM_MAX_CONCURRENCY calls in flight
+# - Token bucket refilled at LLM_RATE_PER_MINUTE (our quota), bursting up to LLM_BURST
+# - Waiting calls are served by priority: late-funnel sessions (verification,
+#   underwriting, sanction) first, then sales, then new MASTER greetings. Waiting
+#   ages a call: every LLM_PRIORITY_AGING_SECONDS in the queue is worth one
+#   priority level, so a steady late-funnel load cannot starve greetings
+#   (0 = strict priority)
+# - A call that cannot be admitted within LLM_MAX_WAIT_SECONDS, or that finds
+#   LLM_MAX_QUEUE callers already waiting, is rejected with LLMOverloaded so the
+#   agent can answer with a "busy" message instead of failing against the quota.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_RATE_PER_MINUTE = float(os.getenv("LLM_RATE_PER_MINUTE", "600"))
+LLM_BURST = int(os.getenv("LLM_BURST", "20"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "200"))
+LLM_MAX_WAIT_SECONDS = float(os.getenv("LLM_MAX_WAIT_SECONDS", "20"))
+LLM_PRIORITY_AGING_SECONDS = float(os.getenv("LLM_PRIORITY_AGING_SECONDS", "5"))
+
+# Lower number = served first
+AGENT_PRIORITY = {
+    AgentRole.VERIFICATION: 0,
+    AgentRole.UNDERWRITING: 0,
+    AgentRole.SANCTION: 0,
+    AgentRole.SALES: 1,
+    AgentRole.MASTER: 2,
+}
+DEFAULT_PRIORITY = AGENT_PRIORITY[AgentRole.MASTER]
+
+# Priority of the request being processed; MasterAgent sets it from the session's current agent
+current_priority: contextvars.ContextVar[int] = contextvars.ContextVar("llm_priority", default=DEFAULT_PRIORITY)
+
+
+class LLMOverloaded(Exception):
+    """Raised when an LLM call is shed instead of queued (queue full or wait deadline passed)."""
+    pass
+
+
+class LLMScheduler:
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        rate_per_minute: float = LLM_RATE_PER_MINUTE,
+        burst: int = LLM_BURST,
+        max_queue: int = LLM_MAX_QUEUE,
+        max_wait_seconds: float = LLM_MAX_WAIT_SECONDS,
+        aging_seconds: float = LLM_PRIORITY_AGING_SECONDS,
+    ):
+        self.max_concurrency = max_concurrency
+        self.rate_per_second = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self.aging_seconds = aging_seconds
+
+        self._cond = threading.Condition()
+        self._waiting = []  # heap of (effective priority, seq)
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+
+        self.metrics = {"admitted": 0, "rejected_queue_full": 0, "rejected_timeout": 0, "throttled": 0, "max_queue_depth": 0}
+        self._waits = {p: deque(maxlen=1000) for p in set(AGENT_PRIORITY.values())}
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate_per_second)
+        self._refilled_at = now
+
+    def acquire(self, priority: int = DEFAULT_PRIORITY, max_wait: Optional[float] = None) -> float:
+        """Blocks until the call may run. Returns the time spent waiting in seconds."""
+        started = time.monotonic()
+        deadline = started + (self.max_wait_seconds if max_wait is None else min(max_wait, self.max_wait_seconds))
+        with self._cond:
+            if len(self._waiting) >= self.max_queue:
+                self.metrics["rejected_queue_full"] += 1
+                raise LLMOverloaded("LLM queue is full")
+            # Priority minus time already waited, expressed against a common clock so the
+            # key never changes once queued: a call enqueued aging_seconds earlier ranks
+            # the same as one a level more urgent
+            rank = priority + started / self.aging_seconds if self.aging_seconds > 0 else priority
+            ticket = (rank, next(self._seq))
+            heapq.heappush(self._waiting, ticket)
+            self.metrics["max_queue_depth"] = max(self.metrics["max_queue_depth"], len(self._waiting))
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    # Only the head of the queue may take a slot, so admission follows the ranking
+                    if self._waiting[0] == ticket and self._in_flight < self.max_concurrency and self._tokens >= 1:
+                        break
+                    if now >= deadline:
+                        self.metrics["rejected_timeout"] += 1
+                        raise LLMOverloaded(f"LLM call not admitted within {self.max_wait_seconds}s")
+                    timeout = deadline - now
+                    if self._waiting[0] == ticket and self._in_flight < self.max_concurrency:
+                        # Waiting for the bucket, not a slot: sleep until the next token
+                        timeout = min(timeout, (1 - self._tokens) / self.rate_per_second)
+                    self._cond.wait(timeout)
+            except BaseException:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                # The head may have changed; let the next waiter re-check
+                self._cond.notify_all()
+                raise
+            heapq.heappop(self._waiting)
+            self._tokens -= 1
+            self._in_flight += 1
+            self.metrics["admitted"] += 1
+            waited = time.monotonic() - started
+            self._waits.setdefault(priority, deque(maxlen=1000)).append(waited)
+            self._cond.notify_all()
+            return waited
+
+    def try_acquire(self) -> bool:
+        """Take a slot only if one is free right now and nobody is queued (used for hedged requests)."""
+        with self._cond:
+            self._refill(time.monotonic())
+            if self._waiting or self._in_flight >= self.max_concurrency or self._tokens < 1:
+                return False
+            self._tokens -= 1
+            self._in_flight += 1
+            self.metrics["admitted"] += 1
+            return True
+
+    def release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def throttle(self):
+        """Called when the provider reports a quota error: drain the bucket so callers back off."""
+        with self._cond:
+            self._tokens = min(self._tokens, 0.0)
+            self.metrics["throttled"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            wait_ms = {}
+            for priority, waits in sorted(self._waits.items()):
+                ordered = sorted(waits)
+                wait_ms[str(priority)] = {
+                    "samples": len(ordered),
+                    "avg": round(sum(ordered) / len(ordered) * 1000, 1) if ordered else 0.0,
+                    "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1) if ordered else 0.0,
+                    "max": round(ordered[-1] * 1000, 1) if ordered else 0.0,
+                }
+            return {
+                "queue_depth": len(self._waiting),
+                "in_flight": self._in_flight,
+                "tokens_available": round(self._tokens, 2),
+                "max_concurrency": self.max_concurrency,
+                "rate_per_minute": self.rate_per_second * 60,
+                "burst": self.burst,
+                "max_queue": self.max_queue,
+                "max_wait_seconds": self.max_wait_seconds,
+                "aging_seconds": self.aging_seconds,
+                "priorities": {role.value: p for role, p in AGENT_PRIORITY.items()},
+                "wait_ms_by_priority": wait_ms,
+                **self.metrics,
+            }
+
+
+# Singleton instance
+llm_scheduler = LLMScheduler()
@@ -1,4 +1,4 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from app.mock.data_generator import mock_db
 
 # Mock Product Catalog (Static)
@@ -18,33 +18,53 @@ PRODUCT_CATALOG = {
     }
 }
 
-# Transform MockDataManager data to match existing structure
+# Transform MockDataManager data to match existing structure.
+# CRM_DATABASE and CREDIT_SCORES are materialized views over mock_db: built once
+# here, then kept current row by row through mock_db's write listener, so a
+# CRM/bureau update costs O(1) instead of a rebuild.
 
 # CRM_DATABASE: Key = Phone, Value = Dict
-CRM_DATABASE = {}
-customers = mock_db.get_all_customers()
-for c in customers:
-    # We assign kyc_status based on something? Let's say random or fixed.
-    # History: "is_existing_customer": True, "kyc_status": "VERIFIED"
-    
-    # Simple logic: If they have a score, they are existing customer?
+CRM_DATABASE: Dict[str, Dict[str, Any]] = {}
+# CREDIT_SCORES: Key = PAN, Value = Int
+CREDIT_SCORES: Dict[str, int] = {}
+
+
+def _crm_row(c: Dict[str, Any]) -> Dict[str, Any]:
+    # Simple logic: If they have a score, they are existing customer
     score = mock_db.get_credit_score(c["id"])
     has_score = score is not None and score > 0
-    
-    CRM_DATABASE[c["phone"]] = {
+    offer = mock_db.get_offer(c["id"])
+    return {
         "name": c["name"],
         "pan": c["pan"],
         "email": c["email"],
         "is_existing_customer": has_score,
         "kyc_status": "VERIFIED" if has_score else "PENDING",
-        "pre_approved_limit": float(mock_db.get_offer(c["id"])["pre_approved_limit"]) if mock_db.get_offer(c["id"]) else 0.0,
+        "pre_approved_limit": float(offer["pre_approved_limit"]) if offer else 0.0,
         "current_salary": float(c["monthly_income"])
     }
 
-# CREDIT_SCORES: Key = PAN, Value = Int
-CREDIT_SCORES = {}
-for c in customers:
-    score = mock_db.get_credit_score(c["id"])
+
+def refresh_customer(customer_id: str, previous: Optional[Dict[str, Any]] = None):
+    """Re-derive one customer's CRM row and score entry (dropping keys it was previously stored under)."""
+    customer = mock_db.get_customer(customer_id)
+    if previous:
+        if not customer or previous["phone"] != customer["phone"]:
+            CRM_DATABASE.pop(previous["phone"], None)
+        if not customer or previous["pan"] != customer["pan"]:
+            CREDIT_SCORES.pop(previous["pan"], None)
+    if not customer:
+        return
+
+    CRM_DATABASE[customer["phone"]] = _crm_row(customer)
+    score = mock_db.get_credit_score(customer_id)
     if score is not None:
-        CREDIT_SCORES[c["pan"]] = score
+        CREDIT_SCORES[customer["pan"]] = score
+    else:
+        CREDIT_SCORES.pop(customer["pan"], None)
+
+
+for c in mock_db.get_all_customers():
+    refresh_customer(c["id"])
 
+mock_db.subscribe(refresh_customer)
@@ -0,0 +1,125 @@
+import asyncio
+import contextvars
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.core.cache import offer_cache, score_cache
+from app.core.customer_search import customer_search
+from app.core.mock_data import CRM_DATABASE
+from app.core.rules_engine import get_policy
+from app.core import service_clients
+from app.core.service_clients import bureau_client, crm_client, offer_client
+from app.mock.data_generator import mock_db
+
+# Customer data that underwriting needs (bureau score, offer, KYC status) is
+# fetched concurrently as soon as the session knows the customer's phone number,
+# so it is already warm when the conversation reaches UNDERWRITING.
+#
+# With SERVICE_MODE=http every fetch goes through the pooled service clients;
+# otherwise the in-process mock data is read directly. Agents read customer data
+# only through these functions, never from mock_db/CRM_DATABASE.
+
+# Event loop serving the current request. Agents run in worker threads
+# (asyncio.to_thread copies this context), so run_blocking can hand the fetch
+# coroutines back to the loop that owns the service clients and caches.
+agent_loop: contextvars.ContextVar[Optional[asyncio.AbstractEventLoop]] = contextvars.ContextVar("agent_loop", default=None)
+
+
+def run_blocking(coro):
+    """Run a fetch coroutine from an agent worker thread and wait for its result."""
+    loop = agent_loop.get()
+    if loop is not None and loop.is_running():
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+    # Not under MasterAgent (scripts, tests): run it on a private loop
+    return asyncio.run(coro)
+
+
+def _invalidate_cached(customer_id: str, previous: Optional[Dict[str, Any]] = None):
+    # A CRM write or score refresh changes the derived offer; drop cached copies so the next fetch sees it
+    score_cache.invalidate(customer_id)
+    offer_cache.invalidate(customer_id)
+
+
+mock_db.subscribe(_invalidate_cached)
+
+
+async def fetch_customer(phone: str) -> Optional[Dict[str, Any]]:
+    if service_clients.SERVICE_MODE == "http":
+        return await crm_client.get_customer_by_phone(phone)
+    return mock_db.get_customer_by_phone(phone)
+
+
+async def search_customers(query: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """CRM search: phone (full or last 4+ digits), exact PAN or typo-tolerant name."""
+    if service_clients.SERVICE_MODE == "http":
+        return await crm_client.search(query, limit)
+    return customer_search.search(query, limit)
+
+
+async def search_customer_by_phone(phone: str) -> Optional[Dict[str, Any]]:
+    """Customer whose last 10 digits match `phone`, via the search index."""
+    for hit in await search_customers(phone):
+        # A shorter suffix (score < 1) is a hint, not an identity match
+        if hit["match"] == "phone" and hit["score"] >= 1.0:
+            return hit["customer"]
+    return None
+
+
+async def fetch_customer_by_pan(pan: str) -> Optional[Dict[str, Any]]:
+    for hit in await search_customers(pan, limit=1):
+        if hit["match"] == "pan":
+            return hit["customer"]
+    return None
+
+
+async def _load_credit_score(customer_id: str) -> Optional[int]:
+    if service_clients.SERVICE_MODE == "http":
+        return await bureau_client.get_credit_score(customer_id)
+    return mock_db.get_credit_score(customer_id)
+
+
+async def _load_offer(customer_id: str) -> Optional[Dict[str, Any]]:
+    if service_clients.SERVICE_MODE == "http":
+        return await offer_client.get_offer(customer_id)
+    return mock_db.get_offer(customer_id)
+
+
+async def fetch_credit_score(customer_id: str) -> Optional[int]:
+    # Bureau pulls are billed, so serve repeats from cache and coalesce concurrent ones
+    return await score_cache.get_or_load(customer_id, lambda: _load_credit_score(customer_id))
+
+
+async def fetch_offer(customer_id: str) -> Optional[Dict[str, Any]]:
+    return await offer_cache.get_or_load(customer_id, lambda: _load_offer(customer_id))
+
+
+async def fetch_kyc_status(customer: Dict[str, Any]) -> Optional[str]:
+    if service_clients.SERVICE_MODE == "http":
+        return await crm_client.get_kyc_status(customer["id"])
+    record = CRM_DATABASE.get(customer["phone"])
+    return record["kyc_status"] if record else None
+
+
+async def prefetch_customer_data(phone: str) -> Dict[str, Any]:
+    """Resolve the phone once, then fetch score, offer and KYC status concurrently."""
+    customer = await fetch_customer(phone)
+
+    score, offer, kyc_status = None, None, None
+    if customer:
+        score, offer, kyc_status = await asyncio.gather(
+            fetch_credit_score(customer["id"]),
+            fetch_offer(customer["id"]),
+            fetch_kyc_status(customer),
+        )
+
+    return {
+        "crm_phone": customer["phone"] if customer else None,
+        "customer_id": customer["id"] if customer else None,
+        "pan": customer["pan"] if customer else None,
+        "credit_score": score if score is not None else get_policy().default_score,
+        "pre_approved_limit": float(offer["pre_approved_limit"]) if offer else 0.0,
+        "interest_rate": float(offer["interest_rate"]) if offer else None,
+        "current_salary": float(customer["monthly_income"]) if customer else 0.0,
+        "kyc_status": kyc_status,
+        "fetched_at": datetime.now().isoformat(),
+    }
@@ -0,0 +1,264 @@
+import asyncio
+import contextvars
+import glob
+import hmac
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+# Opt-in statistical profiler for /chat turns.
+#
+# Profiling is off unless PROFILE_ENABLED=true. A turn is then profiled when
+# the request carries "X-Profile: <PROFILE_SECRET>" or is picked by
+# PROFILE_SAMPLE_RATE. While it runs, a sampler thread records the Python
+# stacks of the threads serving the turn (the event loop, the worker threads
+# agent code runs on and the LLM request threads) every PROFILE_INTERVAL_MS.
+# Time spent waiting on the LLM is also recorded as explicit spans. The result
+# is written to PROFILE_DIR as a speedscope file (https://speedscope.app) or
+# as collapsed stacks for flamegraph.pl / inferno; only the newest
+# PROFILE_MAX_FILES files younger than PROFILE_MAX_AGE_SECONDS are kept.
+#
+# When a turn is not profiled the only cost is a header check, one random()
+# call and a contextvar lookup per span.
+#
+# Note: the event loop thread is shared, so under concurrent load its samples
+# can include other requests' work.
+
+PROFILE_ENABLED = os.getenv("PROFILE_ENABLED", "false").lower() == "true"
+PROFILE_SECRET = os.getenv("PROFILE_SECRET", "")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_FORMAT = os.getenv("PROFILE_FORMAT", "speedscope")  # "speedscope" or "collapsed"
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+PROFILE_MAX_AGE_SECONDS = float(os.getenv("PROFILE_MAX_AGE_SECONDS", str(24 * 3600)))
+PROFILE_MAX_DEPTH = 128
+
+Frame = Tuple[str, str, int]  # (filename, function, first line)
+
+
+class TurnProfile:
+    def __init__(self, label: str, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.label = label
+        self.interval = interval_ms / 1000
+        self.started = time.perf_counter()
+        self.ended: Optional[float] = None
+        self.path: Optional[str] = None
+        self.threads: Dict[int, str] = {}  # thread ident -> label
+        self.samples: List[Tuple[str, float, Tuple[Frame, ...]]] = []  # (thread, at, stack root-first)
+        self.spans: List[Tuple[str, str, float, float]] = []  # (thread, name, start, end)
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._run, name="turn-profiler", daemon=True)
+
+    def add_thread(self, ident: int, label: str):
+        self.threads[ident] = label
+
+    def start(self):
+        self._sampler.start()
+
+    def stop(self):
+        self.ended = time.perf_counter()
+        self._stop.set()
+        self._sampler.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            at = time.perf_counter() - self.started
+            for ident, thread_label in list(self.threads.items()):
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.samples.append((thread_label, at, _stack(frame)))
+
+    # --- Output ---
+
+    def write(self, directory: str = PROFILE_DIR, fmt: str = PROFILE_FORMAT) -> str:
+        os.makedirs(directory, exist_ok=True)
+        safe_label = re.sub(r"[^A-Za-z0-9_.-]", "_", self.label)[:64]
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        if fmt == "collapsed":
+            path = os.path.join(directory, f"{stamp}_{safe_label}.folded")
+            content = self.to_collapsed()
+        else:
+            path = os.path.join(directory, f"{stamp}_{safe_label}.speedscope.json")
+            content = json.dumps(self.to_speedscope())
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        return path
+
+    def to_collapsed(self) -> str:
+        counts: Dict[str, int] = {}
+        for thread_label, _, stack in self.samples:
+            key = ";".join([thread_label] + [_frame_name(f) for f in stack])
+            counts[key] = counts.get(key, 0) + 1
+        for thread_label, name, start, end in self.spans:
+            # Spans become synthetic stacks weighted by their duration in samples
+            key = f"{thread_label};[span] {name}"
+            counts[key] = counts.get(key, 0) + max(1, round((end - start) / self.interval))
+        return "\n".join(f"{key} {count}" for key, count in sorted(counts.items())) + "\n"
+
+    def to_speedscope(self) -> Dict:
+        frames: List[Dict] = []
+        index: Dict[Frame, int] = {}
+
+        def frame_index(frame: Frame) -> int:
+            if frame not in index:
+                index[frame] = len(frames)
+                filename, name, line = frame
+                frames.append({"name": name, "file": filename, "line": line})
+            return index[frame]
+
+        end_ms = ((self.ended or time.perf_counter()) - self.started) * 1000
+        interval_ms = self.interval * 1000
+        profiles = []
+        for thread_label in sorted({t for t, _, _ in self.samples}):
+            samples, weights = [], []
+            for label, _, stack in self.samples:
+                if label == thread_label:
+                    samples.append([frame_index(f) for f in stack])
+                    weights.append(interval_ms)
+            profiles.append({
+                "type": "sampled",
+                "name": thread_label,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": end_ms,
+                "samples": samples,
+                "weights": weights,
+            })
+
+        if self.spans:
+            events = []
+            for thread_label, name, start, end in sorted(self.spans, key=lambda s: s[2]):
+                i = frame_index(("<span>", f"{name} ({thread_label})", 0))
+                events.append({"type": "O", "frame": i, "at": (start - self.started) * 1000})
+                events.append({"type": "C", "frame": i, "at": (end - self.started) * 1000})
+            profiles.append({
+                "type": "evented",
+                "name": "spans (LLM waits)",
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": end_ms,
+                "events": events,
+            })
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": profiles,
+            "name": self.label,
+            "exporter": "hive-capital-turn-profiler",
+        }
+
+
+def _stack(frame) -> Tuple[Frame, ...]:
+    stack = []
+    while frame is not None and len(stack) < PROFILE_MAX_DEPTH:
+        code = frame.f_code
+        stack.append((code.co_filename, code.co_name, code.co_firstlineno))
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+def _frame_name(frame: Frame) -> str:
+    filename, name, line = frame
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+# Profile of the turn being handled in this context (propagates into asyncio.to_thread)
+current_profile: contextvars.ContextVar[Optional[TurnProfile]] = contextvars.ContextVar("turn_profile", default=None)
+
+
+def should_profile(header: Optional[str]) -> bool:
+    if not PROFILE_ENABLED:
+        return False
+    if header is not None:
+        # Only the exact secret forces a profile; without a configured secret the header does nothing
+        return bool(PROFILE_SECRET) and hmac.compare_digest(header.encode("utf-8"), PROFILE_SECRET.encode("utf-8"))
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def prune_profiles(directory: str = PROFILE_DIR, max_files: int = PROFILE_MAX_FILES, max_age_seconds: float = PROFILE_MAX_AGE_SECONDS):
+    """Delete profiles older than max_age_seconds, then the oldest ones beyond max_files."""
+    paths = glob.glob(os.path.join(directory, "*.speedscope.json")) + glob.glob(os.path.join(directory, "*.folded"))
+    now = time.time()
+    aged = []
+    for path in paths:
+        try:
+            aged.append((os.path.getmtime(path), path))
+        except OSError:
+            continue
+    aged.sort(reverse=True)
+    for n, (mtime, path) in enumerate(aged):
+        if n >= max_files or now - mtime > max_age_seconds:
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"Could not remove old profile {path}: {e}")
+
+
+def _write_and_prune(profile: TurnProfile) -> str:
+    path = profile.write()
+    prune_profiles()
+    return path
+
+
+@asynccontextmanager
+async def profile_turn(label: str):
+    """Profile everything inside the block; yields the TurnProfile (written to disk on exit)."""
+    profile = TurnProfile(label)
+    profile.add_thread(threading.get_ident(), "event-loop")
+    token = current_profile.set(profile)
+    profile.start()
+    try:
+        yield profile
+    finally:
+        # Joining the sampler and writing the file block, so keep them off the event loop
+        await asyncio.to_thread(profile.stop)
+        current_profile.reset(token)
+        try:
+            profile.path = await asyncio.to_thread(_write_and_prune, profile)
+        except OSError as e:
+            print(f"Could not write profile: {e}")
+
+
+@contextmanager
+def _tracked_thread(profile: TurnProfile, kind: str):
+    ident = threading.get_ident()
+    profile.add_thread(ident, f"{kind}-{ident}")
+    try:
+        yield
+    finally:
+        profile.threads.pop(ident, None)
+
+
+def profiled_thread(kind: str = "worker"):
+    """
+    Use in code run via asyncio.to_thread (or an executor, with the context copied)
+    so the sampler also follows that thread.
+    """
+    profile = current_profile.get()
+    return _tracked_thread(profile, kind) if profile is not None else nullcontext()
+
+
+@contextmanager
+def _span(profile: TurnProfile, name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.spans.append((profile.threads.get(threading.get_ident(), "thread"), name, started, time.perf_counter()))
+
+
+def profile_span(name: str):
+    """Record the block as a named span (e.g. an LLM wait) in the current turn's profile."""
+    profile = current_profile.get()
+    return _span(profile, name) if profile is not None else nullcontext()
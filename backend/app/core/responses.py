@@ -0,0 +1,27 @@
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+# orjson-backed JSON response.
+#
+# Hot endpoints (/chat, customer lists/search) build plain dicts from data that
+# is already validated and return this response directly, which skips
+# FastAPI's response_model re-validation and the jsonable_encoder + json.dumps
+# round trip. The declared response_model still documents the shape in OpenAPI.
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class FastJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
@@ -0,0 +1,323 @@
+import json
+import math
+import operator
+import os
+import threading
+import time
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Underwriting policy lives in a declarative JSON rule table.
+# The table is compiled once into plain tuples/closures and recompiled
+# automatically whenever the file changes on disk (no restart needed).
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(__file__), "underwriting_rules.json")
+RULES_PATH = os.getenv("UNDERWRITING_RULES_PATH", DEFAULT_RULES_PATH)
+
+# How often (seconds) we stat the rules file to look for edits
+RELOAD_CHECK_INTERVAL = float(os.getenv("UNDERWRITING_RULES_RELOAD_SECONDS", "2"))
+
+_OPERATORS = {
+    "lt": operator.lt,
+    "le": operator.le,
+    "gt": operator.gt,
+    "ge": operator.ge,
+    "eq": operator.eq,
+    "ne": operator.ne,
+}
+
+
+def calculate_emi(amount: float, annual_rate: float, tenure_months: int) -> float:
+    """Standard reducing-balance EMI: P * r * (1+r)^n / ((1+r)^n - 1)."""
+    r = annual_rate / 12 / 100
+    n = tenure_months
+    if r == 0:
+        return amount / n
+    growth = (1 + r) ** n
+    return amount * r * growth / (growth - 1)
+
+
+@dataclass
+class Decision:
+    outcome: str  # APPROVE / REJECT / NEED_SALARY_SLIP / NEED_AMOUNT
+    rule_id: str
+    fired_rules: List[str]
+    limit: float
+    salary: float
+    emi: float
+    reason: Optional[str] = None
+
+    @property
+    def approved(self) -> bool:
+        return self.outcome == "APPROVE"
+
+
+class _TierTable:
+    """Score tiers compiled into a sorted array for O(log n) lookup."""
+
+    def __init__(self, tiers: List[Dict[str, Any]]):
+        floor = None
+        scored = []
+        for tier in tiers:
+            if tier.get("min_score") is None:
+                floor = tier
+            else:
+                scored.append(tier)
+        scored.sort(key=lambda t: t["min_score"])
+        self.bounds = [t["min_score"] for t in scored]
+        self.tiers = scored
+        self.floor = floor
+
+    def lookup(self, score: int) -> Optional[Dict[str, Any]]:
+        idx = bisect_right(self.bounds, score)
+        if idx == 0:
+            return self.floor
+        return self.tiers[idx - 1]
+
+
+class UnderwritingPolicy:
+    """A compiled snapshot of the rule table. Immutable once built."""
+
+    def __init__(self, table: Dict[str, Any]):
+        self.version = table.get("version", 1)
+        self.defaults = dict(table.get("defaults", {}))
+        self.thresholds = dict(table.get("thresholds", {}))
+        self.offer_tiers = _TierTable(table.get("offer_tiers", []))
+        self.dynamic_limit_tiers = _TierTable(table.get("dynamic_limit_tiers", []))
+        self.base_limit_tiers = _TierTable(table.get("base_limit_tiers", []))
+        self.rules = [self._compile_rule(r) for r in table.get("decision_rules", [])]
+
+        self.default_score = int(self.defaults.get("credit_score", 720))
+        self.default_interest_rate = float(self.defaults.get("interest_rate", 10.99))
+        self.default_tenure = int(self.defaults.get("tenure_months", 12))
+        self.base_income = float(self.defaults.get("base_income_assumption", 50000.0))
+
+    def _resolve(self, value: Any) -> Any:
+        # "$name" references a shared threshold so numbers live in one place
+        if isinstance(value, str) and value.startswith("$"):
+            return self.thresholds[value[1:]]
+        return value
+
+    def _compile_rule(self, rule: Dict[str, Any]) -> Tuple[str, Tuple, str, Optional[str]]:
+        checks = []
+        for field_name, conditions in rule.get("when", {}).items():
+            for op_name, value in conditions.items():
+                if op_name not in _OPERATORS:
+                    raise ValueError(f"Unknown operator '{op_name}' in rule '{rule['id']}'")
+                checks.append((field_name, _OPERATORS[op_name], self._resolve(value)))
+        return (rule["id"], tuple(checks), rule["outcome"], rule.get("reason"))
+
+    # --- Offer / limit derivation ---
+
+    def offer_for(self, score: Optional[int], monthly_income: float) -> Optional[Dict[str, Any]]:
+        """Pre-approved offer for the Offer Mart, or None if the score does not qualify."""
+        if score is None:
+            return None
+        tier = self.offer_tiers.lookup(score)
+        if not tier or not tier["multiplier"]:
+            return None
+        return {
+            "pre_approved_limit": monthly_income * tier["multiplier"],
+            "interest_rate": tier["interest_rate"],
+            "validity": "30 days",
+        }
+
+    def resolve_limit(self, score: int, pre_approved_limit: float, salary: float) -> Tuple[float, float, List[str]]:
+        """
+        Returns (limit, salary, fired_rules).
+        Falls back to an income-based limit, then to a base limit for unknown users.
+        """
+        fired = []
+        if pre_approved_limit == 0.0 and salary > 0:
+            tier = self.dynamic_limit_tiers.lookup(score)
+            pre_approved_limit = salary * tier["multiplier"]
+            fired.append(tier["id"])
+
+        if pre_approved_limit == 0.0:
+            tier = self.base_limit_tiers.lookup(score)
+            pre_approved_limit = self.base_income * tier["multiplier"]
+            salary = self.base_income
+            fired.append(tier["id"])
+
+        return pre_approved_limit, salary, fired
+
+    # --- Decision ---
+
+    def decide(
+        self,
+        score: int,
+        loan_amount: float,
+        limit: float,
+        salary: float,
+        tenure: Optional[int] = None,
+        interest_rate: Optional[float] = None,
+        salary_slip_uploaded: bool = False,
+        fired_rules: Optional[List[str]] = None,
+    ) -> Decision:
+        emi = 0.0
+        if loan_amount > 0:
+            emi = calculate_emi(loan_amount, interest_rate or self.default_interest_rate, tenure or self.default_tenure)
+
+        ctx = {
+            "credit_score": score,
+            "loan_amount": loan_amount,
+            "limit": limit,
+            "salary": salary,
+            "emi": emi,
+            "limit_ratio": loan_amount / limit if limit > 0 else math.inf,
+            "emi_ratio": emi / salary if salary > 0 else math.inf,
+            "salary_slip_uploaded": salary_slip_uploaded,
+        }
+
+        fired = list(fired_rules or [])
+        for rule_id, checks, outcome, reason in self.rules:
+            if all(op(ctx[name], value) for name, op, value in checks):
+                fired.append(rule_id)
+                if reason:
+                    reason = reason.format(**self.thresholds, **ctx)
+                return Decision(outcome, rule_id, fired, limit, salary, emi, reason)
+
+        # A table without a catch-all rule should never leave us undecided
+        fired.append("no_rule_matched")
+        return Decision("REJECT", "no_rule_matched", fired, limit, salary, emi, "No underwriting rule matched.")
+
+    def decide_grid(
+        self,
+        score: int,
+        amounts: Sequence[float],
+        tenures: Sequence[int],
+        limit: float,
+        salary: float,
+        interest_rate: Optional[float] = None,
+        salary_slip_uploaded: bool = False,
+    ) -> List[List[str]]:
+        """
+        Outcomes for every (amount, tenure) pair in one columnar pass over the rule table,
+        with the same first-match-wins semantics as decide(). Returns outcomes[amount_idx][tenure_idx].
+        Checks on per-applicant constants (score, salary, slip) are evaluated once for the whole grid.
+        """
+        rate = interest_rate or self.default_interest_rate
+        # EMI is linear in the amount, so one factor per tenure covers the whole column
+        factors = [calculate_emi(1.0, rate, t) for t in tenures]
+        loan = [a for a in amounts for _ in factors]
+        emi = [a * f for a in amounts for f in factors]
+        columns = {
+            "credit_score": score,
+            "loan_amount": loan,
+            "limit": limit,
+            "salary": salary,
+            "emi": emi,
+            "limit_ratio": [a / limit for a in loan] if limit > 0 else math.inf,
+            "emi_ratio": [e / salary for e in emi] if salary > 0 else math.inf,
+            "salary_slip_uploaded": salary_slip_uploaded,
+        }
+
+        outcomes = ["REJECT"] * len(loan)  # same as the no_rule_matched fallback
+        pending = list(range(len(loan)))
+        for _, checks, outcome, _ in self.rules:
+            matched = pending
+            for name, op, value in checks:
+                column = columns[name]
+                if isinstance(column, list):
+                    matched = [i for i in matched if op(column[i], value)]
+                elif not op(column, value):
+                    matched = []
+                if not matched:
+                    break
+            if not matched:
+                continue
+            for i in matched:
+                outcomes[i] = outcome
+            if len(matched) == len(pending):
+                break
+            taken = set(matched)
+            pending = [i for i in pending if i not in taken]
+
+        width = len(factors)
+        return [outcomes[row * width:(row + 1) * width] for row in range(len(amounts))]
+
+    def evaluate(
+        self,
+        score: Optional[int],
+        loan_amount: float,
+        pre_approved_limit: float = 0.0,
+        salary: float = 0.0,
+        tenure: Optional[int] = None,
+        interest_rate: Optional[float] = None,
+        salary_slip_uploaded: bool = False,
+    ) -> Decision:
+        """Full pipeline (limit derivation + decision) for agents and batch callers."""
+        if score is None:
+            score = self.default_score
+        limit, salary, fired = self.resolve_limit(score, pre_approved_limit, salary)
+        return self.decide(score, loan_amount, limit, salary, tenure, interest_rate, salary_slip_uploaded, fired)
+
+
+class PolicyStore:
+    """Holds the current compiled policy and hot-reloads it when the file changes."""
+
+    def __init__(self, path: str = RULES_PATH, check_interval: float = RELOAD_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._policy: Optional[UnderwritingPolicy] = None
+        self._mtime = 0.0
+        self._last_check = 0.0
+        # Called with the new policy after each successful reload, so data derived
+        # from the rules (e.g. mock pre-approved offers) can be rebuilt
+        self._listeners: List[Callable[[UnderwritingPolicy], None]] = []
+
+    def subscribe(self, listener: Callable[[UnderwritingPolicy], None]):
+        self._listeners.append(listener)
+
+    def _load(self) -> UnderwritingPolicy:
+        with open(self.path, "r", encoding="utf-8") as f:
+            return UnderwritingPolicy(json.load(f))
+
+    def get(self) -> UnderwritingPolicy:
+        now = time.monotonic()
+        if self._policy is not None and now - self._last_check < self.check_interval:
+            return self._policy
+
+        reloaded = None
+        with self._lock:
+            self._last_check = now
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError as e:
+                if self._policy is None:
+                    raise
+                print(f"Underwriting rules not readable, keeping previous version: {e}")
+                return self._policy
+
+            if self._policy is None or mtime != self._mtime:
+                try:
+                    first_load = self._policy is None
+                    self._policy = self._load()
+                    self._mtime = mtime
+                    print(f"Loaded underwriting rules v{self._policy.version} from {self.path}")
+                    if not first_load:
+                        reloaded = self._policy
+                except Exception as e:
+                    # A bad edit must not take the service down; keep serving the last good table
+                    if self._policy is None:
+                        raise
+                    self._mtime = mtime
+                    print(f"Error reloading underwriting rules, keeping previous version: {e}")
+            policy = self._policy
+
+        # Outside the lock: listeners may call get_policy() themselves
+        if reloaded is not None:
+            for listener in self._listeners:
+                try:
+                    listener(reloaded)
+                except Exception as e:
+                    print(f"Error applying reloaded underwriting rules: {e}")
+        return policy
+
+# Singleton instance
+policy_store = PolicyStore()
+
+
+def get_policy() -> UnderwritingPolicy:
+    return policy_store.get()
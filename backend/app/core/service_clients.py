@@ -0,0 +1,218 @@
+import asyncio
+import os
+import random
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlencode
+
+import httpx
+
+from app.core.turn_status import mark_degraded
+
+# Async HTTP clients for the CRM, Credit Bureau and Offer Mart services.
+# In this repo the "services" are the mock endpoints in app/routers/mock_api.py,
+# which can inject latency and errors (see /api/mock/faults) so the pipeline
+# can be exercised under realistic downstream conditions.
+
+# "direct" = read the in-process mock data, "http" = go through these clients
+SERVICE_MODE = os.getenv("SERVICE_MODE", "direct").lower()
+SERVICES_BASE_URL = os.getenv("SERVICES_BASE_URL", f"http://127.0.0.1:{os.getenv('PORT', '8000')}/api")
+
+SERVICE_TIMEOUT_SECONDS = float(os.getenv("SERVICE_TIMEOUT_SECONDS", "2.0"))
+SERVICE_MAX_RETRIES = int(os.getenv("SERVICE_MAX_RETRIES", "2"))
+SERVICE_RETRY_BACKOFF_SECONDS = float(os.getenv("SERVICE_RETRY_BACKOFF_SECONDS", "0.1"))
+SERVICE_MAX_CONNECTIONS = int(os.getenv("SERVICE_MAX_CONNECTIONS", "50"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "10"))
+
+
+class ServiceUnavailable(Exception):
+    """Raised when a downstream call fails after retries or the circuit is open."""
+
+
+class ServiceRequestRejected(ServiceUnavailable):
+    """The service answered with a 4xx other than 404: our request was bad, the service is fine."""
+
+
+class CircuitBreaker:
+    """
+    CLOSED -> OPEN after N consecutive failures -> HALF_OPEN after a cool-down -> CLOSED on success.
+    In HALF_OPEN a single probe request is let through; everyone else is rejected until it resolves
+    (or until it has been outstanding for reset_seconds, in case its caller went away).
+    """
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD, reset_seconds: float = BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "CLOSED"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started_at: Optional[float] = None
+        self.trips = 0
+
+    def allow(self) -> bool:
+        if self.state == "CLOSED":
+            return True
+        now = time.monotonic()
+        if self.state == "OPEN":
+            if now - self.opened_at < self.reset_seconds:
+                return False
+            self.state = "HALF_OPEN"
+        elif self.probe_started_at is not None and now - self.probe_started_at < self.reset_seconds:
+            return False
+        # This caller is the probe
+        self.probe_started_at = now
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.state = "CLOSED"
+        self.probe_started_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        self.probe_started_at = None
+        if self.state == "HALF_OPEN" or self.failures >= self.failure_threshold:
+            if self.state != "OPEN":
+                self.trips += 1
+            self.state = "OPEN"
+            self.opened_at = time.monotonic()
+
+
+class ServiceClient:
+    """Pooled async HTTP client with per-call timeout, jittered retries and a circuit breaker."""
+
+    def __init__(
+        self,
+        name: str,
+        base_url: str = SERVICES_BASE_URL,
+        timeout: float = SERVICE_TIMEOUT_SECONDS,
+        max_retries: int = SERVICE_MAX_RETRIES,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.name = name
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.transport = transport
+        self.breaker = CircuitBreaker()
+        self._client: Optional[httpx.AsyncClient] = None
+        self.metrics = {"requests": 0, "retries": 0, "failures": 0, "client_errors": 0, "short_circuited": 0, "total_latency_ms": 0.0}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                transport=self.transport,
+                limits=httpx.Limits(max_connections=SERVICE_MAX_CONNECTIONS, max_keepalive_connections=SERVICE_MAX_CONNECTIONS),
+            )
+        return self._client
+
+    async def get_json(self, path: str) -> Optional[Dict[str, Any]]:
+        """GET path and return the JSON body, or None on 404."""
+        if not self.breaker.allow():
+            self.metrics["short_circuited"] += 1
+            mark_degraded(f"{self.name}_unavailable")
+            raise ServiceUnavailable(f"{self.name}: circuit open")
+
+        last_error: Optional[Exception] = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.metrics["retries"] += 1
+                backoff = SERVICE_RETRY_BACKOFF_SECONDS * (2 ** (attempt - 1))
+                await asyncio.sleep(backoff * random.uniform(0.5, 1.5))
+
+            started = time.perf_counter()
+            self.metrics["requests"] += 1
+            try:
+                response = await self.client.get(path)
+                self.metrics["total_latency_ms"] += (time.perf_counter() - started) * 1000
+                if response.status_code == 404:
+                    self.breaker.record_success()
+                    return None
+                if response.status_code >= 500:
+                    raise httpx.HTTPStatusError(f"{self.name} returned {response.status_code}", request=response.request, response=response)
+                # The service is up either way: bad input must not open the circuit for everyone
+                self.breaker.record_success()
+                if response.status_code >= 400:
+                    # 4xx other than 404 will not get better on retry
+                    self.metrics["client_errors"] += 1
+                    raise ServiceRequestRejected(f"{self.name} rejected {path}: {response.status_code}")
+                return response.json()
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                last_error = e
+
+        self.metrics["failures"] += 1
+        self.breaker.record_failure()
+        mark_degraded(f"{self.name}_unavailable")
+        raise ServiceUnavailable(f"{self.name}: {last_error}")
+
+    def stats(self) -> Dict[str, Any]:
+        calls = self.metrics["requests"]
+        return {
+            **self.metrics,
+            "total_latency_ms": round(self.metrics["total_latency_ms"], 2),
+            "avg_latency_ms": round(self.metrics["total_latency_ms"] / calls, 2) if calls else 0.0,
+            "breaker_state": self.breaker.state,
+            "breaker_trips": self.breaker.trips,
+        }
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class CRMClient(ServiceClient):
+    def __init__(self, **kwargs):
+        super().__init__("crm", **kwargs)
+
+    async def get_customer_by_phone(self, phone: str) -> Optional[Dict[str, Any]]:
+        return await self.get_json(f"/crm/customers/by-phone/{phone}")
+
+    async def get_kyc_status(self, customer_id: str) -> Optional[str]:
+        data = await self.get_json(f"/crm/kyc/{customer_id}")
+        return data["kyc_status"] if data else None
+
+    async def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Phone (full or suffix), exact PAN or fuzzy name search; hits are {customer, match, score}."""
+        hits = await self.get_json("/crm/search?" + urlencode({"q": query, "limit": limit}))
+        return hits or []
+
+
+class BureauClient(ServiceClient):
+    def __init__(self, **kwargs):
+        super().__init__("bureau", **kwargs)
+
+    async def get_credit_score(self, customer_id: str) -> Optional[int]:
+        data = await self.get_json(f"/bureau/score/{customer_id}")
+        return data["score"] if data else None
+
+
+class OfferClient(ServiceClient):
+    def __init__(self, **kwargs):
+        super().__init__("offers", **kwargs)
+
+    async def get_offer(self, customer_id: str) -> Optional[Dict[str, Any]]:
+        offer = await self.get_json(f"/offers/{customer_id}")
+        # Offer Mart answers "no offer" with a zero limit rather than a 404
+        if not offer or not offer.get("pre_approved_limit"):
+            return None
+        return offer
+
+
+# Singleton instances
+crm_client = CRMClient()
+bureau_client = BureauClient()
+offer_client = OfferClient()
+
+
+def all_clients():
+    return [crm_client, bureau_client, offer_client]
+
+
+async def close_clients():
+    for c in all_clients():
+        await c.close()
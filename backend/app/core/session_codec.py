@@ -0,0 +1,155 @@
+import typing
+from typing import Any, Dict, Tuple
+
+import orjson
+
+from app.models.session import LoanApplicationState, AgentRole
+
+# Compact representation of LoanApplicationState for the session store.
+#
+# In memory a session is an immutable tuple of field values in a fixed order,
+# with current_agent stored as a small integer code and list/dict fields
+# frozen into tuples. Because the record is immutable, loading a session only
+# has to rebuild the outer containers - no JSON round trip and no pydantic
+# validation (records are only ever produced from already-validated models).
+#
+# Conversation messages are append-only and never edited in place, so the
+# message dicts themselves are shared between the record and loaded states;
+# copying the list is a single C-level operation regardless of history length.
+#
+# For disk spill / transport the record is serialized with orjson.
+
+FIELD_ORDER = list(LoanApplicationState.model_fields)
+AGENT_CODES = list(AgentRole)
+_AGENT_INDEX = {role: i for i, role in enumerate(AGENT_CODES)}
+
+_SCALAR, _LIST, _LIST_OF_DICT, _DICT = range(4)
+
+
+def _kind(annotation: Any) -> int:
+    origin = typing.get_origin(annotation)
+    if origin is typing.Union:
+        # Optional[X] -> X
+        args = [a for a in typing.get_args(annotation) if a is not type(None)]
+        return _kind(args[0]) if len(args) == 1 else _SCALAR
+    if origin is list:
+        (item,) = typing.get_args(annotation) or (Any,)
+        return _LIST_OF_DICT if typing.get_origin(item) is dict else _LIST
+    if origin is dict:
+        return _DICT
+    return _SCALAR
+
+
+_FIELD_KINDS = [
+    (name, _kind(LoanApplicationState.model_fields[name].annotation))
+    for name in FIELD_ORDER
+]
+
+VERSION_INDEX = FIELD_ORDER.index("state_version")
+# Append-only list fields that delta snapshots send as "appended" items
+APPEND_ONLY_INDEXES = tuple(i for i, (_, kind) in enumerate(_FIELD_KINDS) if kind in (_LIST, _LIST_OF_DICT))
+
+
+def to_record(state: LoanApplicationState) -> Tuple:
+    values = []
+    for name, kind in _FIELD_KINDS:
+        value = getattr(state, name)
+        if value is None or kind == _SCALAR:
+            if name == "current_agent":
+                value = _AGENT_INDEX[AgentRole(value)]
+            values.append(value)
+        elif kind == _LIST_OF_DICT or kind == _LIST:
+            values.append(tuple(value))
+        else:
+            values.append(tuple(value.items()))
+    return tuple(values)
+
+
+def from_record(record: Tuple) -> LoanApplicationState:
+    fields: Dict[str, Any] = {}
+    for (name, kind), value in zip(_FIELD_KINDS, record):
+        if value is None or kind == _SCALAR:
+            if name == "current_agent":
+                value = AGENT_CODES[value]
+            fields[name] = value
+        elif kind == _LIST_OF_DICT or kind == _LIST:
+            fields[name] = list(value)
+        else:
+            fields[name] = dict(value)
+    return LoanApplicationState.model_construct(**fields)
+
+
+def record_size(record: Tuple) -> int:
+    """Rough in-memory footprint in bytes: string payloads plus a fixed per-item overhead."""
+    size = 0
+    for (_, kind), value in zip(_FIELD_KINDS, record):
+        if value is None:
+            size += 8
+        elif kind == _LIST_OF_DICT:
+            size += sum(len(item.get("content", "")) + 64 for item in value)
+        elif kind == _LIST:
+            size += sum(len(str(v)) + 8 for v in value)
+        elif kind == _DICT:
+            size += sum(len(k) + len(str(v)) + 16 for k, v in value)
+        else:
+            size += len(value) if isinstance(value, str) else 8
+    return size
+
+
+def changed_fields(old: Tuple, new: Tuple) -> Tuple[int, ...]:
+    """Indexes of fields that differ between two records (state_version excluded)."""
+    # Shared message objects make the tuple comparisons mostly identity checks
+    return tuple(i for i, (a, b) in enumerate(zip(old, new)) if i != VERSION_INDEX and a != b)
+
+
+def with_version(record: Tuple, version: int) -> Tuple:
+    return record[:VERSION_INDEX] + (version,) + record[VERSION_INDEX + 1:]
+
+
+def list_marks(record: Tuple) -> Tuple:
+    """(length, last item) per append-only field, used to check later lists still extend this one."""
+    return tuple((len(record[i]), record[i][-1] if record[i] else None) for i in APPEND_ONLY_INDEXES)
+
+
+def record_value(record: Tuple, index: int) -> Any:
+    """JSON-ready value of one field, in the same shape as state.dict()."""
+    name, kind = _FIELD_KINDS[index]
+    value = record[index]
+    if value is None or kind == _SCALAR:
+        return AGENT_CODES[value] if name == "current_agent" else value
+    if kind == _DICT:
+        return dict(value)
+    return list(value)
+
+
+def encode_record(record: Tuple) -> bytes:
+    return orjson.dumps(record)
+
+
+def decode_record(payload: bytes) -> Tuple:
+    values = orjson.loads(payload)
+    if len(values) != len(FIELD_ORDER):
+        raise ValueError(f"Session record has {len(values)} fields, expected {len(FIELD_ORDER)}")
+    # orjson gives back lists; freeze them again so the record stays immutable
+    return tuple(_freeze(kind, value) for (_, kind), value in zip(_FIELD_KINDS, values))
+
+
+def _freeze(kind: int, value: Any) -> Any:
+    if value is None or kind == _SCALAR:
+        return value
+    if kind == _DICT:
+        return tuple(tuple(pair) for pair in value)
+    return tuple(value)
+
+
+def encode_state(state: LoanApplicationState) -> bytes:
+    return encode_record(to_record(state))
+
+
+def decode_state(payload: bytes) -> LoanApplicationState:
+    return from_record(decode_record(payload))
+
+
+def state_to_dict(state: LoanApplicationState) -> Dict[str, Any]:
+    """Plain-dict view with the same shape as state.dict() (used for ChatResponse.state_snapshot)."""
+    return {name: getattr(state, name) for name in FIELD_ORDER}
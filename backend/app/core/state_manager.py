@@ -1,20 +1,183 @@
-import json
+import hashlib
 import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 from app.models.session import LoanApplicationState, AgentRole
+from app.core.session_codec import (
+    to_record, from_record, record_size, encode_record, decode_record,
+    changed_fields, with_version, list_marks, record_value,
+    FIELD_ORDER, VERSION_INDEX, APPEND_ONLY_INDEXES,
+)
+from app.core.funnel import funnel_analytics
+
+# Session limits. Idle sessions expire after SESSION_TTL_SECONDS; when the
+# count or estimated size budget is exceeded the least recently used sessions
+# are evicted (and written to SESSION_SPILL_DIR if set, so they can be restored).
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "3600"))
+SESSION_MAX_COUNT = int(os.getenv("SESSION_MAX_COUNT", "10000"))
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(256 * 1024 * 1024)))
+SESSION_SPILL_DIR = os.getenv("SESSION_SPILL_DIR", "")
+
+# How many recent state versions we remember per session for delta snapshots
+STATE_CHANGE_LOG_SIZE = int(os.getenv("STATE_CHANGE_LOG_SIZE", "64"))
+
+
+class SessionStore:
+    """In-memory session store with idle TTL, LRU eviction and optional disk spill."""
+
+    def __init__(
+        self,
+        ttl_seconds: float = SESSION_TTL_SECONDS,
+        max_sessions: int = SESSION_MAX_COUNT,
+        max_bytes: int = SESSION_MAX_BYTES,
+        spill_dir: str = SESSION_SPILL_DIR,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        # session_id -> (last_access, size_bytes, record, change_log); ordered oldest access first
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.metrics = {"evictions": 0, "expirations": 0, "spills": 0, "restores": 0}
+        if self.spill_dir:
+            os.makedirs(self.spill_dir, exist_ok=True)
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: str) -> Optional[Tuple[Tuple, Tuple]]:
+        """Returns (record, change_log) or None."""
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                _, size, record, change_log = entry
+                self._sessions[session_id] = (now, size, record, change_log)
+                self._sessions.move_to_end(session_id)
+                return record, change_log
+
+        restored = self._restore(session_id)
+        if restored is not None:
+            # The change log is not spilled; the next delta request gets a full snapshot
+            self.put(session_id, restored)
+            return restored, ()
+        return None
+
+    def put(self, session_id: str, record: Tuple, change_log: Tuple = ()):
+        size = record_size(record)
+        with self._lock:
+            now = time.monotonic()
+            old = self._sessions.pop(session_id, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._sessions[session_id] = (now, size, record, change_log)
+            self._bytes += size
+            self._expire(now)
+            self._evict()
+
+    def pop(self, session_id: str):
+        with self._lock:
+            old = self._sessions.pop(session_id, None)
+            if old is not None:
+                self._bytes -= old[1]
+
+    def _expire(self, now: float):
+        # Entries are kept in access order, so expired ones are always at the front
+        while self._sessions:
+            session_id, (last_access, size, _, _) = next(iter(self._sessions.items()))
+            if now - last_access < self.ttl_seconds:
+                break
+            self._sessions.popitem(last=False)
+            self._bytes -= size
+            self.metrics["expirations"] += 1
+            self._delete_spill(session_id)
+
+    def _evict(self):
+        # Never evict the entry that was just written, even if it alone exceeds the byte budget
+        while len(self._sessions) > 1 and (len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes):
+            session_id, (_, size, record, _) = self._sessions.popitem(last=False)
+            self._bytes -= size
+            self.metrics["evictions"] += 1
+            self._spill(session_id, record)
+
+    # --- Disk spill ---
+
+    def _spill_path(self, session_id: str) -> str:
+        # Session ids come from clients, so never use them as file names directly
+        digest = hashlib.sha1(session_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.spill_dir, f"{digest}.json")
+
+    def _spill(self, session_id: str, data: Tuple):
+        if not self.spill_dir:
+            return
+        try:
+            with open(self._spill_path(session_id), "wb") as f:
+                f.write(encode_record(data))
+            self.metrics["spills"] += 1
+        except OSError as e:
+            print(f"Error spilling session {session_id}: {e}")
+
+    def _restore(self, session_id: str) -> Optional[Tuple]:
+        if not self.spill_dir:
+            return None
+        path = self._spill_path(session_id)
+        try:
+            with open(path, "rb") as f:
+                data = decode_record(f.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"Error restoring session {session_id}: {e}")
+            return None
+        self._delete_spill(session_id)
+        self.metrics["restores"] += 1
+        return data
+
+    def _delete_spill(self, session_id: str):
+        if not self.spill_dir:
+            return
+        try:
+            os.remove(self._spill_path(session_id))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Error removing spilled session {session_id}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "live_sessions": len(self._sessions),
+            "estimated_bytes": self._bytes,
+            "max_sessions": self.max_sessions,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "spill_enabled": bool(self.spill_dir),
+            **self.metrics,
+        }
+
 
 # In-memory store for Cloud Run
 # Since Cloud Run is stateless, this data resets on restart.
 # For production, use Firestore, Redis, or a SQL DB.
-GLOBAL_STATE_STORE = {}
+GLOBAL_STATE_STORE = SessionStore()
 
 class StateManager:
     def __init__(self):
         pass
 
     def get_state(self, session_id: str) -> LoanApplicationState:
-        if session_id in GLOBAL_STATE_STORE:
-            # Return a copy or re-instantiate to avoid direct mutable reference issues if needed
-            return LoanApplicationState(**GLOBAL_STATE_STORE[session_id])
+        entry = GLOBAL_STATE_STORE.get(session_id)
+        if entry is not None:
+            # Records are immutable and from_record rebuilds the containers,
+            # so callers never share mutable state
+            return from_record(entry[0])
         return self.create_session(session_id)
 
     def create_session(self, session_id: str, user_id: str = "guest") -> LoanApplicationState:
@@ -27,11 +190,84 @@ class StateManager:
 
     def save_state(self, state: LoanApplicationState):
         try:
-             # Store as dict to simulate serialization and ensure clean state
-            GLOBAL_STATE_STORE[state.session_id] = json.loads(state.json())
+            record = to_record(state)
+            entry = GLOBAL_STATE_STORE.get(state.session_id)
+            previous = None
+            if entry is None:
+                version, changes, change_log = 0, tuple(range(len(record))), ()
+            else:
+                previous, change_log = entry
+                # Version comes from the stored record, so stale copies can't move it backwards
+                version = previous[VERSION_INDEX]
+                changes = changed_fields(previous, record)
+                if changes:
+                    version += 1
+            record = with_version(record, version)
+            state.state_version = version
+            if changes:
+                change_log = (change_log + ((version, changes, list_marks(record)),))[-STATE_CHANGE_LOG_SIZE:]
+            # Store a compact immutable record to ensure clean state
+            GLOBAL_STATE_STORE.put(state.session_id, record, change_log)
+            if changes:
+                funnel_analytics.observe(state.session_id, previous, record)
         except Exception as e:
             print(f"Error saving state: {e}")
 
+    def get_snapshot(self, session_id: str, since_version: Optional[int] = None, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        State for the API response.
+        - No since_version: full snapshot {"version", "full": True, "state"} (optionally projected to `fields`).
+        - since_version known: {"version", "base_version", "full": False, "changed", "appended"} where
+          "appended" holds only the new items of append-only lists (conversation_history, audit_log).
+        Falls back to a full snapshot when the base version is no longer in the change log.
+        """
+        entry = GLOBAL_STATE_STORE.get(session_id)
+        if entry is None:
+            self.create_session(session_id)
+            entry = GLOBAL_STATE_STORE.get(session_id)
+        record, change_log = entry
+        version = record[VERSION_INDEX]
+        wanted = range(len(FIELD_ORDER)) if not fields else [FIELD_ORDER.index(f) for f in fields if f in FIELD_ORDER]
+
+        base = None
+        if since_version is not None and since_version <= version:
+            base = next((item for item in change_log if item[0] == since_version), None)
+        if base is None and since_version != version:
+            return {
+                "version": version,
+                "full": True,
+                "state": {FIELD_ORDER[i]: record_value(record, i) for i in wanted},
+            }
+
+        changed_since = set()
+        for logged_version, changes, _ in change_log:
+            if logged_version > since_version:
+                changed_since.update(changes)
+
+        base_marks = dict(zip(APPEND_ONLY_INDEXES, base[2])) if base else {}
+        changed, appended = {}, {}
+        for i in wanted:
+            if i not in changed_since:
+                continue
+            name = FIELD_ORDER[i]
+            if i in base_marks:
+                length, last_item = base_marks[i]
+                current = record[i]
+                # Only send the tail if the list still extends what the client has. Compared by
+                # value: a spill/restore round trip copies the items, so identity would not hold
+                if len(current) >= length and (length == 0 or current[length - 1] == last_item):
+                    appended[name] = list(current[length:])
+                    continue
+            changed[name] = record_value(record, i)
+
+        return {
+            "version": version,
+            "base_version": since_version,
+            "full": False,
+            "changed": changed,
+            "appended": appended,
+        }
+
     def update_agent(self, session_id: str, new_agent: AgentRole):
         state = self.get_state(session_id)
         state.current_agent = new_agent
@@ -0,0 +1,24 @@
+import contextvars
+from typing import Optional, Set
+
+# Whether the /chat turn being handled was answered in degraded mode: an agent
+# got a canned LLM fallback or a downstream service was unavailable. Such
+# answers are fine to show once but must not be replayed to idempotent retries.
+#
+# main.py starts a fresh set per turn; it is shared (not copied) with the worker
+# threads the agents run on, so marks made there are visible to the caller.
+
+_degradations: contextvars.ContextVar[Optional[Set[str]]] = contextvars.ContextVar("turn_degradations", default=None)
+
+
+def start_turn() -> Set[str]:
+    """Begin tracking the current turn; returns the set that collects degradation reasons."""
+    reasons: Set[str] = set()
+    _degradations.set(reasons)
+    return reasons
+
+
+def mark_degraded(reason: str):
+    reasons = _degradations.get()
+    if reasons is not None:
+        reasons.add(reason)
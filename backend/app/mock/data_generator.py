@@ -1,16 +1,37 @@
 from faker import Faker
 import random
-from typing import List, Dict, Optional
+from typing import Any, Callable, List, Dict, Optional
 import json
 import os
+import threading
+from app.core.rules_engine import UnderwritingPolicy, get_policy, policy_store
 
 fake = Faker('en_IN')  # Use Indian locale for names/cities since context implies India (Hive Capital mentioned in history)
 
+# Profile labels, indexed by profile_type below
+PROFILE_TYPES = [
+    "PRIME",
+    "LOW_SCORE_HIGH_INCOME",
+    "HIGH_SCORE_LOW_INCOME",
+    "LOW_SCORE_LOW_INCOME",
+    "NEW_TO_CREDIT",
+    "OVERLEVERAGED",
+]
+
 class MockDataManager:
     def __init__(self):
         self.customers: List[Dict] = []
         self.credit_scores: Dict[str, int] = {}
         self.offers: Dict[str, Dict] = {}
+        self.profile_types: Dict[str, str] = {}
+        # Lookup indexes, kept in sync by the write methods below
+        self._by_id: Dict[str, Dict] = {}
+        self._by_phone: Dict[str, str] = {}  # normalized phone -> customer_id
+        self._by_pan: Dict[str, str] = {}
+        # Called as listener(customer_id, previous_customer) after every write, so derived
+        # views (CRM_DATABASE, caches) can update just the affected row
+        self._listeners: List[Callable[[str, Optional[Dict]], None]] = []
+        self._lock = threading.RLock()
         self._generate_data()
 
     def _generate_data(self):
@@ -26,6 +47,7 @@ class MockDataManager:
         # 5. No credit history (New to credit)
         # 6. Existing heavy loans (Overleveraged)
         
+        policy = get_policy()
         cities = ["Mumbai", "Delhi", "Bangalore", "Chennai", "Hyderabad", "Pune"]
         
         for i in range(30):
@@ -83,29 +105,23 @@ class MockDataManager:
                 "existing_loans": existing_loans
             }
             self.customers.append(user)
+            self._index(user)
+            
+            self.profile_types[customer_id] = PROFILE_TYPES[profile_type]
             
             # Store Credit Score
             self.credit_scores[customer_id] = score
             
-            # Generate Pre-approved Offer
-            offer_limit = 0
-            if score >= 750:
-                offer_limit = income * 10
-            elif score >= 650:
-                offer_limit = income * 5
-            
-            if offer_limit > 0:
-                self.offers[customer_id] = {
-                    "pre_approved_limit": offer_limit,
-                    "interest_rate": 10.5 if score > 800 else 12.0,
-                    "validity": "30 days"
-                }
+            # Generate Pre-approved Offer (tiers come from the shared underwriting rule table)
+            offer = policy.offer_for(score, income)
+            if offer:
+                self.offers[customer_id] = offer
 
     def get_all_customers(self):
         return self.customers
 
     def get_customer(self, customer_id: str):
-        return next((c for c in self.customers if c["id"] == customer_id), None)
+        return self._by_id.get(customer_id)
 
     def get_credit_score(self, customer_id: str):
         return self.credit_scores.get(customer_id)
@@ -113,15 +129,126 @@ class MockDataManager:
     def get_offer(self, customer_id: str):
         return self.offers.get(customer_id)
 
+    def get_profile_type(self, customer_id: str):
+        return self.profile_types.get(customer_id)
+
     def get_customer_by_phone(self, phone: str):
-        # Normalize phone input (basic)
-        phone_clean = phone.replace(" ", "").replace("-", "")[-10:]
-        
-        for customer in self.customers:
-            c_phone = customer["phone"].replace(" ", "").replace("-", "")[-10:]
-            if c_phone == phone_clean:
-                return customer
-        return None
+        customer_id = self._by_phone.get(normalize_phone(phone))
+        return self._by_id.get(customer_id) if customer_id else None
+
+    # --- Writes (CRM API). Each one re-derives only the affected customer's offer. ---
+
+    def subscribe(self, listener: Callable[[str, Optional[Dict]], None]):
+        self._listeners.append(listener)
+
+    def create_customer(self, data: Dict[str, Any], credit_score: Optional[int] = None) -> Dict:
+        with self._lock:
+            self._check_unique(data["phone"], data["pan"])
+            customer_id = f"CUST{str(len(self.customers) + 1).zfill(3)}"
+            while customer_id in self._by_id:
+                customer_id = f"CUST{str(int(customer_id[4:]) + 1).zfill(3)}"
+            customer = {
+                "id": customer_id,
+                "name": data["name"],
+                "age": data["age"],
+                "city": data["city"],
+                "email": data.get("email") or f"{data['name'].lower().replace(' ', '.')}@example.com",
+                "phone": data["phone"],
+                "pan": data["pan"].upper(),
+                "monthly_income": data["monthly_income"],
+                "existing_loans": list(data.get("existing_loans") or []),
+            }
+            self.customers.append(customer)
+            self._index(customer)
+            self.credit_scores[customer_id] = credit_score if credit_score is not None else -1
+            self._refresh_offer(customer_id)
+        self._notify(customer_id, None)
+        return customer
+
+    def update_customer(self, customer_id: str, changes: Dict[str, Any]) -> Optional[Dict]:
+        with self._lock:
+            customer = self._by_id.get(customer_id)
+            if customer is None:
+                return None
+            self._check_unique(changes.get("phone"), changes.get("pan"), exclude=customer_id)
+            previous = dict(customer)
+            if "pan" in changes:
+                changes = {**changes, "pan": changes["pan"].upper()}
+            # Update in place so references held by the customers list stay valid
+            self._unindex(customer)
+            customer.update({k: v for k, v in changes.items() if k != "id"})
+            self._index(customer)
+            if "monthly_income" in changes:
+                self._refresh_offer(customer_id)
+        self._notify(customer_id, previous)
+        return customer
+
+    def set_credit_score(self, customer_id: str, score: int) -> Optional[Dict]:
+        """Bureau score refresh; re-derives the customer's offer."""
+        with self._lock:
+            customer = self._by_id.get(customer_id)
+            if customer is None:
+                return None
+            previous = dict(customer)
+            self.credit_scores[customer_id] = score
+            self._refresh_offer(customer_id)
+        self._notify(customer_id, previous)
+        return customer
+
+    def refresh_offers(self, policy: Optional[UnderwritingPolicy] = None):
+        """Re-derive every offer, e.g. after the underwriting rules were hot-reloaded."""
+        policy = policy or get_policy()
+        changed = []
+        with self._lock:
+            for customer in self.customers:
+                previous_offer = self.offers.get(customer["id"])
+                self._refresh_offer(customer["id"], policy)
+                if self.offers.get(customer["id"]) != previous_offer:
+                    changed.append((customer["id"], dict(customer)))
+        for customer_id, previous in changed:
+            self._notify(customer_id, previous)
+        if changed:
+            print(f"Re-derived {len(changed)} pre-approved offers from underwriting rules v{policy.version}")
+
+    def _refresh_offer(self, customer_id: str, policy: Optional[UnderwritingPolicy] = None):
+        customer = self._by_id[customer_id]
+        offer = (policy or get_policy()).offer_for(self.credit_scores.get(customer_id, -1), customer["monthly_income"])
+        if offer:
+            self.offers[customer_id] = offer
+        else:
+            self.offers.pop(customer_id, None)
+
+    def _check_unique(self, phone: Optional[str], pan: Optional[str], exclude: Optional[str] = None):
+        if phone:
+            owner = self._by_phone.get(normalize_phone(phone))
+            if owner and owner != exclude:
+                raise ValueError(f"Phone number already registered to {owner}")
+        if pan:
+            owner = self._by_pan.get(pan.upper())
+            if owner and owner != exclude:
+                raise ValueError(f"PAN already registered to {owner}")
+
+    def _index(self, customer: Dict):
+        self._by_id[customer["id"]] = customer
+        self._by_phone[normalize_phone(customer["phone"])] = customer["id"]
+        self._by_pan[customer["pan"]] = customer["id"]
+
+    def _unindex(self, customer: Dict):
+        self._by_phone.pop(normalize_phone(customer["phone"]), None)
+        self._by_pan.pop(customer["pan"], None)
+
+    def _notify(self, customer_id: str, previous: Optional[Dict]):
+        for listener in self._listeners:
+            try:
+                listener(customer_id, previous)
+            except Exception as e:
+                print(f"Error updating view for {customer_id}: {e}")
+
+
+def normalize_phone(phone: str) -> str:
+    # Last 10 digits, ignoring spaces/dashes/country code
+    return phone.replace(" ", "").replace("-", "")[-10:]
 
 # Singleton instance
 mock_db = MockDataManager()
+policy_store.subscribe(mock_db.refresh_offers)
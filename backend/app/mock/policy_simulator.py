@@ -0,0 +1,210 @@
+import argparse
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from app.core.rules_engine import DEFAULT_RULES_PATH, UnderwritingPolicy
+
+# What-if simulator: replays synthetic loan applications from the mock customer
+# base through the underwriting rule table, fanned out over a process pool.
+#
+#   python -m app.mock.policy_simulator --applications 1000000
+#   python -m app.mock.policy_simulator --rules my_rules.json --compare
+
+TENURE_CHOICES = [12, 24, 36, 48, 60, 72]
+
+# Requested amount ~ LogNormal(median = income * AMOUNT_INCOME_MULTIPLE, sigma)
+AMOUNT_INCOME_MULTIPLE = 6.0
+AMOUNT_SIGMA = 0.6
+
+# Chunk size for one worker task; large enough to amortize IPC, small enough to balance
+CHUNK_SIZE = 50000
+
+
+def build_profiles() -> List[Dict]:
+    """
+    Flatten the mock CRM into the raw fields underwriting starts from.
+    Pre-approved offers are not included: each run derives them from its own
+    rule table, so a candidate's offer_tiers are exercised too.
+    """
+    from app.mock.data_generator import mock_db
+
+    profiles = []
+    for c in mock_db.get_all_customers():
+        profiles.append({
+            "id": c["id"],
+            "profile_type": mock_db.get_profile_type(c["id"]),
+            "score": mock_db.get_credit_score(c["id"]),
+            "income": float(c["monthly_income"]),
+        })
+    return profiles
+
+
+def _empty_bucket() -> Dict:
+    return {
+        "applications": 0,
+        "approved": 0,
+        "sanctioned_amount": 0.0,
+        "outcomes": {},
+        "rejection_reasons": {},
+    }
+
+
+def _merge_bucket(into: Dict, other: Dict):
+    into["applications"] += other["applications"]
+    into["approved"] += other["approved"]
+    into["sanctioned_amount"] += other["sanctioned_amount"]
+    for key in ("outcomes", "rejection_reasons"):
+        for k, v in other[key].items():
+            into[key][k] = into[key].get(k, 0) + v
+
+
+def _simulate_chunk(task: Dict) -> Dict:
+    """Worker entry point. Must stay picklable/top-level for the process pool."""
+    with open(task["rules_path"], "r", encoding="utf-8") as f:
+        policy = UnderwritingPolicy(json.load(f))
+
+    rng = random.Random(task["seed"])
+    profiles = task["profiles"]
+    min_amount = task["min_amount"]
+    max_amount = task["max_amount"]
+    slip_upload_rate = task["slip_upload_rate"]
+
+    # Offer and limit derivation only depend on the customer, so do them once per profile
+    prepared = []
+    for p in profiles:
+        offer = policy.offer_for(p["score"], p["income"])
+        pre_approved_limit = float(offer["pre_approved_limit"]) if offer else 0.0
+        rate = float(offer["interest_rate"]) if offer else None
+        score = p["score"] if p["score"] is not None else policy.default_score
+        limit, salary, _ = policy.resolve_limit(score, pre_approved_limit, p["income"])
+        mu = math.log(max(p["income"], 1.0) * AMOUNT_INCOME_MULTIPLE)
+        prepared.append((p["profile_type"], score, limit, salary, rate, mu))
+
+    buckets: Dict[str, Dict] = {}
+    for _ in range(task["count"]):
+        profile_type, score, limit, salary, rate, mu = prepared[rng.randrange(len(prepared))]
+        amount = round(min(max(rng.lognormvariate(mu, AMOUNT_SIGMA), min_amount), max_amount), -3)
+        tenure = rng.choice(TENURE_CHOICES)
+        # Drawn for every application, used or not, so the stream does not depend on the rules
+        uploads_slip = rng.random() < slip_upload_rate
+
+        decision = policy.decide(score, amount, limit, salary, tenure, rate, False)
+        if decision.outcome == "NEED_SALARY_SLIP" and uploads_slip:
+            decision = policy.decide(score, amount, limit, salary, tenure, rate, True)
+
+        bucket = buckets.get(profile_type)
+        if bucket is None:
+            bucket = buckets[profile_type] = _empty_bucket()
+        bucket["applications"] += 1
+        bucket["outcomes"][decision.outcome] = bucket["outcomes"].get(decision.outcome, 0) + 1
+        if decision.approved:
+            bucket["approved"] += 1
+            bucket["sanctioned_amount"] += amount
+        elif decision.outcome == "REJECT":
+            bucket["rejection_reasons"][decision.rule_id] = bucket["rejection_reasons"].get(decision.rule_id, 0) + 1
+
+    return {"version": policy.version, "buckets": buckets}
+
+
+def _finalize(bucket: Dict) -> Dict:
+    apps = bucket["applications"]
+    bucket["approval_rate"] = round(bucket["approved"] / apps, 4) if apps else 0.0
+    bucket["sanctioned_amount"] = round(bucket["sanctioned_amount"], 2)
+    return bucket
+
+
+def run_simulation(
+    applications: int = 1000000,
+    rules_path: str = DEFAULT_RULES_PATH,
+    workers: Optional[int] = None,
+    seed: int = 42,
+    slip_upload_rate: float = 0.7,
+    profiles: Optional[List[Dict]] = None,
+) -> Dict:
+    """Run `applications` synthetic applications through the rule table and aggregate the outcomes."""
+    from app.core.mock_data import PRODUCT_CATALOG
+
+    product = PRODUCT_CATALOG["personal_loan"]
+    profiles = profiles if profiles is not None else build_profiles()
+    workers = workers or os.cpu_count() or 1
+
+    tasks = []
+    remaining = applications
+    chunk_index = 0
+    while remaining > 0:
+        count = min(CHUNK_SIZE, remaining)
+        tasks.append({
+            "rules_path": rules_path,
+            "profiles": profiles,
+            "count": count,
+            "seed": seed * 1000003 + chunk_index,
+            "min_amount": product["min_amount"],
+            "max_amount": product["max_amount"],
+            "slip_upload_rate": slip_upload_rate,
+        })
+        remaining -= count
+        chunk_index += 1
+
+    started = time.perf_counter()
+    if workers == 1:
+        results = [_simulate_chunk(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_simulate_chunk, tasks))
+    elapsed = time.perf_counter() - started
+
+    overall = _empty_bucket()
+    by_profile: Dict[str, Dict] = {}
+    for result in results:
+        for profile_type, bucket in result["buckets"].items():
+            _merge_bucket(overall, bucket)
+            _merge_bucket(by_profile.setdefault(profile_type, _empty_bucket()), bucket)
+
+    return {
+        "rules_path": rules_path,
+        "rules_version": results[0]["version"] if results else None,
+        "workers": workers,
+        "elapsed_seconds": round(elapsed, 3),
+        "applications_per_second": round(applications / elapsed) if elapsed > 0 else None,
+        "overall": _finalize(overall),
+        "by_profile": {k: _finalize(v) for k, v in sorted(by_profile.items())},
+    }
+
+
+def compare_reports(baseline: Dict, candidate: Dict) -> Dict:
+    """Approval-rate and exposure deltas (candidate - baseline) per profile type."""
+    diff = {}
+    for profile_type in sorted(set(baseline["by_profile"]) | set(candidate["by_profile"])):
+        base = baseline["by_profile"].get(profile_type, _finalize(_empty_bucket()))
+        cand = candidate["by_profile"].get(profile_type, _finalize(_empty_bucket()))
+        diff[profile_type] = {
+            "approval_rate_delta": round(cand["approval_rate"] - base["approval_rate"], 4),
+            "sanctioned_amount_delta": round(cand["sanctioned_amount"] - base["sanctioned_amount"], 2),
+        }
+    return diff
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest underwriting rules over synthetic applications")
+    parser.add_argument("--applications", type=int, default=1000000)
+    parser.add_argument("--rules", default=DEFAULT_RULES_PATH, help="Rule table to evaluate")
+    parser.add_argument("--compare", action="store_true", help="Also run the current rules and report deltas")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--slip-upload-rate", type=float, default=0.7)
+    args = parser.parse_args()
+
+    shared_profiles = build_profiles()
+    report = run_simulation(args.applications, args.rules, args.workers, args.seed, args.slip_upload_rate, shared_profiles)
+    output = {"candidate": report}
+    if args.compare:
+        # Same seed => same application stream, so deltas are purely due to the rules
+        baseline = run_simulation(args.applications, DEFAULT_RULES_PATH, args.workers, args.seed, args.slip_upload_rate, shared_profiles)
+        output["baseline"] = baseline
+        output["delta"] = compare_reports(baseline, report)
+    print(json.dumps(output, indent=2, ensure_ascii=False))
@@ -0,0 +1,85 @@
+import argparse
+import json
+import time
+from typing import Callable, Dict
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.core.compression import brotli, compress
+from app.core.responses import FastJSONResponse
+from app.core.session_codec import state_to_dict
+from app.mock.data_generator import mock_db
+from app.mock.session_benchmark import build_state
+from app.models.session import ChatResponse
+
+# Encode time and bytes on the wire for /chat and customer-list payloads:
+#   stdlib   - response_model validation + jsonable_encoder + json.dumps (FastAPI's classic path)
+#   pydantic - response_model validation + pydantic dump_json (newer FastAPI fast path)
+#   orjson   - FastJSONResponse on the plain dict (what the hot endpoints return now)
+# plus gzip/brotli sizes and compression time for the orjson body.
+#
+#   python -m app.mock.response_benchmark --turns 5 100 --iterations 500
+
+
+def _time_per_call(fn: Callable[[], object], iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return round((time.perf_counter() - started) / iterations * 1e6, 1)
+
+
+def _measure(payload: Dict, adapter: TypeAdapter, iterations: int) -> Dict:
+    def stdlib():
+        model = adapter.validate_python(payload)
+        return json.dumps(jsonable_encoder(model), ensure_ascii=False).encode("utf-8")
+
+    def pydantic_json():
+        return adapter.dump_json(adapter.validate_python(payload))
+
+    def fast():
+        return FastJSONResponse(payload).body
+
+    body = fast()
+    result = {
+        "encode_us": {
+            "stdlib": _time_per_call(stdlib, iterations),
+            "pydantic": _time_per_call(pydantic_json, iterations),
+            "orjson": _time_per_call(fast, iterations),
+        },
+        "bytes": {"json": len(body), "gzip": len(compress(body, "gzip"))},
+        "compress_us": {"gzip": _time_per_call(lambda: compress(body, "gzip"), iterations)},
+    }
+    if brotli is not None:
+        result["bytes"]["br"] = len(compress(body, "br"))
+        result["compress_us"]["br"] = _time_per_call(lambda: compress(body, "br"), iterations)
+    return result
+
+
+def run_benchmark(turns, iterations: int) -> Dict:
+    results = {}
+    chat_adapter = TypeAdapter(ChatResponse)
+    for n in turns:
+        state = build_state(n)
+        payload = {
+            "session_id": state.session_id,
+            "agent_name": state.current_agent,
+            "message": state.conversation_history[-1]["content"],
+            "state_version": n * 2,
+            "state_snapshot": state_to_dict(state),
+            "state_delta": None,
+        }
+        results[f"chat_{n}_turns"] = _measure(payload, chat_adapter, iterations)
+
+    from app.routers.mock_api import Customer
+    results["crm_customers"] = _measure(mock_db.get_all_customers(), TypeAdapter(list[Customer]), iterations)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="JSON encoding and compression benchmark for API responses")
+    parser.add_argument("--turns", type=int, nargs="+", default=[5, 100])
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    print(json.dumps(run_benchmark(args.turns, args.iterations), indent=2))
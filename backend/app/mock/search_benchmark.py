@@ -0,0 +1,85 @@
+import argparse
+import json
+import random
+import string
+import time
+from typing import Callable, Dict, List
+
+from faker.providers.person.en_IN import Provider as PersonProvider
+
+from app.core.customer_search import CustomerSearchIndex
+
+# Query latency of the CRM search index at large customer counts.
+# Customers are synthetic (names drawn from Faker's en_IN name lists) so that
+# millions of rows can be generated in seconds.
+#
+#   python -m app.mock.search_benchmark --records 1000000 --queries 2000
+
+
+def build_customers(n: int, seed: int = 42) -> List[Dict]:
+    rng = random.Random(seed)
+    first_names = list(PersonProvider.first_names)
+    last_names = list(PersonProvider.last_names)
+    customers = []
+    for i in range(n):
+        customers.append({
+            "id": f"CUST{i + 1:07d}",
+            "name": f"{rng.choice(first_names)} {rng.choice(last_names)}",
+            "phone": str(rng.randint(6_000_000_000, 9_999_999_999)),
+            "pan": "".join(rng.choices(string.ascii_uppercase, k=5))
+                   + "".join(rng.choices(string.digits, k=4))
+                   + rng.choice(string.ascii_uppercase),
+        })
+    return customers
+
+
+def _typo(name: str, rng: random.Random) -> str:
+    i = rng.randrange(len(name))
+    return name[:i] + rng.choice(string.ascii_lowercase) + name[i + 1:]
+
+
+def _time_queries(fn: Callable[[str], object], queries: List[str]) -> Dict[str, float]:
+    timings = []
+    for q in queries:
+        started = time.perf_counter()
+        fn(q)
+        timings.append((time.perf_counter() - started) * 1e6)
+    timings.sort()
+    return {
+        "p50_us": round(timings[len(timings) // 2], 1),
+        "p95_us": round(timings[int(len(timings) * 0.95)], 1),
+        "p99_us": round(timings[min(len(timings) - 1, int(len(timings) * 0.99))], 1),
+    }
+
+
+def run_benchmark(records: int, queries: int, seed: int = 42) -> Dict:
+    customers = build_customers(records, seed)
+    by_id = {c["id"]: c for c in customers}
+    index = CustomerSearchIndex(get_customer=by_id.get)
+
+    started = time.perf_counter()
+    index.build(customers)
+    build_seconds = time.perf_counter() - started
+
+    rng = random.Random(seed + 1)
+    sample = [customers[rng.randrange(records)] for _ in range(queries)]
+    return {
+        "records": records,
+        "queries": queries,
+        "build_seconds": round(build_seconds, 2),
+        "index": index.stats(),
+        "phone_exact": _time_queries(index.find_by_phone, [c["phone"] for c in sample]),
+        "phone_suffix_6": _time_queries(lambda q: index.search_phone(q, 10), [c["phone"][-6:] for c in sample]),
+        "pan_exact": _time_queries(index.find_by_pan, [c["pan"] for c in sample]),
+        "name_typo": _time_queries(lambda q: index.search_name(q, 10), [_typo(c["name"].lower(), rng) for c in sample]),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CRM search index benchmark")
+    parser.add_argument("--records", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(json.dumps(run_benchmark(args.records, args.queries, args.seed), indent=2))
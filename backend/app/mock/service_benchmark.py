@@ -0,0 +1,99 @@
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Dict, List
+
+import httpx
+
+from app.core import service_clients
+from app.core.prefetch import prefetch_customer_data
+
+# Benchmarks the customer-data prefetch through the HTTP service clients while
+# the mock services inject latency/errors. Runs against the app in-process
+# (ASGI transport) unless --base-url points at a running server, which must be
+# started with MOCK_FAULTS_ENABLED=true so the fault settings can be changed.
+#
+#   python -m app.mock.service_benchmark --requests 2000 --concurrency 100 --latency-ms 40 --error-rate 0.05
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return round(ordered[idx], 2)
+
+
+async def run_benchmark(requests: int, concurrency: int, latency_ms: float, jitter_ms: float, error_rate: float, base_url: str = None) -> Dict:
+    from app.mock.data_generator import mock_db
+    from app.routers import mock_api
+
+    service_clients.SERVICE_MODE = "http"
+    if base_url is None:
+        import main
+        transport = httpx.ASGITransport(app=main.app)
+        for c in service_clients.all_clients():
+            c.transport = transport
+            c.base_url = "http://mock/api"
+        for config in mock_api.FAULT_CONFIG.values():
+            config.update({"latency_ms": latency_ms, "jitter_ms": jitter_ms, "error_rate": error_rate})
+    else:
+        async with httpx.AsyncClient(base_url=base_url) as admin:
+            for service in mock_api.FAULT_CONFIG:
+                response = await admin.put(f"/mock/faults/{service}", json={"latency_ms": latency_ms, "jitter_ms": jitter_ms, "error_rate": error_rate})
+                response.raise_for_status()
+        for c in service_clients.all_clients():
+            c.base_url = base_url
+
+    phones = [c["phone"] for c in mock_db.get_all_customers()]
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await prefetch_customer_data(phones[i % len(phones)])
+                latencies.append((time.perf_counter() - started) * 1000)
+            except service_clients.ServiceUnavailable:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    await service_clients.close_clients()
+
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "injected": {"latency_ms": latency_ms, "jitter_ms": jitter_ms, "error_rate": error_rate},
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_per_second": round(requests / elapsed, 1) if elapsed > 0 else None,
+        "success_rate": round(len(latencies) / requests, 4) if requests else 0.0,
+        "latency_ms": {
+            "mean": round(statistics.mean(latencies), 2) if latencies else 0.0,
+            "p50": _percentile(latencies, 50),
+            "p95": _percentile(latencies, 95),
+            "p99": _percentile(latencies, 99),
+        },
+        "errors": errors,
+        "clients": {c.name: c.stats() for c in service_clients.all_clients()},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark customer-data prefetch through the service clients")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--base-url", default=None, help="e.g. http://127.0.0.1:8000/api (default: in-process)")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_benchmark(args.requests, args.concurrency, args.latency_ms, args.jitter_ms, args.error_rate, args.base_url))
+    print(json.dumps(report, indent=2))
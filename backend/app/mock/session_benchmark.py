@@ -0,0 +1,88 @@
+import argparse
+import json
+import time
+from typing import Callable, Dict
+
+from app.core.session_codec import encode_record, from_record, record_size, state_to_dict, to_record
+from app.models.session import AgentRole, LoanApplicationState
+
+# Per-turn session serialization cost: the previous pydantic/json path
+# (LoanApplicationState(**dict) + json.loads(state.json())) against the
+# compact immutable records (and orjson encoding) used by the session store.
+#
+#   python -m app.mock.session_benchmark --turns 20 --iterations 2000
+
+
+def build_state(turns: int) -> LoanApplicationState:
+    state = LoanApplicationState(
+        user_id="CUST001",
+        session_id="bench-session-0001",
+        current_agent=AgentRole.UNDERWRITING,
+        name="Aryan Maharaj",
+        phone="0133890838",
+        email="aryan.maharaj@example.com",
+        income=177196.0,
+        loan_amount=500000.0,
+        loan_tenure=36,
+        interest_rate=10.5,
+        kyc_verified=True,
+        credit_score=820,
+        pre_approved_limit=1771960.0,
+    )
+    for i in range(turns):
+        state.conversation_history.append({"role": "user", "content": f"Message {i}: I would like to know more about the loan terms please."})
+        state.conversation_history.append({"role": "agent", "content": f"Reply {i}: Sure! Your pre-approved offer is up to ₹17,71,960 at 10.5% for up to 72 months."})
+    state.audit_log.append("Underwriting APPROVE (rules v1): pre_approved_override")
+    return state
+
+
+def _time_per_call(fn: Callable[[], object], iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def run_benchmark(turns: int, iterations: int) -> Dict:
+    state = build_state(turns)
+    legacy_stored = json.loads(state.json())
+    compact_stored = to_record(state)
+
+    # One turn = several get_state/save_state round trips plus one response snapshot
+    legacy = {
+        "save_us": _time_per_call(lambda: json.loads(state.json()), iterations),
+        "load_us": _time_per_call(lambda: LoanApplicationState(**legacy_stored), iterations),
+        "snapshot_us": _time_per_call(state.dict, iterations),
+        "encoded_bytes": len(json.dumps(legacy_stored, ensure_ascii=False).encode("utf-8")),
+    }
+    compact = {
+        "save_us": _time_per_call(lambda: record_size(to_record(state)), iterations),
+        "load_us": _time_per_call(lambda: from_record(compact_stored), iterations),
+        "snapshot_us": _time_per_call(lambda: state_to_dict(state), iterations),
+        "encode_us": _time_per_call(lambda: encode_record(compact_stored), iterations),
+        "encoded_bytes": len(encode_record(compact_stored)),
+    }
+    for result in (legacy, compact):
+        for key in ("save_us", "load_us", "snapshot_us", "encode_us"):
+            if key in result:
+                result[key] = round(result[key], 2)
+
+    return {
+        "conversation_turns": turns,
+        "iterations": iterations,
+        "legacy": legacy,
+        "compact": compact,
+        "speedup": {
+            key: round(legacy[key] / compact[key], 1) if compact[key] else None
+            for key in ("save_us", "load_us", "snapshot_us")
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Session serialization microbenchmark")
+    parser.add_argument("--turns", type=int, nargs="+", default=[2, 20, 100])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(json.dumps([run_benchmark(t, args.iterations) for t in args.turns], indent=2))
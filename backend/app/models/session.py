@@ -14,6 +14,7 @@ class LoanApplicationState(BaseModel):
     user_id: str
     session_id: str
     current_agent: AgentRole = AgentRole.MASTER
+    state_version: int = 0 # Bumped by StateManager on every change (for delta snapshots)
     
     # Customer Details
     name: Optional[str] = None
@@ -35,6 +36,12 @@ class LoanApplicationState(BaseModel):
     rejection_reason: Optional[str] = None
     sanction_letter_url: Optional[str] = None  # URL to download sanction letter
     
+    # Bureau score / offer / KYC status fetched ahead of underwriting (see app/core/prefetch.py)
+    prefetched_data: Optional[Dict[str, Any]] = None
+    
+    # Approvable alternatives offered after an underwriting rejection (see app/core/eligibility.py)
+    counteroffer: Optional[Dict[str, Any]] = None
+    
     # Audit Trail
     conversation_history: List[Dict[str, str]] = [] # Role: User/Agent, Content: Message
     audit_log: List[str] = []
@@ -47,9 +54,17 @@ class LoanApplicationState(BaseModel):
 class ChatRequest(BaseModel):
     session_id: str
     user_message: str
+    # Optional: last state_version the client holds -> response carries only a delta
+    state_version: Optional[int] = None
+    # Optional: only return these state fields
+    state_fields: Optional[List[str]] = None
+    # Optional: client-generated key per user turn; retries with the same key replay the first result
+    idempotency_key: Optional[str] = None
 
 class ChatResponse(BaseModel):
     session_id: str
     agent_name: str
     message: str
+    state_version: Optional[int] = None
     state_snapshot: Optional[Dict[str, Any]] = None
+    state_delta: Optional[Dict[str, Any]] = None
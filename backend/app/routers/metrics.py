@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Query
+from app.core.responses import FastJSONResponse
+from app.core.cache import cache_stats
+from app.core.intent import intent_classifier
+from app.core.llm_scheduler import llm_scheduler
+from app.core.llm import llm_stats
+from app.core.state_manager import GLOBAL_STATE_STORE
+from app.core.service_clients import all_clients
+from app.core.funnel import funnel_analytics
+from app.core.faq import faq_index
+
+router = APIRouter(default_response_class=FastJSONResponse)
+
+# Operational counters for dashboards / load tests
+
+@router.get("/metrics/cache")
+def get_cache_metrics():
+    """Hit/miss/coalesce counts for the credit score, offer and /chat idempotency caches"""
+    return cache_stats()
+
+@router.get("/metrics/services")
+def get_service_metrics():
+    """Request, retry and circuit breaker counters for downstream service clients"""
+    return {c.name: c.stats() for c in all_clients()}
+
+@router.get("/metrics/intent")
+def get_intent_metrics():
+    """Local intent classifier skip rate, latency and agreement with LLM routing"""
+    return intent_classifier.stats()
+
+@router.get("/metrics/sessions")
+def get_session_metrics():
+    """Live session count, estimated memory and eviction/expiry counters"""
+    return GLOBAL_STATE_STORE.stats()
+
+
+@router.get("/metrics/llm")
+def get_llm_metrics():
+    """LLM admission control (queue, token bucket, waits) and call resilience (retries, hedges, fallbacks, p95/p99)"""
+    return {"scheduler": llm_scheduler.stats(), "calls": llm_stats()}
+
+
+@router.get("/metrics/faq")
+def get_faq_metrics():
+    """Sales FAQ index: confident matches (answerable without the LLM) vs context-only matches, query latency"""
+    return faq_index.stats()
+
+
+@router.get("/analytics/funnel")
+def get_funnel_analytics(
+    hours: float = Query(24, gt=0, description="Window size; rounded out to whole buckets"),
+    series: bool = Query(False, description="Include per-bucket counts"),
+):
+    """Sessions reaching each agent stage, conversion, time per stage, rejection reasons and sanctioned totals"""
+    return funnel_analytics.summary(hours, series)
@@ -1,13 +1,41 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi import APIRouter, HTTPException, UploadFile, File, Depends
 from app.mock.data_generator import mock_db
+from app.core.mock_data import CRM_DATABASE
+from app.core.customer_search import customer_search
+from app.core.responses import FastJSONResponse
 from pydantic import BaseModel
-from typing import List, Optional, Any
+from typing import Dict, List, Optional, Any
+import asyncio
+import random
 import shutil
 import os
 import uuid
 
 router = APIRouter()
 
+# Fault injection so downstream latency/failures can be simulated.
+# Defaults come from env; they can be changed at runtime via PUT /mock/faults
+# only when MOCK_FAULTS_ENABLED=true (load tests / local debugging).
+MOCK_FAULTS_ENABLED = os.getenv("MOCK_FAULTS_ENABLED", "false").lower() == "true"
+FAULT_CONFIG: Dict[str, Dict[str, float]] = {
+    service: {
+        "latency_ms": float(os.getenv("MOCK_LATENCY_MS", "0")),
+        "jitter_ms": float(os.getenv("MOCK_LATENCY_JITTER_MS", "0")),
+        "error_rate": float(os.getenv("MOCK_ERROR_RATE", "0")),
+    }
+    for service in ("crm", "bureau", "offers")
+}
+
+def inject_faults(service: str):
+    async def dependency():
+        config = FAULT_CONFIG[service]
+        delay_ms = config["latency_ms"] + random.uniform(0, config["jitter_ms"])
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000)
+        if config["error_rate"] > 0 and random.random() < config["error_rate"]:
+            raise HTTPException(status_code=503, detail=f"Injected {service} failure")
+    return Depends(dependency)
+
 # Models for response documentation
 class Loan(BaseModel):
     type: str
@@ -33,13 +61,73 @@ class Offer(BaseModel):
     interest_rate: float
     validity: str
 
+class KycStatus(BaseModel):
+    customer_id: str
+    kyc_status: str
+
+class SearchHit(BaseModel):
+    customer: Customer
+    match: str
+    score: float
+
+class CustomerCreate(BaseModel):
+    name: str
+    age: int
+    city: str
+    phone: str
+    pan: str
+    monthly_income: int
+    email: Optional[str] = None
+    existing_loans: List[Loan] = []
+    credit_score: Optional[int] = None
+
+class CustomerUpdate(BaseModel):
+    name: Optional[str] = None
+    age: Optional[int] = None
+    city: Optional[str] = None
+    email: Optional[str] = None
+    phone: Optional[str] = None
+    pan: Optional[str] = None
+    monthly_income: Optional[int] = None
+    existing_loans: Optional[List[Loan]] = None
+
+class ScoreUpdate(BaseModel):
+    score: int
+
+class FaultConfig(BaseModel):
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+
 # CRM Endpoints
-@router.get("/crm/customers", response_model=List[Customer])
+@router.get("/crm/customers", response_model=List[Customer], dependencies=[inject_faults("crm")])
 def get_all_customers():
     """Get list of all mock customers to simulate CRM/Admin view or for testing"""
-    return mock_db.get_all_customers()
+    # Stored rows already match Customer; skip per-row response validation
+    return FastJSONResponse(mock_db.get_all_customers())
 
-@router.get("/crm/customers/{customer_id}", response_model=Customer)
+@router.get("/crm/search", response_model=List[SearchHit], dependencies=[inject_faults("crm")])
+def search_customers(q: str, limit: int = 10):
+    """Search customers by phone (full or last 4+ digits), exact PAN, or fuzzy name"""
+    return FastJSONResponse(customer_search.search(q, limit=min(max(limit, 1), 100)))
+
+@router.get("/crm/customers/by-phone/{phone}", response_model=Customer, dependencies=[inject_faults("crm")])
+def get_customer_by_phone(phone: str):
+    """Look up a customer by mobile number (last 10 digits)"""
+    customer = mock_db.get_customer_by_phone(phone)
+    if not customer:
+        raise HTTPException(status_code=404, detail="Customer not found")
+    return customer
+
+@router.get("/crm/kyc/{customer_id}", response_model=KycStatus, dependencies=[inject_faults("crm")])
+def get_kyc_status(customer_id: str):
+    """KYC status as recorded in CRM"""
+    customer = mock_db.get_customer(customer_id)
+    if not customer or customer["phone"] not in CRM_DATABASE:
+        raise HTTPException(status_code=404, detail="Customer not found")
+    return {"customer_id": customer_id, "kyc_status": CRM_DATABASE[customer["phone"]]["kyc_status"]}
+
+@router.get("/crm/customers/{customer_id}", response_model=Customer, dependencies=[inject_faults("crm")])
 def get_customer_details(customer_id: str):
     """Get KYC details for a specific customer"""
     customer = mock_db.get_customer(customer_id)
@@ -47,8 +135,30 @@ def get_customer_details(customer_id: str):
         raise HTTPException(status_code=404, detail="Customer not found")
     return customer
 
+# CRM writes: offer limit, KYC status and lookup indexes are updated for the affected customer only
+@router.post("/crm/customers", response_model=Customer, status_code=201)
+def create_customer(payload: CustomerCreate):
+    """Register a new customer (optionally with an initial bureau score)"""
+    data = payload.model_dump(exclude={"credit_score"})
+    try:
+        return mock_db.create_customer(data, credit_score=payload.credit_score)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.patch("/crm/customers/{customer_id}", response_model=Customer)
+def update_customer(customer_id: str, payload: CustomerUpdate):
+    """Update customer details; income changes re-derive the pre-approved offer"""
+    # Fields sent as null are left unchanged (every stored field is required)
+    try:
+        customer = mock_db.update_customer(customer_id, payload.model_dump(exclude_none=True))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not customer:
+        raise HTTPException(status_code=404, detail="Customer not found")
+    return customer
+
 # Credit Bureau Endpoints
-@router.get("/bureau/score/{customer_id}", response_model=CreditScore)
+@router.get("/bureau/score/{customer_id}", response_model=CreditScore, dependencies=[inject_faults("bureau")])
 def get_credit_score(customer_id: str):
     """Fetch credit score from mock bureau"""
     score = mock_db.get_credit_score(customer_id)
@@ -56,8 +166,15 @@ def get_credit_score(customer_id: str):
         raise HTTPException(status_code=404, detail="Score not found for user")
     return {"customer_id": customer_id, "score": score}
 
+@router.put("/bureau/score/{customer_id}", response_model=CreditScore)
+def refresh_credit_score(customer_id: str, payload: ScoreUpdate):
+    """Record a refreshed bureau score; re-derives the offer and KYC status"""
+    if not mock_db.set_credit_score(customer_id, payload.score):
+        raise HTTPException(status_code=404, detail="Customer not found")
+    return {"customer_id": customer_id, "score": payload.score}
+
 # Offer Mart Endpoints
-@router.get("/offers/{customer_id}", response_model=Offer)
+@router.get("/offers/{customer_id}", response_model=Offer, dependencies=[inject_faults("offers")])
 def get_customer_offers(customer_id: str):
     """Fetch pre-approved offers"""
     offer = mock_db.get_offer(customer_id)
@@ -70,6 +187,22 @@ def get_customer_offers(customer_id: str):
         }
     return offer
 
+# Fault Injection Endpoints
+@router.get("/mock/faults")
+def get_fault_config():
+    """Current injected latency/error settings per mock service"""
+    return FAULT_CONFIG
+
+@router.put("/mock/faults/{service}")
+def set_fault_config(service: str, config: FaultConfig):
+    """Change injected latency/error settings for one mock service (crm, bureau, offers)"""
+    if not MOCK_FAULTS_ENABLED:
+        raise HTTPException(status_code=403, detail="Fault injection is disabled; set MOCK_FAULTS_ENABLED=true to enable it")
+    if service not in FAULT_CONFIG:
+        raise HTTPException(status_code=404, detail="Unknown service")
+    FAULT_CONFIG[service] = config.model_dump()
+    return FAULT_CONFIG[service]
+
 # File Upload Endpoint
 @router.post("/upload/salary-slip")
 async def upload_salary_slip(file: UploadFile = File(...)):
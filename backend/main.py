@@ -1,12 +1,22 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
+import asyncio
+import hashlib
 import os
+from typing import Dict, Optional, Tuple
 from dotenv import load_dotenv
 from app.models.session import ChatRequest, ChatResponse
 from app.core.state_manager import StateManager
 from app.agents.master_agent import MasterAgent
+from app.core.service_clients import close_clients
+from app.core.session_codec import state_to_dict
+from app.core.profiler import should_profile, profile_turn
+from app.core.responses import FastJSONResponse
+from app.core.compression import CompressionMiddleware
+from app.core.cache import chat_replay_cache
+from app.core.turn_status import start_turn
 
 load_dotenv()
 
@@ -19,8 +29,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Profile-File", "Idempotent-Replayed"],
 )
 
+# gzip/brotli for larger JSON responses (negotiated via Accept-Encoding)
+app.add_middleware(CompressionMiddleware)
+
 # Create static directory for sanction letters
 STATIC_DIR = "static"
 os.makedirs(STATIC_DIR, exist_ok=True)
@@ -42,31 +56,116 @@ async def download_file(filename: str):
 state_manager = StateManager()
 master_agent = MasterAgent(state_manager)
 
-from app.routers import mock_api
+from app.routers import mock_api, metrics
 app.include_router(mock_api.router, prefix="/api", tags=["Mock Services"])
+app.include_router(metrics.router, prefix="/api", tags=["Metrics"])
+
+@app.on_event("shutdown")
+async def shutdown_clients():
+    # Release pooled connections to CRM/Bureau/Offer services
+    await close_clients()
 
 @app.get("/")
 def read_root():
     return {"message": "Agentic Sales Backend Operational", "status": "running"}
 
 @app.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(request: ChatRequest):
+async def chat_endpoint(request: ChatRequest, x_profile: Optional[str] = Header(None)):
+    # Opt-in profiling (PROFILE_ENABLED): "X-Profile: <PROFILE_SECRET>" header or PROFILE_SAMPLE_RATE
+    if not should_profile(x_profile):
+        return await idempotent_chat(request)
+    async with profile_turn(f"chat_{request.session_id}") as profile:
+        result = await idempotent_chat(request)
+    if profile.path:
+        result.headers["X-Profile-File"] = profile.path
+    return result
+
+# Turns with an idempotency key that are still running: (session_id, key) -> (message hash, task).
+# The agents' worker thread cannot be interrupted, so a turn outlives a cancelled (disconnected)
+# caller and the key stays claimed until it has really finished.
+_running_turns: Dict[Tuple[str, str], Tuple[str, asyncio.Task]] = {}
+
+def _start_keyed_turn(key: Tuple[str, str], request: ChatRequest, message_hash: str) -> asyncio.Task:
+    async def run():
+        degraded = start_turn()
+        body = (await handle_chat(request)).body
+        return message_hash, body, not degraded
+
+    task = asyncio.ensure_future(run())
+    _running_turns[key] = (message_hash, task)
+
+    def finished(task: asyncio.Task):
+        if _running_turns.get(key, (None, None))[1] is task:
+            del _running_turns[key]
+        if task.cancelled() or task.exception() is not None:
+            return
+        # Keep the answer even if every caller went away, so a later retry replays it
+        if task.result()[2]:
+            chat_replay_cache.put(key, task.result())
+
+    task.add_done_callback(finished)
+    return task
+
+async def idempotent_chat(request: ChatRequest) -> Response:
+    if not request.idempotency_key:
+        return await handle_chat(request)
+
+    # A retry of a finished turn replays its response body; a retry of a running
+    # turn waits for the same result. Failed and degraded turns are not cached, so
+    # they can be retried. A key belongs to one message: reusing it for another is a 422.
+    key = (request.session_id, request.idempotency_key)
+    message_hash = hashlib.sha256(request.user_message.encode("utf-8")).hexdigest()
+    running = _running_turns.get(key)
+    if running is not None and running[0] != message_hash:
+        # Rejected right away rather than after the running turn finishes
+        raise HTTPException(status_code=422, detail="Idempotency key was already used for a different message")
+    ran = False
+
+    async def run_turn():
+        nonlocal ran
+        ran = True
+        running = _running_turns.get(key)
+        # A caller cancelled mid-turn leaves its turn running; join it instead of starting another
+        task = running[1] if running is not None else _start_keyed_turn(key, request, message_hash)
+        return await asyncio.shield(task)
+
+    stored_hash, body, _ = await chat_replay_cache.get_or_load(key, run_turn, cache_if=lambda entry: entry[2])
+    if stored_hash != message_hash:
+        raise HTTPException(status_code=422, detail="Idempotency key was already used for a different message")
+    headers = {} if ran else {"Idempotent-Replayed": "true"}
+    return Response(content=body, media_type="application/json", headers=headers)
+
+async def handle_chat(request: ChatRequest) -> FastJSONResponse:
+    # Returns the ChatResponse shape as a pre-encoded orjson response: the state
+    # is already validated, so FastAPI's response_model re-validation is skipped
     try:
         # Process via Master Agent
-        response_text = master_agent.process_request(request.session_id, request.user_message)
+        response_text = await master_agent.process_request(request.session_id, request.user_message)
         
         # Get latest state for UI updates (e.g., showing approval card)
         current_state = state_manager.get_state(request.session_id)
         
-        # Serialize state safely
-        state_dict = current_state.dict()
+        if request.state_version is None and not request.state_fields:
+            # Serialize state safely (same shape as current_state.dict(), without the deep copy)
+            return FastJSONResponse({
+                "session_id": request.session_id,
+                "agent_name": current_state.current_agent,
+                "message": response_text,
+                "state_version": current_state.state_version,
+                "state_snapshot": state_to_dict(current_state),
+                "state_delta": None,
+            })
         
-        return ChatResponse(
-            session_id=request.session_id,
-            agent_name=current_state.current_agent,
-            message=response_text,
-            state_snapshot=state_dict
-        )
+        # Client tracks state itself: send only changes since its version and/or the fields it asked for
+        snapshot = state_manager.get_snapshot(request.session_id, request.state_version, request.state_fields)
+        return FastJSONResponse({
+            "session_id": request.session_id,
+            "agent_name": current_state.current_agent,
+            "message": response_text,
+            "state_version": snapshot["version"],
+            "state_snapshot": snapshot["state"] if snapshot["full"] else None,
+            "state_delta": None if snapshot["full"] else snapshot,
+        })
     except Exception as e:
         import traceback
         traceback.print_exc()
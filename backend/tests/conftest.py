@@ -0,0 +1,59 @@
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+# Tests import the app in-process. Everything the app writes relative to the
+# working directory (sanction letters, uploads, intent log, FAQ index cache,
+# profiles) goes to a throwaway directory instead of the checkout.
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+WORK_DIR = tempfile.mkdtemp(prefix="hive-tests-")
+os.chdir(WORK_DIR)
+os.environ.pop("GEMINI_API_KEY", None)
+os.environ.setdefault("INTENT_LOG_PATH", os.path.join(WORK_DIR, "logs", "intent_turns.jsonl"))
+os.environ.setdefault("FAQ_INDEX_PATH", os.path.join(WORK_DIR, "cache", "faq_index.json"))
+os.environ.setdefault("PROFILE_DIR", os.path.join(WORK_DIR, "profiles"))
+
+
+@pytest.fixture
+def session_id():
+    return f"test-{uuid.uuid4().hex[:12]}"
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """
+    Replaces generate_text in the agents with a scripted responder.
+    Set `fake_llm.respond = fn(prompt) -> str`; prompts sent are in `fake_llm.prompts`.
+    A responder returning None simulates an LLM outage: the caller's fallback is returned.
+    """
+    import app.agents.master_agent as master_agent
+    import app.agents.sales_agent as sales_agent
+    import app.agents.verification_agent as verification_agent
+
+    class FakeLLM:
+        def __init__(self):
+            self.prompts = []
+            self.respond = lambda prompt: "NOT_FOUND"
+
+        def __call__(self, prompt, fallback=None):
+            self.prompts.append(prompt)
+            text = self.respond(prompt)
+            return fallback if text is None else text
+
+    fake = FakeLLM()
+    for module in (master_agent, sales_agent, verification_agent):
+        monkeypatch.setattr(module, "generate_text", fake)
+    return fake
+
+
+@pytest.fixture
+def customer():
+    """A CRM customer with a pre-approved offer (PRIME profile)."""
+    from app.mock.data_generator import mock_db
+
+    return next(c for c in mock_db.get_all_customers() if mock_db.get_profile_type(c["id"]) == "PRIME")
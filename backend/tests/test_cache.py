@@ -0,0 +1,140 @@
+import asyncio
+
+import pytest
+
+from app.core.cache import AsyncTTLCache
+
+
+class Loader:
+    def __init__(self, value="v", delay=0.02, error=None):
+        self.calls = 0
+        self.value = value
+        self.delay = delay
+        self.error = error
+
+    async def __call__(self):
+        self.calls += 1
+        n = self.calls
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return f"{self.value}{n}"
+
+
+def test_concurrent_misses_load_once():
+    cache = AsyncTTLCache("t", ttl_seconds=60)
+    loader = Loader()
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_load("k", loader) for _ in range(10)))
+
+    assert asyncio.run(scenario()) == ["v1"] * 10
+    assert loader.calls == 1
+    stats = cache.stats()
+    assert (stats["misses"], stats["coalesced"], stats["inflight"]) == (1, 9, 0)
+
+
+def test_hits_expiry_and_eviction():
+    cache = AsyncTTLCache("t", ttl_seconds=0.05, max_entries=2)
+    loader = Loader(delay=0)
+
+    async def scenario():
+        assert await cache.get_or_load("a", loader) == "v1"
+        assert await cache.get_or_load("a", loader) == "v1"
+        await asyncio.sleep(0.06)
+        assert await cache.get_or_load("a", loader) == "v2"
+        await cache.get_or_load("b", loader)
+        await cache.get_or_load("c", loader)  # evicts "a", the least recently used
+
+    asyncio.run(scenario())
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["evictions"] == 1
+    assert stats["entries"] == 2
+
+
+def test_failures_are_shared_but_not_cached():
+    cache = AsyncTTLCache("t", ttl_seconds=60)
+    failing = Loader(error=RuntimeError("bureau down"))
+
+    async def scenario():
+        results = await asyncio.gather(*(cache.get_or_load("k", failing) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        return await cache.get_or_load("k", Loader(value="ok", delay=0))
+
+    assert asyncio.run(scenario()) == "ok1"
+    assert failing.calls == 1
+
+
+def test_cancelled_loader_hands_the_load_to_a_waiter():
+    cache = AsyncTTLCache("t", ttl_seconds=60)
+    loader = Loader()
+
+    async def scenario():
+        owner = asyncio.create_task(cache.get_or_load("k", loader))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(cache.get_or_load("k", loader)) for _ in range(3)]
+        await asyncio.sleep(0)
+        owner.cancel()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        with pytest.raises(asyncio.CancelledError):
+            await owner
+        return results
+
+    # One waiter reloads; the others join that load instead of being cancelled
+    assert asyncio.run(scenario()) == ["v2"] * 3
+    assert loader.calls == 2
+
+
+def test_cancelled_waiter_does_not_cancel_the_load():
+    cache = AsyncTTLCache("t", ttl_seconds=60)
+    loader = Loader()
+
+    async def scenario():
+        owner = asyncio.create_task(cache.get_or_load("k", loader))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_load("k", loader))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        value = await owner
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return value
+
+    assert asyncio.run(scenario()) == "v1"
+    assert loader.calls == 1
+
+
+def test_values_rejected_by_cache_if_are_shared_but_not_kept():
+    cache = AsyncTTLCache("t", ttl_seconds=60)
+    loader = Loader()
+
+    async def scenario():
+        keep = lambda value: value != "v1"
+        first = await asyncio.gather(*(cache.get_or_load("k", loader, cache_if=keep) for _ in range(3)))
+        second = await cache.get_or_load("k", loader, cache_if=keep)
+        third = await cache.get_or_load("k", loader, cache_if=keep)
+        return first, second, third
+
+    first, second, third = asyncio.run(scenario())
+    assert first == ["v1"] * 3  # concurrent callers still share the load
+    assert (second, third) == ("v2", "v2")
+    assert loader.calls == 2
+
+
+def test_invalidate_during_a_load_discards_its_result():
+    cache = AsyncTTLCache("t", ttl_seconds=60)
+    loader = Loader(delay=0.05)
+
+    async def scenario():
+        first = asyncio.create_task(cache.get_or_load("k", loader))
+        await asyncio.sleep(0.01)
+        cache.invalidate("k")  # e.g. a score refresh while the bureau call is in flight
+        # A caller arriving now must not join the load that read the old data
+        second = await cache.get_or_load("k", loader)
+        return await first, second, await cache.get_or_load("k", loader)
+
+    first, second, third = asyncio.run(scenario())
+    assert (first, second, third) == ("v1", "v2", "v2")
+    assert loader.calls == 2
+    assert cache.stats()["inflight"] == 0
@@ -0,0 +1,188 @@
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from app.core.turn_status import mark_degraded
+
+
+@pytest.fixture
+def turns(monkeypatch):
+    """Replaces the agents with an echo; the list collects the messages actually processed."""
+    class Turns(list):
+        degraded = False
+
+    processed = Turns()
+
+    async def process_request(session_id, user_message):
+        processed.append(user_message)
+        if processed.degraded:
+            mark_degraded("llm_failed")
+        return f"echo {user_message} #{len(processed)}"
+
+    monkeypatch.setattr(main.master_agent, "process_request", process_request)
+    return processed
+
+
+def chat(client, session_id, message, key):
+    return client.post("/chat", json={"session_id": session_id, "user_message": message, "idempotency_key": key})
+
+
+def test_retry_with_same_key_replays(turns, session_id):
+    client = TestClient(main.app)
+    key = uuid.uuid4().hex
+
+    first = chat(client, session_id, "hello", key)
+    retry = chat(client, session_id, "hello", key)
+
+    assert first.status_code == retry.status_code == 200
+    assert "idempotent-replayed" not in first.headers
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.json() == first.json()
+    assert turns == ["hello"]
+
+
+def test_key_reused_for_another_message_is_rejected(turns, session_id):
+    client = TestClient(main.app)
+    key = uuid.uuid4().hex
+
+    assert chat(client, session_id, "hello", key).status_code == 200
+    response = chat(client, session_id, "I want 5 lakhs", key)
+
+    assert response.status_code == 422
+    assert turns == ["hello"]
+
+
+def test_degraded_turns_are_not_replayed(turns, session_id):
+    client = TestClient(main.app)
+    key = uuid.uuid4().hex
+    turns.degraded = True
+
+    first = chat(client, session_id, "hello", key)
+    turns.degraded = False
+    retry = chat(client, session_id, "hello", key)
+    again = chat(client, session_id, "hello", key)
+
+    assert turns == ["hello", "hello"]
+    assert "idempotent-replayed" not in retry.headers
+    assert retry.json()["message"] != first.json()["message"]
+    assert again.headers["idempotent-replayed"] == "true"
+
+
+def test_requests_without_a_key_always_run(turns, session_id):
+    client = TestClient(main.app)
+    for _ in range(2):
+        client.post("/chat", json={"session_id": session_id, "user_message": "hello"})
+    assert turns == ["hello", "hello"]
+
+
+def test_llm_fallback_answers_are_not_replayed(session_id):
+    # No API key in tests: generate_text answers with the caller's fallback, which marks the turn degraded
+    client = TestClient(main.app)
+    key = uuid.uuid4().hex
+
+    chat(client, session_id, "what's the weather like in Pune today?", key)
+    retry = chat(client, session_id, "what's the weather like in Pune today?", key)
+
+    assert retry.status_code == 200
+    assert "idempotent-replayed" not in retry.headers
+
+
+@pytest.fixture
+def slow_turns(monkeypatch):
+    """Agents that block until released; the list collects the messages actually processed."""
+    import asyncio
+
+    class SlowTurns(list):
+        started = None
+        release = None
+
+    processed = SlowTurns()
+
+    async def process_request(session_id, user_message):
+        processed.append(user_message)
+        processed.started.set()
+        await processed.release.wait()
+        return f"echo {user_message} #{len(processed)}"
+
+    monkeypatch.setattr(main.master_agent, "process_request", process_request)
+    return processed
+
+
+def _keyed(session_id, message, key):
+    from app.models.session import ChatRequest
+
+    return ChatRequest(session_id=session_id, user_message=message, idempotency_key=key)
+
+
+def test_cancelled_caller_does_not_rerun_its_turn(slow_turns, session_id):
+    import asyncio
+
+    key = uuid.uuid4().hex
+
+    async def scenario():
+        slow_turns.started, slow_turns.release = asyncio.Event(), asyncio.Event()
+        first = asyncio.create_task(main.idempotent_chat(_keyed(session_id, "hello", key)))
+        await slow_turns.started.wait()
+        retry = asyncio.create_task(main.idempotent_chat(_keyed(session_id, "hello", key)))
+        await asyncio.sleep(0.01)
+        # Client disconnected: the retry must join the running turn, not start a second one
+        first.cancel()
+        await asyncio.sleep(0.01)
+        slow_turns.release.set()
+        response = await retry
+        # Nobody waits on this one; its answer is still kept for later retries
+        late = await main.idempotent_chat(_keyed(session_id, "hello", key))
+        return response, late
+
+    response, late = asyncio.run(scenario())
+    assert slow_turns == ["hello"]
+    assert b"echo hello #1" in response.body
+    assert late.body == response.body
+    assert late.headers["idempotent-replayed"] == "true"
+
+
+def test_orphaned_turn_is_replayed_once_it_finishes(slow_turns, session_id):
+    import asyncio
+
+    key = uuid.uuid4().hex
+
+    async def scenario():
+        slow_turns.started, slow_turns.release = asyncio.Event(), asyncio.Event()
+        first = asyncio.create_task(main.idempotent_chat(_keyed(session_id, "hello", key)))
+        await slow_turns.started.wait()
+        first.cancel()
+        await asyncio.sleep(0.01)
+        slow_turns.release.set()
+        await asyncio.sleep(0.01)
+        return await main.idempotent_chat(_keyed(session_id, "hello", key))
+
+    response = asyncio.run(scenario())
+    assert slow_turns == ["hello"]
+    assert response.headers["idempotent-replayed"] == "true"
+
+
+def test_key_reused_during_a_running_turn_is_rejected_immediately(slow_turns, session_id):
+    import asyncio
+
+    from fastapi import HTTPException
+
+    key = uuid.uuid4().hex
+
+    async def scenario():
+        slow_turns.started, slow_turns.release = asyncio.Event(), asyncio.Event()
+        first = asyncio.create_task(main.idempotent_chat(_keyed(session_id, "hello", key)))
+        await slow_turns.started.wait()
+        try:
+            # The first turn is still blocked, so this only passes if the 422 does not wait for it
+            with pytest.raises(HTTPException) as rejected:
+                await asyncio.wait_for(main.idempotent_chat(_keyed(session_id, "I want 5 lakhs", key)), 1)
+        finally:
+            slow_turns.release.set()
+            await first
+        return rejected.value
+
+    rejected = asyncio.run(scenario())
+    assert rejected.status_code == 422
+    assert slow_turns == ["hello"]
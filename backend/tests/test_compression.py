@@ -0,0 +1,79 @@
+import gzip
+
+import brotli
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.core import compression
+from app.core.compression import CompressionMiddleware, choose_encoding
+
+BIG = {"items": [{"n": n, "text": "loan offer details"} for n in range(200)]}
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("", None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("gzip, br", "br"),
+    ("br;q=0.5, gzip", "gzip"),
+    ("br;q=0, gzip;q=0", None),
+    ("*", "br"),
+    ("*;q=0, gzip", "gzip"),
+    ("GZIP ; q=0.8", "gzip"),
+    ("br;q=abc, gzip;q=0.1", "gzip"),
+])
+def test_choose_encoding(header, expected):
+    assert choose_encoding(header) == expected
+
+
+def test_choose_encoding_without_brotli(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    assert choose_encoding("br, gzip") == "gzip"
+    assert choose_encoding("br") is None
+
+
+def make_client() -> TestClient:
+    def stream(request):
+        return StreamingResponse(iter([b"x" * 2000, b"y" * 2000]), media_type="text/plain")
+
+    app = Starlette(routes=[
+        Route("/big", lambda request: JSONResponse(BIG)),
+        Route("/small", lambda request: JSONResponse({"ok": True})),
+        Route("/pdf", lambda request: Response(b"%PDF" + b"0" * 4000, media_type="application/pdf")),
+        Route("/stream", stream),
+    ])
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    return TestClient(app)
+
+
+def raw_get(client, path, accept_encoding):
+    with client.stream("GET", path, headers={"Accept-Encoding": accept_encoding}) as response:
+        return response, b"".join(response.iter_raw())
+
+
+@pytest.mark.parametrize("accept, encoding, decode", [
+    ("br, gzip", "br", brotli.decompress),
+    ("gzip", "gzip", gzip.decompress),
+])
+def test_large_json_is_compressed(accept, encoding, decode):
+    response, body = raw_get(make_client(), "/big", accept)
+    assert response.headers["content-encoding"] == encoding
+    assert response.headers["content-length"] == str(len(body))
+    assert "accept-encoding" in response.headers["vary"].lower()
+    assert decode(body) == JSONResponse(BIG).body
+
+
+@pytest.mark.parametrize("path", ["/small", "/pdf", "/stream"])
+def test_small_binary_and_streamed_responses_pass_through(path):
+    response, body = raw_get(make_client(), path, "br, gzip")
+    assert "content-encoding" not in response.headers
+    assert len(body) > 0
+
+
+def test_no_accept_encoding_is_untouched():
+    response, body = raw_get(make_client(), "/big", "identity")
+    assert "content-encoding" not in response.headers
+    assert body == JSONResponse(BIG).body
@@ -0,0 +1,78 @@
+import json
+import threading
+
+import pytest
+
+from app.core.faq import FaqIndex, tokenize
+
+
+@pytest.fixture
+def index(tmp_path):
+    return FaqIndex(index_path=str(tmp_path / "faq_index.json"))
+
+
+def test_tokenize_drops_stopwords_and_normalises():
+    assert tokenize("What's the MAX duration for loans?") == ["maximum", "tenure", "loan"]
+
+
+@pytest.mark.parametrize("question, entry_id", [
+    ("what is the maximum tenure?", "tenure"),
+    ("what is the interest rate", "interest_rate"),
+    ("which documents are required", "documents"),
+    ("what is the minimum loan amount", "min_amount"),
+])
+def test_clear_product_questions_are_confident(index, question, entry_id):
+    best = index.query(question)[0]
+    assert best.entry_id == entry_id
+    assert best.confident
+    assert "{" not in best.answer  # template filled
+
+
+@pytest.mark.parametrize("question", [
+    "what is my pre-approved limit", "what is my emi", "am I eligible for the maximum amount",
+    "can I borrow 300000", "what interest rate is on my offer",
+])
+def test_questions_about_the_customer_are_never_confident(index, question):
+    matches = index.query(question)
+    assert matches  # still useful as LLM context
+    assert not any(m.confident for m in matches)
+
+
+def _corpus_questions():
+    from app.core.faq import CORPUS_PATH
+
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        return [(question, entry["id"]) for entry in json.load(f) for question in entry["questions"]]
+
+
+@pytest.mark.parametrize("question, entry_id", _corpus_questions())
+def test_corpus_questions_are_answered_directly(index, question, entry_id):
+    # Includes general first-person questions ("what credit score do I need")
+    best = index.query(question)[0]
+    assert best.entry_id == entry_id
+    assert best.confident
+
+
+def test_cached_index_is_reused(tmp_path):
+    path = str(tmp_path / "faq_index.json")
+    assert not FaqIndex(index_path=path).loaded_from_cache
+    cached = FaqIndex(index_path=path)
+    assert cached.loaded_from_cache
+    assert cached.query("what is the maximum tenure?")[0].entry_id == "tenure"
+
+
+def test_metrics_are_consistent_under_concurrent_queries(index):
+    def worker():
+        for _ in range(200):
+            index.query("what is the interest rate")
+            index.query("what is my emi")
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = index.stats()
+    assert stats["queries"] == 3200
+    assert stats["confident"] == stats["context_only"] == 1600
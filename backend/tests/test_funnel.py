@@ -0,0 +1,84 @@
+from app.core.funnel import FunnelAnalytics
+from app.core.session_codec import to_record
+from app.models.session import AgentRole, LoanApplicationState
+
+HOUR = 3600
+T0 = 500000 * HOUR  # start of a bucket
+
+
+class Session:
+    """Feeds a session's successive saves into the analytics, like StateManager.save_state does."""
+
+    def __init__(self, funnel: FunnelAnalytics, session_id: str):
+        self.funnel = funnel
+        self.state = LoanApplicationState(user_id="guest", session_id=session_id)
+        self.previous = None
+
+    def save(self, now: float, **changes):
+        for key, value in changes.items():
+            setattr(self.state, key, value)
+        record = to_record(self.state)
+        self.funnel.observe(self.state.session_id, self.previous, record, now=now)
+        self.previous = record
+
+
+def test_stages_are_counted_once_per_session():
+    funnel = FunnelAnalytics(bucket_seconds=HOUR)
+    a = Session(funnel, "a")
+    a.save(T0)
+    for n, agent in enumerate([AgentRole.SALES, AgentRole.UNDERWRITING, AgentRole.SALES, AgentRole.UNDERWRITING], 1):
+        a.save(T0 + n, current_agent=agent)
+    Session(funnel, "b").save(T0 + 10)
+
+    stages = funnel.summary(hours=1, now=T0 + 60)["stages"]
+    assert stages["MASTER"] == 2
+    assert stages["SALES"] == 1
+    assert stages["UNDERWRITING"] == 1
+
+
+def test_approvals_are_counted_once():
+    funnel = FunnelAnalytics(bucket_seconds=HOUR)
+    a = Session(funnel, "a")
+    a.save(T0, current_agent=AgentRole.UNDERWRITING)
+    # What UnderwritingAgent does on approval: record the decision and save is_approved
+    funnel.record_decision("APPROVE", "pre_approved_override", now=T0 + 1)
+    a.save(T0 + 1, is_approved=True, current_agent=AgentRole.SANCTION)
+    # Re-approved after a renegotiation: still one approved session
+    a.save(T0 + 2, is_approved=False)
+    a.save(T0 + 3, is_approved=True)
+    funnel.record_decision("REJECT", "credit_score_floor", now=T0 + 4)
+
+    summary = funnel.summary(hours=1, now=T0 + 60)
+    assert summary["stages"]["APPROVED"] == 1
+    assert summary["decisions"] == {"REJECT": 1, "APPROVE": 1}
+    assert summary["rejection_reasons"] == {"credit_score_floor": 1}
+
+
+def test_sanction_rate_uses_the_underwriting_cohort():
+    funnel = FunnelAnalytics(bucket_seconds=HOUR)
+    early = Session(funnel, "early")
+    early.save(T0, current_agent=AgentRole.UNDERWRITING)
+    late = Session(funnel, "late")
+    late.save(T0 + 2 * HOUR, current_agent=AgentRole.UNDERWRITING)
+    # The early session is sanctioned in the late session's bucket
+    early.save(T0 + 2 * HOUR + 5, sanction_letter_url="/download/a.pdf", loan_amount=100000.0)
+
+    last_hour = funnel.summary(hours=1, now=T0 + 2 * HOUR + 60)
+    assert last_hour["stages"]["UNDERWRITING"] == 1
+    assert last_hour["sanctioned"] == {"count": 1, "amount": 100000.0}
+    # Only the late session reached underwriting in this window, and it has not been sanctioned
+    assert last_hour["sanction_rate_from_underwriting"] == 0.0
+
+    whole = funnel.summary(hours=3, now=T0 + 2 * HOUR + 60)
+    assert whole["stages"]["UNDERWRITING"] == 2
+    assert whole["sanction_rate_from_underwriting"] == 0.5
+
+
+def test_series_and_retention():
+    funnel = FunnelAnalytics(bucket_seconds=HOUR, retention_buckets=2)
+    for n in range(3):
+        Session(funnel, f"s{n}").save(T0 + n * HOUR)
+
+    summary = funnel.summary(hours=10, series=True, now=T0 + 2 * HOUR + 1)
+    assert [point["start"] for point in summary["series"]] == [T0 + HOUR, T0 + 2 * HOUR]
+    assert summary["stages"]["MASTER"] == 2
@@ -0,0 +1,119 @@
+import json
+import threading
+import time
+
+from app.core import intent
+from app.core.intent import GREETING, LOAN_INTEREST, IntentClassifier, redact
+
+
+def make_classifier(tmp_path):
+    return IntentClassifier(log_path=str(tmp_path / "intent_turns.jsonl"))
+
+
+def test_loan_keywords_do_not_force_a_confident_label(tmp_path):
+    classifier = make_classifier(tmp_path)
+    for text in [
+        "I already have a loan with another bank and I am just browsing",
+        "can I close my loan early",
+        "what is the EMI for 2 lakh?",
+    ]:
+        result = classifier.classify(text)
+        assert not (result.confident and result.label == LOAN_INTEREST), (text, result)
+
+    assert classifier.classify("hi").label == GREETING
+    result = classifier.classify("I need a personal loan of 3 lakhs")
+    assert result.confident and result.label == LOAN_INTEREST
+
+
+def test_sales_checks_do_not_count_as_routing(tmp_path):
+    classifier = make_classifier(tmp_path)
+    classifier.classify("hello", count_as_routing=False)
+    classifier.classify("hello")
+    stats = classifier.stats()
+    assert stats["classified"] == 1
+    assert stats["sales_checks"] == 1
+    assert stats["skip_rate"] == 1.0
+
+
+def test_logged_examples_are_redacted(tmp_path):
+    classifier = make_classifier(tmp_path)
+    text = "I am Ravi Kumar, PAN ABCDE1234F, mail ravi.k@example.com, phone 9876543210, need a loan"
+    predicted = classifier.classify(text)
+    classifier.record_llm_label(text, predicted, routed_to_sales=True)
+
+    logged = (tmp_path / "intent_turns.jsonl").read_text(encoding="utf-8")
+    for secret in ("ravi", "kumar", "abcde1234f", "example", "9876543210"):
+        assert secret not in logged.lower()
+    entry = json.loads(logged)
+    assert entry["intent"] == LOAN_INTEREST
+    assert "loan" in entry["text"].split()
+
+
+def test_redact_keeps_seed_vocabulary():
+    assert redact("I want a loan of 200000 Suresh", {"i", "want", "a", "loan", "of"}) == "i want a loan of _num_ _unk_"
+
+
+def test_retrain_runs_off_the_request_path(tmp_path, monkeypatch):
+    classifier = make_classifier(tmp_path)
+    monkeypatch.setattr(intent, "INTENT_RETRAIN_EVERY", 2)
+    started, release = threading.Event(), threading.Event()
+    threads = []
+
+    def slow_retrain():
+        threads.append(threading.current_thread().name)
+        started.set()
+        release.wait(5)
+
+    monkeypatch.setattr(classifier, "retrain", slow_retrain)
+    predicted = classifier.classify("maybe")
+    began = time.perf_counter()
+    for _ in range(4):
+        classifier.record_llm_label("maybe", predicted, routed_to_sales=False)
+    assert time.perf_counter() - began < 1.0
+    assert started.wait(5)
+    release.set()
+
+    # Single-flight: one background retrain even though the threshold was crossed twice
+    assert threads == ["intent-retrain"]
+
+
+def test_log_is_capped_on_retrain(tmp_path, monkeypatch):
+    monkeypatch.setattr(intent, "INTENT_LOG_MAX_EXAMPLES", 5)
+    log = tmp_path / "intent_turns.jsonl"
+    log.write_text("".join(json.dumps({"text": f"loan {i}", "intent": LOAN_INTEREST}) + "\n" for i in range(20)), encoding="utf-8")
+
+    classifier = IntentClassifier(log_path=str(log))
+
+    lines = log.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 5
+    assert all(json.loads(line)["text"] == "loan _num_" for line in lines)
+    assert classifier.stats()["training_examples"] == len(classifier._seed) + 5
+
+
+def test_llm_greetings_are_logged_as_greetings(tmp_path):
+    classifier = make_classifier(tmp_path)
+    for text, routed, greeted in [
+        ("hi, how are you doing today?", False, True),
+        ("i'd like a personal loan please", True, False),
+        ("what's the weather like", False, False),
+    ]:
+        classifier.record_llm_label(text, classifier.classify(text), routed_to_sales=routed, greeted=greeted)
+
+    lines = (tmp_path / "intent_turns.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["intent"] for line in lines] == [GREETING, LOAN_INTEREST, intent.OTHER]
+
+
+def test_master_agent_tags_greeting_labels(fake_llm, session_id, monkeypatch):
+    from main import master_agent, state_manager
+
+    recorded = []
+    # Not resolvable locally, so the LLM decides
+    monkeypatch.setattr(intent.intent_classifier, "classify", lambda text: intent.IntentResult(intent.OTHER, 0.4, "model"))
+    monkeypatch.setattr(intent.intent_classifier, "record_llm_label", lambda text, predicted, routed, greeted=False: recorded.append((routed, greeted)))
+    fake_llm.respond = lambda prompt: "Hello! Welcome to Hive Capital Personal Loans. <INTENT:GREETING>"
+    state = state_manager.get_state(session_id)
+
+    response = master_agent._handle_master_logic(state, "hey there, how's it going today?")
+
+    assert response == "Hello! Welcome to Hive Capital Personal Loans."
+    assert recorded == [(False, True)]
@@ -0,0 +1,45 @@
+from app.core import llm
+from app.core.llm import generate_text
+from app.core.turn_status import start_turn
+
+
+def test_no_client_returns_the_callers_fallback(monkeypatch):
+    monkeypatch.setattr(llm, "client", None)
+    degraded = start_turn()
+
+    assert generate_text("prompt", fallback="canned") == "canned"
+    assert generate_text("prompt").startswith("System Error")
+    assert degraded == {"llm_unavailable"}
+
+
+def test_verification_falls_back_to_the_raw_message_for_phones(monkeypatch, session_id):
+    from app.agents.verification_agent import VerificationAgent
+    from app.core.state_manager import StateManager
+    from app.models.session import AgentRole
+
+    monkeypatch.setattr(llm, "client", None)
+    manager = StateManager()
+    state = manager.get_state(session_id)
+    state.current_agent = AgentRole.VERIFICATION
+    manager.save_state(state)
+
+    response = VerificationAgent().process(state, "my number is 9000000003")
+
+    assert "share your full name" in response
+    assert manager.get_state(session_id).phone == "9000000003"
+
+
+def test_master_does_not_learn_from_canned_replies(monkeypatch, session_id):
+    from app.core import intent
+    from main import master_agent, state_manager
+
+    monkeypatch.setattr(llm, "client", None)
+    recorded = []
+    monkeypatch.setattr(intent.intent_classifier, "classify", lambda text: intent.IntentResult(intent.OTHER, 0.4, "model"))
+    monkeypatch.setattr(intent.intent_classifier, "record_llm_label", lambda *args, **kwargs: recorded.append(args))
+    state = state_manager.get_state(session_id)
+
+    response = master_agent._handle_master_logic(state, "what do you folks do?")
+
+    assert not response.startswith("System Error")
+    assert recorded == []
@@ -0,0 +1,64 @@
+import threading
+import time
+
+import pytest
+
+from app.core.llm_scheduler import LLMOverloaded, LLMScheduler
+
+
+def admission_order(scheduler: LLMScheduler, priorities, gap: float = 0.0):
+    """Queue one caller per priority behind a held slot, then record who gets in first."""
+    order = []
+    scheduler.acquire(priority=0)  # hold the only slot
+
+    def caller(priority):
+        scheduler.acquire(priority=priority)
+        order.append(priority)
+        scheduler.release()
+
+    threads = []
+    for priority in priorities:
+        thread = threading.Thread(target=caller, args=(priority,))
+        thread.start()
+        threads.append(thread)
+        while scheduler.stats()["queue_depth"] < len(threads):
+            time.sleep(0.001)
+        time.sleep(gap)
+    scheduler.release()
+    for thread in threads:
+        thread.join(timeout=5)
+    return order
+
+
+def test_strict_priority_without_aging():
+    scheduler = LLMScheduler(max_concurrency=1, rate_per_minute=60000, burst=100, aging_seconds=0)
+    assert admission_order(scheduler, [2, 1, 0]) == [0, 1, 2]
+
+
+def test_waiting_ages_a_low_priority_call():
+    scheduler = LLMScheduler(max_concurrency=1, rate_per_minute=60000, burst=100, aging_seconds=0.02)
+    # The greeting has waited well past two aging intervals when the late-funnel call arrives
+    assert admission_order(scheduler, [2, 0], gap=0.1) == [2, 0]
+    # Arriving together, priority still wins
+    assert admission_order(scheduler, [2, 0]) == [0, 2]
+
+
+def test_queue_full_and_deadline_are_rejected():
+    scheduler = LLMScheduler(max_concurrency=1, rate_per_minute=60000, burst=100, max_queue=1, max_wait_seconds=0.05)
+    scheduler.acquire()
+    with pytest.raises(LLMOverloaded, match="not admitted"):
+        scheduler.acquire()
+
+    waiter = threading.Thread(target=lambda: pytest.raises(LLMOverloaded, scheduler.acquire))
+    waiter.start()
+    while scheduler.stats()["queue_depth"] < 1:
+        time.sleep(0.001)
+    with pytest.raises(LLMOverloaded, match="full"):
+        scheduler.acquire()
+    waiter.join()
+    scheduler.release()
+
+    stats = scheduler.stats()
+    assert stats["rejected_queue_full"] == 1
+    assert stats["rejected_timeout"] == 2
+    assert stats["queue_depth"] == 0 and stats["in_flight"] == 0
@@ -0,0 +1,69 @@
+import asyncio
+import time
+
+from app.agents import master_agent as master_agent_module
+
+
+def sales_session(state_manager, session_id, customer):
+    state = state_manager.get_state(session_id)
+    state.current_agent = state.current_agent.SALES
+    state.phone = customer["phone"]
+    state.user_id = customer["id"]
+    state.pre_approved_limit = 500000.0
+    state_manager.save_state(state)
+
+
+def test_concurrent_turns_on_one_session_are_serialized(fake_llm, session_id, customer):
+    from main import master_agent, state_manager
+
+    sales_session(state_manager, session_id, customer)
+
+    def respond(prompt):
+        time.sleep(0.05)
+        return 'Sure. <JSON>{"amount": null, "tenure": null, "action": "CONTINUE"}</JSON>'
+
+    fake_llm.respond = respond
+
+    async def scenario():
+        await asyncio.gather(
+            master_agent.process_request(session_id, "tell me about rates"),
+            master_agent.process_request(session_id, "and about fees"),
+        )
+
+    asyncio.run(scenario())
+
+    history = state_manager.get_state(session_id).conversation_history
+    assert [m["role"] for m in history] == ["user", "agent", "user", "agent"]
+    assert {history[0]["content"], history[2]["content"]} == {"tell me about rates", "and about fees"}
+
+
+def test_prefetch_finishing_mid_turn_does_not_drop_agent_updates(monkeypatch, fake_llm, session_id, customer):
+    from main import master_agent, state_manager
+
+    sales_session(state_manager, session_id, customer)
+
+    async def slow_prefetch(phone):
+        await asyncio.sleep(0.05)
+        return {"customer_id": customer["id"], "credit_score": 800}
+
+    monkeypatch.setattr(master_agent_module, "prefetch_customer_data", slow_prefetch)
+
+    def respond(prompt):
+        if "300000" in prompt:
+            # Still negotiating when the prefetch lands
+            time.sleep(0.2)
+            return 'Done. <JSON>{"amount": 300000, "tenure": 24, "action": "CONTINUE"}</JSON>'
+        return 'Hello. <JSON>{"amount": null, "tenure": null, "action": "CONTINUE"}</JSON>'
+
+    fake_llm.respond = respond
+
+    async def scenario():
+        await master_agent.process_request(session_id, "hi")
+        await master_agent.process_request(session_id, "I want 300000 for 24 months")
+
+    asyncio.run(scenario())
+
+    state = state_manager.get_state(session_id)
+    assert state.loan_amount == 300000
+    assert state.loan_tenure == 24
+    assert state.prefetched_data == {"customer_id": customer["id"], "credit_score": 800}
@@ -0,0 +1,47 @@
+from fastapi.testclient import TestClient
+
+import main
+from app.mock.data_generator import mock_db
+
+
+def test_patch_customer_ignores_null_fields():
+    customer = dict(mock_db.get_all_customers()[-1])
+    client = TestClient(main.app)
+    url = f"/api/crm/customers/{customer['id']}"
+
+    try:
+        response = client.patch(url, json={"phone": None, "name": None, "city": "Pune"})
+        assert response.status_code == 200
+        body = response.json()
+        assert body["phone"] == customer["phone"]
+        assert body["name"] == customer["name"]
+        assert body["city"] == "Pune"
+        # The phone index was not disturbed
+        assert client.get(f"/api/crm/customers/by-phone/{customer['phone']}").json()["id"] == customer["id"]
+    finally:
+        client.patch(url, json={"city": customer["city"]})
+
+
+def test_patch_unknown_customer_is_404():
+    response = TestClient(main.app).patch("/api/crm/customers/NOPE", json={"name": None})
+    assert response.status_code == 404
+
+
+def test_create_customer_serializes_nested_loans(monkeypatch):
+    import warnings
+
+    created = []
+    # Keep the shared mock DB untouched; only the handler's serialization is under test
+    monkeypatch.setattr(mock_db, "create_customer", lambda data, credit_score=None: created.append(data) or {"id": "CUST999", **data})
+    payload = {
+        "name": "Mock Api Tester", "age": 30, "city": "Pune", "phone": "9000012345", "pan": "MOCKA1234Z",
+        "email": "tester@example.com", "monthly_income": 50000, "existing_loans": [{"type": "Car Loan", "emi": 5000}], "credit_score": 700,
+    }
+    with warnings.catch_warnings():
+        # payload.dict() is deprecated in Pydantic v2
+        warnings.simplefilter("error", DeprecationWarning)
+        response = TestClient(main.app).post("/api/crm/customers", json=payload)
+
+    assert response.status_code == 201
+    assert "credit_score" not in created[0]
+    assert created[0]["existing_loans"] == payload["existing_loans"]
@@ -0,0 +1,61 @@
+import json
+
+from app.core.rules_engine import DEFAULT_RULES_PATH, UnderwritingPolicy
+from app.mock import policy_simulator
+from app.mock.policy_simulator import build_profiles, run_simulation
+
+
+def write_candidate(tmp_path, edit):
+    with open(DEFAULT_RULES_PATH, "r", encoding="utf-8") as f:
+        table = json.load(f)
+    edit(table)
+    path = tmp_path / "candidate.json"
+    path.write_text(json.dumps(table), encoding="utf-8")
+    return str(path)
+
+
+def record_applications(monkeypatch, rules_path, profiles):
+    seen = []
+    decide = UnderwritingPolicy.decide
+
+    def recording(self, score, amount, limit, salary, tenure=None, rate=None, slip=False, fired_rules=None):
+        if not slip:
+            seen.append((score, amount, tenure))
+        return decide(self, score, amount, limit, salary, tenure, rate, slip, fired_rules)
+
+    monkeypatch.setattr(UnderwritingPolicy, "decide", recording)
+    report = run_simulation(3000, rules_path, workers=1, seed=7, profiles=profiles)
+    monkeypatch.setattr(UnderwritingPolicy, "decide", decide)
+    return seen, report
+
+
+def test_same_seed_gives_same_applications_under_different_rules(monkeypatch, tmp_path):
+    monkeypatch.setattr(policy_simulator, "CHUNK_SIZE", 1000)
+    profiles = build_profiles()
+
+    def stricter(table):
+        table["thresholds"]["max_emi_to_income"] = 0.2
+
+    baseline, base_report = record_applications(monkeypatch, DEFAULT_RULES_PATH, profiles)
+    candidate, cand_report = record_applications(monkeypatch, write_candidate(tmp_path, stricter), profiles)
+
+    assert len(baseline) == 3000
+    assert baseline == candidate
+    assert cand_report["overall"]["approved"] < base_report["overall"]["approved"]
+
+
+def test_candidate_offer_tiers_are_exercised(tmp_path):
+    profiles = build_profiles()
+
+    def no_offers(table):
+        for tier in table["offer_tiers"]:
+            tier["multiplier"] = 0
+
+    baseline = run_simulation(2000, DEFAULT_RULES_PATH, workers=1, seed=3, profiles=profiles)
+    candidate = run_simulation(2000, write_candidate(tmp_path, no_offers), workers=1, seed=3, profiles=profiles)
+
+    # Without offers every customer falls back to the income-based dynamic limit
+    assert candidate["overall"] != baseline["overall"]
+    prime = candidate["by_profile"]["PRIME"]
+    assert prime["applications"] == baseline["by_profile"]["PRIME"]["applications"]
+    assert prime["approved"] != baseline["by_profile"]["PRIME"]["approved"]
@@ -0,0 +1,62 @@
+import asyncio
+
+from app.core.mock_data import CRM_DATABASE
+from app.core.prefetch import prefetch_customer_data
+from app.core.rules_engine import get_policy
+from app.mock.data_generator import mock_db
+
+
+def test_prefetch_known_customer(customer):
+    data = asyncio.run(prefetch_customer_data(customer["phone"]))
+
+    offer = mock_db.get_offer(customer["id"])
+    assert data["customer_id"] == customer["id"]
+    assert data["pan"] == customer["pan"]
+    assert data["credit_score"] == mock_db.get_credit_score(customer["id"])
+    assert data["pre_approved_limit"] == offer["pre_approved_limit"]
+    assert data["interest_rate"] == offer["interest_rate"]
+    assert data["current_salary"] == customer["monthly_income"]
+    assert data["kyc_status"] == CRM_DATABASE[customer["phone"]]["kyc_status"]
+
+
+def test_prefetch_unknown_phone_uses_defaults():
+    data = asyncio.run(prefetch_customer_data("0000000000"))
+
+    assert data["customer_id"] is None
+    assert data["credit_score"] == get_policy().default_score
+    assert data["pre_approved_limit"] == 0.0
+    assert data["kyc_status"] is None
+
+
+def test_prefetch_sees_score_refresh(customer):
+    original = mock_db.get_credit_score(customer["id"])
+    asyncio.run(prefetch_customer_data(customer["phone"]))  # warm the score cache
+    try:
+        mock_db.set_credit_score(customer["id"], 610)
+        data = asyncio.run(prefetch_customer_data(customer["phone"]))
+        assert data["credit_score"] == 610
+        assert data["pre_approved_limit"] == 0.0
+    finally:
+        mock_db.set_credit_score(customer["id"], original)
+
+
+def test_turn_with_phone_stores_prefetched_data(fake_llm, session_id, customer):
+    from main import master_agent, state_manager
+
+    state = state_manager.get_state(session_id)
+    state.current_agent = state.current_agent.SALES
+    state.phone = customer["phone"]
+    state.user_id = customer["id"]
+    state_manager.save_state(state)
+    fake_llm.respond = lambda prompt: '{"response": "How much would you like to borrow?", "action": "CONTINUE"}'
+
+    async def scenario():
+        await master_agent.process_request(session_id, "hello")
+        # The prefetch runs in the background; asyncio.run would cancel it on return
+        await master_agent._await_prefetch(session_id)
+
+    asyncio.run(scenario())
+
+    prefetched = state_manager.get_state(session_id).prefetched_data
+    assert prefetched is not None
+    assert prefetched["customer_id"] == customer["id"]
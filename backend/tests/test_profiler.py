@@ -0,0 +1,69 @@
+import asyncio
+import os
+import time
+from types import SimpleNamespace
+
+from app.core import llm, profiler
+from app.core.profiler import profile_turn, prune_profiles, should_profile
+
+
+def test_profiling_is_off_unless_enabled(monkeypatch):
+    monkeypatch.setattr(profiler, "PROFILE_SECRET", "s3cret")
+    monkeypatch.setattr(profiler, "PROFILE_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(profiler, "PROFILE_ENABLED", False)
+    assert not should_profile("s3cret")
+    assert not should_profile(None)
+
+
+def test_header_must_match_the_secret(monkeypatch):
+    monkeypatch.setattr(profiler, "PROFILE_ENABLED", True)
+    monkeypatch.setattr(profiler, "PROFILE_SAMPLE_RATE", 0.0)
+    monkeypatch.setattr(profiler, "PROFILE_SECRET", "s3cret")
+    assert should_profile("s3cret")
+    for header in ("1", "true", "s3cret ", "", "S3CRET"):
+        assert not should_profile(header)
+    assert not should_profile(None)
+
+    # Without a configured secret the header never forces a profile
+    monkeypatch.setattr(profiler, "PROFILE_SECRET", "")
+    assert not should_profile("")
+    assert not should_profile("1")
+
+
+def test_prune_keeps_newest_files_within_age(tmp_path):
+    now = time.time()
+    for n in range(5):
+        path = tmp_path / f"p{n}.speedscope.json"
+        path.write_text("{}")
+        os.utime(path, (now - n, now - n))
+    stale = tmp_path / "old.folded"
+    stale.write_text("")
+    os.utime(stale, (now - 7200, now - 7200))
+    unrelated = tmp_path / "notes.txt"
+    unrelated.write_text("")
+    os.utime(unrelated, (now - 7200, now - 7200))
+
+    prune_profiles(str(tmp_path), max_files=3, max_age_seconds=3600)
+
+    assert sorted(os.listdir(tmp_path)) == ["notes.txt", "p0.speedscope.json", "p1.speedscope.json", "p2.speedscope.json"]
+
+
+def test_turn_profile_samples_llm_request_threads(monkeypatch):
+    def generate_content(model, contents):
+        time.sleep(0.1)
+        return SimpleNamespace(text="ok")
+
+    monkeypatch.setattr(llm, "client", SimpleNamespace(models=SimpleNamespace(generate_content=generate_content)))
+
+    async def scenario():
+        async with profile_turn("llm-test") as profile:
+            text = await asyncio.to_thread(llm._attempt, llm.MODEL_NAME, "hi", 0, 5)
+        return text, profile
+
+    text, profile = asyncio.run(scenario())
+
+    assert text == "ok"
+    llm_stacks = [stack for thread, _, stack in profile.samples if thread.startswith("llm-")]
+    assert llm_stacks
+    assert any(frame[1] == "generate_content" for stack in llm_stacks for frame in stack)
+    assert os.path.exists(profile.path)
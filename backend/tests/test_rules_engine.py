@@ -0,0 +1,157 @@
+import json
+import os
+import time
+
+import pytest
+
+from app.core.rules_engine import DEFAULT_RULES_PATH, PolicyStore, UnderwritingPolicy, calculate_emi
+
+
+def load_table():
+    with open(DEFAULT_RULES_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def policy():
+    return UnderwritingPolicy(load_table())
+
+
+# The hand-written underwriting logic the rule table replaced; the table must decide the same way.
+def baseline_limit(score, pre_approved_limit, salary):
+    if pre_approved_limit == 0.0 and salary > 0:
+        multiplier = 10 if score >= 800 else 8 if score >= 750 else 5 if score >= 700 else 3
+        pre_approved_limit = salary * multiplier
+    if pre_approved_limit == 0.0:
+        multiplier = 5 if score >= 750 else 3 if score >= 700 else 2
+        pre_approved_limit = 50000.0 * multiplier
+        salary = 50000.0
+    return pre_approved_limit, salary
+
+
+def baseline_decide(score, loan_amount, limit, salary, tenure, rate, slip):
+    if loan_amount <= 0:
+        return "NEED_AMOUNT"
+    if loan_amount <= limit:
+        return "APPROVE"
+    if score < 700:
+        return "REJECT"
+    if loan_amount <= 2 * limit:
+        if not slip:
+            return "NEED_SALARY_SLIP"
+        return "APPROVE" if calculate_emi(loan_amount, rate, tenure) <= 0.5 * salary else "REJECT"
+    return "REJECT"
+
+
+def baseline_offer(score, income):
+    if score is None or score < 650:
+        return None
+    return {
+        "pre_approved_limit": income * (10 if score >= 750 else 5),
+        "interest_rate": 10.5 if score > 800 else 12.0,
+        "validity": "30 days",
+    }
+
+
+SCORES = [-1, 300, 649, 650, 699, 700, 749, 750, 799, 800, 801, 900]
+SALARIES = [0.0, 20000.0, 85000.0]
+PRE_APPROVED = [0.0, 150000.0, 800000.0]
+AMOUNTS = [0, 50000, 150000, 300000, 450000, 900000, 2500000]
+TENURES = [12, 36, 72]
+
+
+def test_decide_matches_baseline(policy):
+    for score in SCORES:
+        for pre_approved in PRE_APPROVED:
+            for reported_salary in SALARIES:
+                limit, salary, _ = policy.resolve_limit(score, pre_approved, reported_salary)
+                assert (limit, salary) == baseline_limit(score, pre_approved, reported_salary)
+                for amount in AMOUNTS:
+                    for tenure in TENURES:
+                        for slip in (False, True):
+                            decision = policy.decide(score, amount, limit, salary, tenure, 12.0, slip)
+                            expected = baseline_decide(score, amount, limit, salary, tenure, 12.0, slip)
+                            assert decision.outcome == expected, (score, pre_approved, reported_salary, amount, tenure, slip)
+
+
+def test_offer_for_matches_baseline(policy):
+    for score in SCORES + [None]:
+        assert policy.offer_for(score, 60000) == baseline_offer(score, 60000)
+
+
+def test_decide_grid_matches_decide_for_every_cell(policy):
+    amounts = [0, 25000, 50000, 100000, 150000, 175000, 200000, 300000, 310000, 450000, 1000000]
+    tenures = [6, 12, 18, 24, 36, 48, 60, 72]
+    for score in SCORES:
+        for limit, salary in [(150000.0, 15000.0), (150000.0, 40000.0), (0.0, 0.0), (300000.0, 5000.0)]:
+            for slip in (False, True):
+                grid = policy.decide_grid(score, amounts, tenures, limit, salary, 11.5, slip)
+                for i, amount in enumerate(amounts):
+                    for j, tenure in enumerate(tenures):
+                        expected = policy.decide(score, amount, limit, salary, tenure, 11.5, slip).outcome
+                        assert grid[i][j] == expected, (score, limit, salary, slip, amount, tenure)
+
+
+def test_emi_reason_follows_threshold():
+    table = load_table()
+    table["thresholds"]["max_emi_to_income"] = 0.4
+    policy = UnderwritingPolicy(table)
+    # Within 2x the limit, slip uploaded, EMI (~₹27k) above 40% of a ₹50k salary
+    decision = policy.decide(750, 300000, 200000, 50000, 12, 12.0, True)
+    assert decision.rule_id == "emi_exceeds_salary_share"
+    assert decision.reason == "EMI exceeds 40% of verified monthly salary."
+
+
+def write_table(path, table):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(table, f)
+    # Make sure the reload check sees a new mtime even on coarse filesystems
+    stamp = time.time() + write_table.bump
+    write_table.bump += 1
+    os.utime(path, (stamp, stamp))
+
+
+write_table.bump = 1
+
+
+def test_policy_store_hot_reload(tmp_path):
+    path = str(tmp_path / "rules.json")
+    table = load_table()
+    write_table(path, table)
+    store = PolicyStore(path, check_interval=0)
+    reloaded = []
+    store.subscribe(reloaded.append)
+
+    assert store.get().version == 1
+    assert reloaded == []  # the initial load is not a reload
+
+    table["version"] = 2
+    write_table(path, table)
+    assert store.get().version == 2
+    assert [p.version for p in reloaded] == [2]
+
+    # A broken edit keeps the last good table and does not notify
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("{not json")
+    os.utime(path, (time.time() + 100, time.time() + 100))
+    assert store.get().version == 2
+    assert len(reloaded) == 1
+
+
+def test_rules_reload_rederives_mock_offers():
+    from app.core.mock_data import CRM_DATABASE
+    from app.mock.data_generator import mock_db
+
+    customer = next(c for c in mock_db.get_all_customers() if mock_db.get_profile_type(c["id"]) == "PRIME")
+    original = mock_db.get_offer(customer["id"])
+    table = load_table()
+    for tier in table["offer_tiers"]:
+        if tier["multiplier"]:
+            tier["multiplier"] = 3
+    try:
+        mock_db.refresh_offers(UnderwritingPolicy(table))
+        assert mock_db.get_offer(customer["id"])["pre_approved_limit"] == customer["monthly_income"] * 3
+        assert CRM_DATABASE[customer["phone"]]["pre_approved_limit"] == customer["monthly_income"] * 3
+    finally:
+        mock_db.refresh_offers(UnderwritingPolicy(load_table()))
+    assert mock_db.get_offer(customer["id"]) == original
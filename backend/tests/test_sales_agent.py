@@ -0,0 +1,114 @@
+import pytest
+
+from app.agents.sales_agent import SalesAgent, pick_counteroffer
+from app.core.state_manager import StateManager
+from app.models.session import AgentRole
+
+OPTIONS = [
+    {"amount": 150000.0, "tenure": 24, "emi": 7000.0, "needs_salary_slip": False},
+    {"amount": 200000.0, "tenure": 36, "emi": 6600.0, "needs_salary_slip": True},
+]
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("2", OPTIONS[1]),
+    ("Option 1.", OPTIONS[0]),
+    ("let's go with option 2", OPTIONS[1]),
+    ("the first one please", OPTIONS[0]),
+    ("option 3", None),
+    ("I want 2 lakhs", None),
+    ("what about a longer tenure?", None),
+])
+def test_pick_counteroffer(message, expected):
+    assert pick_counteroffer(message, OPTIONS) == expected
+
+
+@pytest.fixture
+def countered(session_id, customer):
+    """A customer whose request underwriting turned down with counteroffers."""
+    manager = StateManager()
+    state = manager.get_state(session_id)
+    state.current_agent = AgentRole.SALES
+    state.phone = customer["phone"]
+    state.pre_approved_limit = 150000.0
+    state.loan_amount = 400000.0
+    state.loan_tenure = 12
+    state.counteroffer = {"options": [dict(o) for o in OPTIONS], "rules_version": 1}
+    manager.save_state(state)
+    return manager, session_id
+
+
+def test_picking_an_option_needs_no_llm(fake_llm, countered):
+    manager, session_id = countered
+
+    response = SalesAgent().process(manager.get_state(session_id), "option 2")
+
+    assert "salary slip" in response
+    assert fake_llm.prompts == []
+    state = manager.get_state(session_id)
+    assert (state.loan_amount, state.loan_tenure) == (200000.0, 36)
+    assert state.counteroffer is None
+    assert state.current_agent == AgentRole.VERIFICATION
+
+
+@pytest.mark.parametrize("reply", [
+    'Happy to help. <JSON>{"amount": null, "tenure": null, "action": "CONTINUE"}</JSON>',
+    'Sure. <JSON>{"amount": 250000, "tenure": 48, "action": "CONTINUE"}</JSON>',
+])
+def test_free_form_turn_drops_the_counteroffer(fake_llm, countered, reply):
+    manager, session_id = countered
+    fake_llm.respond = lambda prompt: reply
+
+    SalesAgent().process(manager.get_state(session_id), "can we talk about something else")
+
+    assert "Amount 150000, Tenure 24 months" in fake_llm.prompts[0]
+    state = manager.get_state(session_id)
+    assert state.counteroffer is None
+    # A later "2" is no longer read as a pick of a stale option
+    fake_llm.respond = lambda prompt: 'OK. <JSON>{"amount": null, "tenure": null, "action": "CONTINUE"}</JSON>'
+    SalesAgent().process(state, "2")
+    assert manager.get_state(session_id).current_agent == AgentRole.SALES
+
+
+def test_llm_outage_keeps_the_counteroffer(fake_llm, countered):
+    manager, session_id = countered
+    fake_llm.respond = lambda prompt: None
+
+    SalesAgent().process(manager.get_state(session_id), "hmm, not sure yet")
+
+    assert manager.get_state(session_id).counteroffer is not None
+
+
+@pytest.fixture
+def identified(session_id, customer):
+    manager = StateManager()
+    state = manager.get_state(session_id)
+    state.current_agent = AgentRole.SALES
+    state.phone = customer["phone"]
+    state.pre_approved_limit = 300000.0
+    manager.save_state(state)
+    return manager, session_id
+
+
+def test_plain_product_question_is_answered_from_the_faq(fake_llm, identified):
+    manager, session_id = identified
+
+    response = SalesAgent().process(manager.get_state(session_id), "What is the maximum tenure?")
+
+    assert fake_llm.prompts == []
+    assert "month" in response.lower()
+
+
+@pytest.mark.parametrize("message", [
+    "What is the maximum tenure? I'd like 60 months",  # carries terms to extract
+    "what is my pre-approved limit",  # about this customer
+    "what is my emi",
+])
+def test_personal_or_negotiating_questions_go_to_the_llm(fake_llm, identified, message):
+    manager, session_id = identified
+    fake_llm.respond = lambda prompt: 'Sure. <JSON>{"amount": null, "tenure": null, "action": "CONTINUE"}</JSON>'
+
+    response = SalesAgent().process(manager.get_state(session_id), message)
+
+    assert len(fake_llm.prompts) == 1
+    assert response == "Sure."
@@ -0,0 +1,194 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.core import service_clients
+from app.core.service_clients import CircuitBreaker, ServiceClient, ServiceUnavailable
+
+
+def test_breaker_opens_after_threshold_and_recovers():
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=0.05)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == "CLOSED" and breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == "OPEN"
+    assert not breaker.allow()
+
+    asyncio.run(asyncio.sleep(0.06))
+    assert breaker.allow()  # the probe
+    assert breaker.state == "HALF_OPEN"
+    assert not breaker.allow()  # everyone else waits for it
+
+    breaker.record_success()
+    assert breaker.state == "CLOSED"
+    assert breaker.allow() and breaker.allow()
+    assert breaker.trips == 1
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.05)
+    breaker.record_failure()
+    asyncio.run(asyncio.sleep(0.06))
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "OPEN"
+    assert not breaker.allow()
+    assert breaker.trips == 2
+
+
+def test_lost_probe_is_replaced_after_reset_interval():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.05)
+    breaker.record_failure()
+    asyncio.run(asyncio.sleep(0.06))
+    assert breaker.allow()
+    # The probe's caller never reports back
+    asyncio.run(asyncio.sleep(0.06))
+    assert breaker.allow()
+
+
+def make_client(handler, **kwargs) -> ServiceClient:
+    return ServiceClient("test", base_url="http://svc", transport=httpx.MockTransport(handler), **kwargs)
+
+
+def test_client_retries_server_errors(monkeypatch):
+    monkeypatch.setattr(service_clients, "SERVICE_RETRY_BACKOFF_SECONDS", 0)
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        if len(calls) < 3:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"ok": True})
+
+    async def scenario():
+        client = make_client(handler, max_retries=2)
+        try:
+            return await client.get_json("/thing"), client.stats()
+        finally:
+            await client.close()
+
+    body, stats = asyncio.run(scenario())
+    assert body == {"ok": True}
+    assert len(calls) == 3
+    assert stats["retries"] == 2 and stats["failures"] == 0
+
+
+def test_client_maps_404_to_none_and_opens_circuit(monkeypatch):
+    monkeypatch.setattr(service_clients, "SERVICE_RETRY_BACKOFF_SECONDS", 0)
+
+    async def scenario():
+        missing = make_client(lambda request: httpx.Response(404))
+        broken = make_client(lambda request: httpx.Response(500), max_retries=0)
+        broken.breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60)
+        try:
+            assert await missing.get_json("/x") is None
+            for _ in range(2):
+                with pytest.raises(ServiceUnavailable):
+                    await broken.get_json("/x")
+            with pytest.raises(ServiceUnavailable, match="circuit open"):
+                await broken.get_json("/x")
+            return broken.stats()
+        finally:
+            await missing.close()
+            await broken.close()
+
+    stats = asyncio.run(scenario())
+    assert stats["requests"] == 2
+    assert stats["short_circuited"] == 1
+    assert stats["breaker_state"] == "OPEN"
+
+
+def test_half_open_lets_one_concurrent_probe_through():
+    hits = []
+
+    async def handler(request):
+        hits.append(request.url.path)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"ok": True})
+
+    async def scenario():
+        client = make_client(handler)
+        client.breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.03)
+        client.breaker.record_failure()
+        await asyncio.sleep(0.04)
+        try:
+            return await asyncio.gather(*(client.get_json("/x") for _ in range(5)), return_exceptions=True)
+        finally:
+            await client.close()
+
+    results = asyncio.run(scenario())
+    assert len(hits) == 1
+    assert results.count({"ok": True}) == 1
+    assert sum(isinstance(r, ServiceUnavailable) for r in results) == 4
+
+
+def test_fault_injection_endpoint_is_disabled_by_default():
+    from fastapi.testclient import TestClient
+    import main
+
+    client = TestClient(main.app)
+    response = client.put("/api/mock/faults/crm", json={"latency_ms": 10, "jitter_ms": 0, "error_rate": 0})
+    assert response.status_code == 403
+    assert client.get("/api/mock/faults").json()["crm"]["latency_ms"] == 0
+
+
+def test_agents_read_customer_data_through_the_clients(monkeypatch, fake_llm, session_id, customer):
+    import main
+    from app.core.cache import offer_cache, score_cache
+    from main import master_agent, state_manager
+
+    score_cache.invalidate(customer["id"])
+    offer_cache.invalidate(customer["id"])
+    monkeypatch.setattr(service_clients, "SERVICE_MODE", "http")
+    transport = httpx.ASGITransport(app=main.app)
+    for client in service_clients.all_clients():
+        monkeypatch.setattr(client, "transport", transport)
+        monkeypatch.setattr(client, "base_url", "http://mock/api")
+        monkeypatch.setattr(client, "_client", None)
+    before = {c.name: c.metrics["requests"] for c in service_clients.all_clients()}
+
+    state = state_manager.get_state(session_id)
+    state.current_agent = state.current_agent.SALES
+    state_manager.save_state(state)
+
+    async def scenario():
+        try:
+            return await master_agent.process_request(session_id, f"my number is {customer['phone'].replace(' ', '')[-10:]}")
+        finally:
+            await service_clients.close_clients()
+
+    response = asyncio.run(scenario())
+    assert customer["name"] in response
+    assert fake_llm.prompts == []
+    assert service_clients.crm_client.metrics["requests"] > before["crm"]
+    assert service_clients.offer_client.metrics["requests"] > before["offers"]
+    state = state_manager.get_state(session_id)
+    assert state.user_id == customer["id"]
+    assert state.pre_approved_limit > 0
+
+
+def test_client_errors_do_not_open_the_circuit():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(422, json={"detail": "bad input"})
+
+    async def scenario():
+        client = make_client(handler, max_retries=2)
+        client.breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60)
+        try:
+            for _ in range(3):
+                with pytest.raises(service_clients.ServiceRequestRejected):
+                    await client.get_json("/x")
+            return client.stats()
+        finally:
+            await client.close()
+
+    stats = asyncio.run(scenario())
+    assert len(calls) == 3  # not retried
+    assert stats["breaker_state"] == "CLOSED"
+    assert stats["failures"] == 0 and stats["client_errors"] == 3
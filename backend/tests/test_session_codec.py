@@ -0,0 +1,63 @@
+from app.core.session_codec import (
+    FIELD_ORDER, decode_record, decode_state, encode_record, encode_state, from_record, state_to_dict, to_record,
+)
+from app.models.session import AgentRole, LoanApplicationState
+
+
+def full_state() -> LoanApplicationState:
+    return LoanApplicationState(
+        user_id="CUST001",
+        session_id="s-1",
+        current_agent=AgentRole.UNDERWRITING,
+        state_version=7,
+        name="Asha Rao",
+        phone="9876543210",
+        income=85000.0,
+        loan_amount=300000.0,
+        loan_tenure=24,
+        interest_rate=10.5,
+        kyc_verified=True,
+        credit_score=780,
+        pre_approved_limit=850000.0,
+        prefetched_data={"credit_score": 780, "kyc_status": "VERIFIED", "interest_rate": None},
+        counteroffer={"options": [{"amount": 250000.0, "tenure": 24, "emi": 11570.0, "needs_salary_slip": False}], "rules_version": 1},
+        conversation_history=[{"role": "user", "content": "hi"}, {"role": "agent", "content": "Hello! ₹ offers"}],
+        audit_log=["KYC verified", "Underwriting APPROVE"],
+    )
+
+
+def test_record_round_trip_preserves_every_field():
+    state = full_state()
+    assert from_record(to_record(state)).model_dump() == state.model_dump()
+    assert from_record(to_record(LoanApplicationState(user_id="g", session_id="s"))).model_dump() == \
+        LoanApplicationState(user_id="g", session_id="s").model_dump()
+
+
+def test_records_are_immutable_snapshots():
+    state = full_state()
+    record = to_record(state)
+    assert isinstance(record, tuple)
+    assert isinstance(record[FIELD_ORDER.index("conversation_history")], tuple)
+
+    loaded = from_record(record)
+    loaded.conversation_history.append({"role": "user", "content": "more"})
+    loaded.audit_log.append("changed")
+    loaded.prefetched_data["credit_score"] = 1
+
+    again = from_record(record)
+    assert len(again.conversation_history) == 2
+    assert again.audit_log == ["KYC verified", "Underwriting APPROVE"]
+    assert again.prefetched_data["credit_score"] == 780
+
+
+def test_serialized_round_trip():
+    state = full_state()
+    record = to_record(state)
+    assert decode_record(encode_record(record)) == record
+    assert decode_state(encode_state(state)).model_dump() == state.model_dump()
+
+
+def test_state_to_dict_matches_model_dump():
+    state = full_state()
+    assert state_to_dict(state) == state.model_dump()
+
@@ -0,0 +1,69 @@
+import os
+import time
+
+from app.core.session_codec import from_record, to_record
+from app.core.state_manager import SessionStore
+from app.models.session import LoanApplicationState
+
+
+def record(session_id, messages=1):
+    state = LoanApplicationState(user_id="guest", session_id=session_id)
+    state.conversation_history = [{"role": "user", "content": f"message {i}"} for i in range(messages)]
+    return to_record(state)
+
+
+def test_idle_sessions_expire():
+    store = SessionStore(ttl_seconds=0.05, max_sessions=10, max_bytes=10**6)
+    store.put("old", record("old"))
+    time.sleep(0.06)
+    store.put("new", record("new"))
+
+    assert store.get("old") is None
+    assert store.get("new") is not None
+    assert store.stats()["expirations"] == 1
+
+
+def test_least_recently_used_is_evicted_first():
+    store = SessionStore(ttl_seconds=60, max_sessions=2, max_bytes=10**6)
+    store.put("a", record("a"))
+    store.put("b", record("b"))
+    store.get("a")  # "b" is now the least recently used
+    store.put("c", record("c"))
+
+    assert len(store) == 2
+    assert store.get("b") is None
+    assert store.get("a") is not None and store.get("c") is not None
+    assert store.stats()["evictions"] == 1
+
+
+def test_byte_budget_evicts_but_keeps_the_latest_write():
+    big = record("big", messages=50)
+    store = SessionStore(ttl_seconds=60, max_sessions=100, max_bytes=1)
+    store.put("a", record("a"))
+    store.put("big", big)
+
+    assert store.get("a") is None
+    assert store.get("big")[0] == big
+    stats = store.stats()
+    assert stats["live_sessions"] == 1
+    assert stats["estimated_bytes"] > stats["max_bytes"]
+
+
+def test_evicted_sessions_spill_to_disk_and_restore(tmp_path):
+    store = SessionStore(ttl_seconds=60, max_sessions=1, max_bytes=10**6, spill_dir=str(tmp_path))
+    original = record("../../etc/passwd", messages=3)
+    store.put("../../etc/passwd", original)
+    store.put("other", record("other"))
+
+    # Spill files are named by a hash, never by the client-supplied session id
+    files = os.listdir(tmp_path)
+    assert len(files) == 1 and files[0].endswith(".json") and "passwd" not in files[0]
+
+    restored, change_log = store.get("../../etc/passwd")
+    assert restored == original
+    assert change_log == ()
+    assert from_record(restored).conversation_history[-1]["content"] == "message 2"
+    assert store.stats()["spills"] == 2  # restoring evicted "other" in turn
+    assert store.stats()["restores"] == 1
+    assert files[0] not in os.listdir(tmp_path)  # the restored spill file is removed
+
@@ -0,0 +1,71 @@
+from app.core.session_codec import decode_record, encode_record
+from app.core.state_manager import GLOBAL_STATE_STORE, StateManager
+from app.models.session import AgentRole
+
+
+def test_full_snapshot_and_projection(session_id):
+    manager = StateManager()
+    manager.add_message(session_id, "user", "hi")
+
+    full = manager.get_snapshot(session_id)
+    assert full["full"] is True
+    assert full["state"]["conversation_history"] == [{"role": "user", "content": "hi"}]
+
+    projected = manager.get_snapshot(session_id, fields=["current_agent", "not_a_field"])
+    assert projected["state"] == {"current_agent": AgentRole.MASTER}
+
+
+def test_delta_sends_only_new_messages_and_changed_fields(session_id):
+    manager = StateManager()
+    manager.add_message(session_id, "user", "hi")
+    base = manager.get_snapshot(session_id)["version"]
+
+    manager.add_message(session_id, "agent", "hello")
+    manager.update_agent(session_id, AgentRole.SALES)
+
+    delta = manager.get_snapshot(session_id, since_version=base)
+    assert delta["full"] is False
+    assert delta["base_version"] == base
+    assert delta["version"] == base + 2
+    assert delta["appended"] == {"conversation_history": [{"role": "agent", "content": "hello"}]}
+    assert delta["changed"] == {"current_agent": AgentRole.SALES}
+
+    current = manager.get_snapshot(session_id, since_version=delta["version"])
+    assert current["full"] is False and current["changed"] == {} and current["appended"] == {}
+
+
+def test_rewritten_history_is_sent_in_full(session_id):
+    manager = StateManager()
+    manager.add_message(session_id, "user", "hi")
+    base = manager.get_snapshot(session_id)["version"]
+
+    state = manager.get_state(session_id)
+    state.conversation_history = [{"role": "user", "content": "edited"}]
+    manager.save_state(state)
+
+    delta = manager.get_snapshot(session_id, since_version=base)
+    assert delta["changed"] == {"conversation_history": [{"role": "user", "content": "edited"}]}
+    assert delta["appended"] == {}
+
+
+def test_delta_after_codec_round_trip_is_still_an_append(session_id):
+    manager = StateManager()
+    manager.add_message(session_id, "user", "hi")
+    base = manager.get_snapshot(session_id)["version"]
+    manager.add_message(session_id, "agent", "hello")
+
+    # Same content, new objects (as after a spill/restore)
+    record, change_log = GLOBAL_STATE_STORE.get(session_id)
+    GLOBAL_STATE_STORE.put(session_id, decode_record(encode_record(record)), change_log)
+
+    delta = manager.get_snapshot(session_id, since_version=base)
+    assert delta["appended"] == {"conversation_history": [{"role": "agent", "content": "hello"}]}
+    assert "conversation_history" not in delta["changed"]
+
+
+def test_unknown_base_version_falls_back_to_full(session_id):
+    manager = StateManager()
+    manager.add_message(session_id, "user", "hi")
+
+    snapshot = manager.get_snapshot(session_id, since_version=999)
+    assert snapshot["full"] is True
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from app.agents import underwriting_agent
+from app.agents.underwriting_agent import UnderwritingAgent
+from app.core.rules_engine import DEFAULT_RULES_PATH, UnderwritingPolicy
+from app.core.state_manager import StateManager
+from app.models.session import AgentRole
+
+
+def policy_with_rules(edit):
+    with open(DEFAULT_RULES_PATH, "r", encoding="utf-8") as f:
+        table = json.load(f)
+    edit(table["decision_rules"])
+    return UnderwritingPolicy(table)
+
+
+def drop_limit_band(rules):
+    rules[:] = [r for r in rules if r["id"] != "exceeds_limit_band"]
+
+
+def add_amount_cap(rules):
+    rules.insert(1, {
+        "id": "amount_cap",
+        "when": {"loan_amount": {"gt": 900000}},
+        "outcome": "REJECT",
+        "reason": "Loans above ₹9,00,000 are not offered online.",
+    })
+
+
+@pytest.mark.parametrize("edit, reason", [
+    (drop_limit_band, "No underwriting rule matched."),
+    (add_amount_cap, "Loans above ₹9,00,000 are not offered online."),
+])
+def test_other_rejections_explain_with_their_own_reason(monkeypatch, session_id, edit, reason):
+    monkeypatch.setattr(underwriting_agent, "get_policy", lambda: policy_with_rules(edit))
+    manager = StateManager()
+    state = manager.get_state(session_id)
+    state.current_agent = AgentRole.UNDERWRITING
+    state.loan_amount = 1000000.0
+    state.loan_tenure = 24
+    state.prefetched_data = {"credit_score": 800, "pre_approved_limit": 100000.0, "current_salary": 50000.0}
+    manager.save_state(state)
+
+    response = UnderwritingAgent().process(state, "ok")
+
+    assert reason in response
+    assert "higher than your eligibility limit" not in response
+    state = manager.get_state(session_id)
+    assert state.rejection_reason == reason
+    assert state.current_agent == AgentRole.SALES
+
+
+def test_limit_band_rejection_quotes_the_limit(session_id):
+    manager = StateManager()
+    state = manager.get_state(session_id)
+    state.current_agent = AgentRole.UNDERWRITING
+    state.loan_amount = 1000000.0
+    state.loan_tenure = 24
+    state.prefetched_data = {"credit_score": 800, "pre_approved_limit": 100000.0, "current_salary": 50000.0}
+    manager.save_state(state)
+
+    response = UnderwritingAgent().process(state, "ok")
+
+    assert "higher than your eligibility limit" in response
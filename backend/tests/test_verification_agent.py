@@ -0,0 +1,183 @@
+import pytest
+
+from app.agents.verification_agent import VerificationAgent
+from app.models.session import AgentRole
+
+
+@pytest.fixture
+def pan_step(session_id):
+    """A new customer who has given phone and name and now owes us a PAN."""
+    from app.core.state_manager import StateManager
+
+    manager = StateManager()
+    state = manager.get_state(session_id)
+    state.current_agent = AgentRole.VERIFICATION
+    state.phone = "9000000001"
+    state.name = "Test Applicant"
+    manager.save_state(state)
+    return manager, session_id
+
+
+@pytest.mark.parametrize("reply", [None, "NOT_FOUND"])
+def test_pan_step_never_falls_back_to_the_raw_message(fake_llm, pan_step, reply):
+    manager, session_id = pan_step
+    # None = LLM unavailable: the message's own 10-character token must not be taken as the PAN
+    fake_llm.respond = lambda prompt: reply
+
+    response = VerificationAgent().process(manager.get_state(session_id), "my account number is 1234567890")
+
+    assert "valid PAN" in response
+    state = manager.get_state(session_id)
+    assert not state.kyc_verified
+    assert state.current_agent == AgentRole.VERIFICATION
+
+
+def test_pan_step_accepts_a_well_formed_pan(fake_llm, pan_step):
+    manager, session_id = pan_step
+    fake_llm.respond = lambda prompt: "zzzzz9999z"
+
+    response = VerificationAgent().process(manager.get_state(session_id), "it's zzzzz9999z")
+
+    assert "verified successfully" in response
+    state = manager.get_state(session_id)
+    assert state.kyc_verified
+    assert state.current_agent == AgentRole.UNDERWRITING
+
+
+def test_pan_link_underwrites_on_the_matched_customer(fake_llm, pan_step):
+    from app.agents.underwriting_agent import UnderwritingAgent
+    from app.core.prefetch import prefetch_customer_data, run_blocking
+    from app.core.rules_engine import get_policy
+    from app.mock.data_generator import mock_db
+
+    policy = get_policy()
+    floor = policy.thresholds["min_credit_score"]
+    low = next(c for c in mock_db.get_all_customers() if mock_db.get_credit_score(c["id"]) < floor)
+    # Above the customer's own limit, so the score floor decides
+    limit, _, _ = policy.resolve_limit(mock_db.get_credit_score(low["id"]), 0.0, float(low["monthly_income"]))
+    manager, session_id = pan_step
+    state = manager.get_state(session_id)
+    # The new number is unknown, so its prefetch carries the default (passing) score
+    state.prefetched_data = run_blocking(prefetch_customer_data(state.phone))
+    state.name = low["name"]
+    state.loan_amount = limit + 10000
+    state.loan_tenure = 12
+    manager.save_state(state)
+    fake_llm.respond = lambda prompt: low["pan"]
+
+    VerificationAgent().process(manager.get_state(session_id), f"my pan is {low['pan']}")
+    state = manager.get_state(session_id)
+    assert state.user_id == low["id"]
+    assert state.prefetched_data["customer_id"] == low["id"]
+
+    response = UnderwritingAgent().process(state, "ok")
+    assert "credit score" in response
+    state = manager.get_state(session_id)
+    assert not state.is_approved
+    assert state.credit_score == mock_db.get_credit_score(low["id"])
+
+
+def test_name_step_flags_a_likely_existing_customer(fake_llm, session_id, customer):
+    from app.core.state_manager import StateManager
+
+    manager = StateManager()
+    state = manager.get_state(session_id)
+    state.current_agent = AgentRole.VERIFICATION
+    state.phone = "9000000001"
+    manager.save_state(state)
+    first, *rest = customer["name"].split()
+    # One typo in the first name
+    typo = first[:-1] + ("a" if first[-1] != "a" else "e")
+
+    response = VerificationAgent().process(manager.get_state(session_id), f"my name is {' '.join([typo, *rest])}")
+
+    assert "already have a profile" in response
+    state = manager.get_state(session_id)
+    assert customer["id"] in state.audit_log[-1]
+
+
+def test_phone_step_does_not_accept_a_partial_number(fake_llm, session_id, customer):
+    from app.core.state_manager import StateManager
+
+    manager = StateManager()
+    state = manager.get_state(session_id)
+    state.current_agent = AgentRole.VERIFICATION
+    manager.save_state(state)
+    suffix = customer["phone"][-6:]
+    fake_llm.respond = lambda prompt: suffix
+
+    response = VerificationAgent().process(manager.get_state(session_id), f"it ends in {suffix}")
+
+    assert "Mobile Number" in response
+    assert manager.get_state(session_id).phone is None
+
+
+def _serve_crm_over_http(monkeypatch):
+    import httpx
+
+    import main
+    from app.core import service_clients
+
+    monkeypatch.setattr(service_clients, "SERVICE_MODE", "http")
+    transport = httpx.ASGITransport(app=main.app)
+    for client in service_clients.all_clients():
+        monkeypatch.setattr(client, "transport", transport)
+        monkeypatch.setattr(client, "base_url", "http://mock/api")
+        monkeypatch.setattr(client, "_client", None)
+    paths = []
+    get_json = service_clients.crm_client.get_json
+
+    async def recording_get_json(path):
+        paths.append(path)
+        return await get_json(path)
+
+    monkeypatch.setattr(service_clients.crm_client, "get_json", recording_get_json)
+    return paths
+
+
+def _run_turn(session_id, message):
+    import asyncio
+
+    from app.core import service_clients
+    from main import master_agent
+
+    async def scenario():
+        try:
+            return await master_agent.process_request(session_id, message)
+        finally:
+            await service_clients.close_clients()
+
+    return asyncio.run(scenario())
+
+
+def test_pan_lookup_goes_through_the_crm_client(monkeypatch, fake_llm, pan_step, customer):
+    paths = _serve_crm_over_http(monkeypatch)
+    manager, session_id = pan_step
+    state = manager.get_state(session_id)
+    state.name = customer["name"]
+    manager.save_state(state)
+    fake_llm.respond = lambda prompt: customer["pan"]
+
+    _run_turn(session_id, f"my pan is {customer['pan']}")
+
+    assert any(path.startswith("/crm/search?") for path in paths)
+    state = manager.get_state(session_id)
+    assert state.user_id == customer["id"]
+    assert state.kyc_verified
+
+
+def test_pan_step_asks_again_while_the_crm_circuit_is_open(monkeypatch, fake_llm, pan_step, customer):
+    from app.core import service_clients
+
+    _serve_crm_over_http(monkeypatch)
+    monkeypatch.setattr(service_clients.crm_client, "breaker", service_clients.CircuitBreaker(failure_threshold=1))
+    service_clients.crm_client.breaker.record_failure()
+    manager, session_id = pan_step
+    fake_llm.respond = lambda prompt: customer["pan"]
+
+    response = _run_turn(session_id, f"my pan is {customer['pan']}")
+
+    assert "unable to reach our customer records" in response
+    state = manager.get_state(session_id)
+    assert not state.kyc_verified
+    assert state.user_id != customer["id"]
@@ -6,13 +6,17 @@ export interface ChatResponse {
     session_id: string;
     agent_name: string;
     message: string;
-    state_snapshot: Record<string, unknown>;
+    state_version?: number;
+    state_snapshot?: Record<string, unknown> | null;
+    state_delta?: Record<string, unknown> | null;
 }
 
 export const sendMessage = async (sessionId: string, message: string): Promise<ChatResponse> => {
     const response = await axios.post(`${API_BASE_URL}/chat`, {
         session_id: sessionId,
         user_message: message,
+        // The UI only needs the sanction letter link, so skip the full state (and history) each turn
+        state_fields: ['sanction_letter_url'],
     });
     return response.data;
 };